@@ -0,0 +1,59 @@
+# Compares file size and load time of the export formats against the plain logger CSV.
+#
+#     python benchmarks/bench_exchange.py --rows 1000000
+#
+# Parquet and Arrow are skipped when pyarrow is not installed.
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecorice import synthetic
+from ecorice.exchange import export_history, iter_import
+from ecorice.loader import load_csv
+from ecorice.store import FarmStore
+
+
+# Function to time a call; returns (seconds, result)
+def timed(call):
+    began = time.perf_counter()
+    result = call()
+    return time.perf_counter() - began, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export format size and load time against the logger CSV")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = FarmStore(os.path.join(directory, "store"))
+        synthetic.write_store(store, args.rows)
+        baseline = os.path.join(directory, "ecorice_data.csv")
+        synthetic.write_csv(baseline, args.rows)  # Same readings, as the logger writes them
+        load, _ = timed(lambda: load_csv(baseline, use_cache=False))
+        results = [("csv (logger)", os.path.getsize(baseline), None, load)]
+
+        for fmt, name in (("csv.gz", "history.csv.gz"), ("parquet", "history.parquet"), ("arrow", "history.arrow")):
+            path = os.path.join(directory, name)
+            try:
+                export, _ = timed(lambda: export_history(store, path, fmt))
+            except ImportError as e:
+                print(f"{fmt}: skipped ({e})")
+                continue
+            load, _ = timed(lambda: sum(len(columns["timestamp"]) for _, _, columns in iter_import(path, fmt)))
+            results.append((fmt, os.path.getsize(path), export, load))
+
+    size = results[0][1]
+    print(f"{args.rows} rows")
+    print(f"{'format':<14}{'size (MB)':>12}{'vs csv':>9}{'export (s)':>12}{'load (s)':>10}")
+    for fmt, nbytes, export, load in results:
+        export = "-" if export is None else f"{export:.2f}"
+        print(f"{fmt:<14}{nbytes / 1e6:>12.1f}{nbytes / size:>8.0%}{export:>12}{load:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# Headless benchmark suite: ingestion, history loading, analysis, carbon accounting,
+# compaction and chart rendering over a deterministic synthetic dataset.
+#
+#     python benchmarks/run.py --rows 1000000 --farms 4 --output results.json
+#     python benchmarks/run.py --rows 1000000 --farms 4 --compare results.json
+#
+# Every case is timed on its own, then run again under tracemalloc for its peak memory
+# (skip that pass with --no-memory). Results go to JSON so runs of two versions can be compared.
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecorice import synthetic
+from ecorice.store import FarmStore, FLOAT_COLUMNS
+
+# Registered cases as (suite, name, function); a case function takes the context and returns
+# (callable to measure, rows it processes)
+CASES = []
+SUITES = ("ingest", "load", "analysis", "carbon", "compaction", "render")
+# Cases that handle readings one Python dict at a time are capped at this many rows
+RECORD_ROWS = 200_000
+
+
+# Decorator to register a benchmark case
+def case(suite, name):
+    def register(function):
+        CASES.append((suite, name, function))
+        return function
+    return register
+
+
+# ------------------------------
+# Ingestion
+# ------------------------------
+@case("ingest", "csv_writer")
+def ingest_csv_writer(context):
+    from ecorice.writer import SensorWriter, CsvSink
+    readings = list(synthetic.records(min(context["rows"], RECORD_ROWS), seed=context["seed"]))
+    path = os.path.join(context["scratch"], f"ingest-{time.perf_counter_ns()}.csv")
+
+    def run():  # save_data_to_csv-style: one reading at a time through the background writer
+        writer = SensorWriter(CsvSink(path))
+        for reading in readings:
+            writer.write(reading)
+        writer.close()
+    return run, len(readings)
+
+
+@case("ingest", "store_writer")
+def ingest_store_writer(context):
+    from ecorice.writer import SensorWriter, StoreSink
+    readings = list(synthetic.records(min(context["rows"], RECORD_ROWS), context["farms"], seed=context["seed"]))
+    root = os.path.join(context["scratch"], f"ingest-{time.perf_counter_ns()}")
+
+    def run():
+        writer = SensorWriter(StoreSink(FarmStore(root), crash_safe=True))
+        for reading in readings:
+            writer.write(reading)
+        writer.close()
+    return run, len(readings)
+
+
+@case("ingest", "csv_to_store")
+def ingest_csv_to_store(context):
+    from ecorice.store import ingest_csv
+    root = os.path.join(context["scratch"], f"ingest-{time.perf_counter_ns()}")
+    return lambda: ingest_csv(FarmStore(root), context["csv"]), context["csv_rows"]
+
+
+# ------------------------------
+# History loading
+# ------------------------------
+@case("load", "load_csv")
+def load_logger_csv(context):
+    from ecorice.loader import load_csv
+    return lambda: load_csv(context["csv"], use_cache=False), context["csv_rows"]
+
+
+@case("load", "follower_tail")
+def load_follower_tail(context):
+    from ecorice.follower import CsvFollower
+    follower = CsvFollower(context["csv"])
+    follower.refresh()
+    path = context["csv"]
+
+    def run():  # Append one minute of readings and pick up only those rows
+        with open(path, "a", newline="") as file:
+            for reading in synthetic.records(60, seed=context["seed"] + 1, start="2030-01-01 00:00:00"):
+                file.write(",".join(str(reading[name]) for name in ["timestamp"] + FLOAT_COLUMNS) + "\r\n")
+        follower.refresh()
+    return run, 60
+
+
+@case("load", "query_all")
+def load_query_all(context):
+    return lambda: context["store"].query(FLOAT_COLUMNS), context["rows"]
+
+
+@case("load", "query_one_day")
+def load_query_one_day(context):
+    store = context["store"]
+    start = int(store.query(["water_level"])["timestamp"][0]) + 86400
+    result = store.query(["water_level"], start, start + 86400)
+    return lambda: store.query(FLOAT_COLUMNS, start, start + 86400), len(result["timestamp"])
+
+
+@case("load", "query_auto_rollup")
+def load_query_auto(context):
+    store = context["store"]
+    result = store.query(["co2_emissions"], resolution="auto")
+    return lambda: store.query(["co2_emissions", "water_level"], resolution="auto"), len(result["timestamp"])
+
+
+# ------------------------------
+# Analysis
+# ------------------------------
+@case("analysis", "rules_batch")
+def analysis_rules(context):
+    from ecorice.rules import RuleEngine
+    batch = context["store"].query(["water_level", "co2_emissions"])
+    # analyze_data-style evaluation, over the whole history in one batch
+    return lambda: RuleEngine.from_file().latest_insights(batch), len(batch["timestamp"])
+
+
+@case("analysis", "rules_streaming")
+def analysis_rules_streaming(context):
+    from ecorice.rules import RuleEngine, columns_from_records
+    readings = list(synthetic.records(min(context["rows"], RECORD_ROWS), context["farms"], seed=context["seed"]))
+    batches = [columns_from_records(readings[i:i + 200]) for i in range(0, len(readings), 200)]
+
+    def run():  # The dashboards evaluate each drained batch of readings as it arrives
+        engine = RuleEngine.from_file()
+        for batch in batches:
+            engine.latest_insights(batch)
+    return run, len(readings)
+
+
+@case("analysis", "aggregation")
+def analysis_aggregation(context):
+    from ecorice.aggregation import AggregationEngine
+    readings = list(synthetic.records(min(context["rows"], RECORD_ROWS), context["farms"], seed=context["seed"]))
+
+    def run():
+        engine = AggregationEngine()
+        engine.add_many(readings)
+        engine.report("1h")
+    return run, len(readings)
+
+
+# ------------------------------
+# Carbon accounting
+# ------------------------------
+@case("carbon", "season_cold")
+def carbon_cold(context):
+    from ecorice.carbon import CarbonAccountant
+    return lambda: CarbonAccountant(context["store"]).season_report("wet", 2025), context["rows"]
+
+
+@case("carbon", "season_warm")
+def carbon_warm(context):
+    from ecorice.carbon import CarbonAccountant
+    accountant = CarbonAccountant(context["store"])
+    accountant.season_report("wet", 2025)
+    return lambda: accountant.season_report("wet", 2025), context["rows"]
+
+
+# ------------------------------
+# Compaction
+# ------------------------------
+@case("compaction", "rollup_all")
+def compaction_rollup(context):
+    from ecorice.compaction import Compactor
+    root = os.path.join(context["scratch"], f"compact-{time.perf_counter_ns()}")
+    store = FarmStore(root)
+    synthetic.write_store(store, context["rows"], context["farms"], seed=context["seed"])
+    return lambda: Compactor(store, retention_days=None).run_once(), context["rows"]
+
+
+# ------------------------------
+# Rendering (Agg, no display needed)
+# ------------------------------
+def _render(x, ys):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=(10, 5))
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_subplot(111)
+    for y in ys:
+        axes.plot(x, y)
+    canvas.draw()
+
+
+@case("render", "downsampled")
+def render_downsampled(context):
+    from ecorice.downsample import Pyramid, budget_from_width
+    data = context["store"].query(["co2_emissions", "water_level"], farm="farm-1")
+    x = data["timestamp"].astype(float)
+
+    def run():  # What the history chart does: build the level-of-detail pyramid, select, draw
+        budget = budget_from_width(1000)
+        selected = [Pyramid(x, data[name]).select(x[0], x[-1], budget) for name in ("co2_emissions", "water_level")]
+        _render(selected[0][0], [ys for _, ys in selected])
+    return run, len(x)
+
+
+@case("render", "raw_100k")
+def render_raw(context):
+    data = context["store"].query(["co2_emissions"], farm="farm-1")
+    x = data["timestamp"][:100_000].astype(float)
+    return lambda: _render(x, [data["co2_emissions"][:100_000]]), len(x)
+
+
+# Function to run a case once and time it
+def measure_time(context, function):
+    run, rows = function(context)
+    began = time.perf_counter()
+    run()
+    return time.perf_counter() - began, rows
+
+
+# Function to run a case once under tracemalloc; returns the peak in MB
+def measure_memory(context, function):
+    run, _ = function(context)
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+# Function to describe the code and machine a result file came from
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit, "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+        "rows": args.rows, "farms": args.farms, "seed": args.seed,
+    }
+
+
+# Function to print results, with the change against a baseline file when given
+def report(results, baseline=None):
+    previous = (baseline or {}).get("results", {})
+    print(f"{'case':<30}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}{'vs base':>10}")
+    for name, result in results.items():
+        peak = "-" if result.get("peak_mb") is None else f"{result['peak_mb']:.1f}"
+        change = ""
+        if name in previous and previous[name]["seconds"]:
+            change = f"{result['seconds'] / previous[name]['seconds'] - 1:+.0%}"
+        print(f"{name:<30}{result['seconds']:>10.3f}{result['rows_per_second']:>14,.0f}{peak:>10}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EcoRice benchmark suite")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="readings in the synthetic store (1 to 100M)")
+    parser.add_argument("--farms", type=int, default=4, help="farms the readings are spread over")
+    parser.add_argument("--csv-rows", type=int, default=None, help="rows of the logger CSV (default: min(rows, 2M))")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="suites to run (default: all)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+    if not 1 <= args.rows <= 100_000_000:
+        parser.error("--rows must be between 1 and 100M")
+    csv_rows = args.csv_rows or min(args.rows, 2_000_000)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        print(f"Generating {args.rows:,} readings over {args.farms} farms ...", flush=True)
+        store = FarmStore(os.path.join(scratch, "store"))
+        synthetic.write_store(store, args.rows, args.farms, seed=args.seed)
+        csv = os.path.join(scratch, "ecorice_data.csv")
+        synthetic.write_csv(csv, csv_rows, seed=args.seed)
+        from ecorice.compaction import Compactor
+        Compactor(store, retention_days=None).run_once()  # Rollups for the "auto" queries
+        context = {"store": store, "csv": csv, "csv_rows": csv_rows, "scratch": scratch,
+                   "rows": args.rows, "farms": args.farms, "seed": args.seed}
+
+        results = {}
+        for suite, name, function in CASES:
+            if args.suite and suite not in args.suite:
+                continue
+            seconds, rows = measure_time(context, function)
+            peak = None if args.no_memory else measure_memory(context, function)
+            results[f"{suite}/{name}"] = {"seconds": seconds, "rows": rows,
+                                          "rows_per_second": rows / seconds if seconds else 0.0, "peak_mb": peak}
+            print(f"  {suite}/{name}: {seconds:.3f} s", flush=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": metadata(args), "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
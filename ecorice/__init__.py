@@ -0,0 +1,61 @@
+# EcoRice core: storage, ingestion, acquisition, aggregation and rules for AWD
+# rice monitoring. Nothing here imports tkinter or matplotlib, and submodules
+# are only imported when one of their names is first used, so
+# `import ecorice` stays cheap for headless gateways and scripts.
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "load_csv": "loader",
+    "clear_cache": "loader",
+    "SensorTable": "loader",
+    "SCHEMA": "loader",
+    "DEFAULT_FARM": "loader",
+    "DEFAULT_PLOT": "loader",
+    "CsvFollower": "follower",
+    "ColumnStore": "store",
+    "FarmStore": "store",
+    "open_store": "store",
+    "ingest_csv": "store",
+    "range_for": "store",
+    "SensorWriter": "writer",
+    "StoreSink": "writer",
+    "CsvSink": "writer",
+    "AcquisitionEngine": "acquisition",
+    "RandomDriver": "acquisition",
+    "TcpDriver": "acquisition",
+    "UdpDriver": "acquisition",
+    "CsvReplayDriver": "acquisition",
+    "collect_sensor_data": "acquisition",
+    "AggregationEngine": "aggregation",
+    "RuleEngine": "rules",
+    "load_rules": "rules",
+    "lttb": "downsample",
+    "minmax": "downsample",
+    "Pyramid": "downsample",
+    "Compactor": "compaction",
+    "expired_history": "exchange",
+    "export_history": "exchange",
+    "import_history": "exchange",
+    "CarbonAccountant": "carbon",
+    "season_of": "carbon",
+    "net_profit": "finance",
+    "Ledger": "ledger",
+    "AnomalyDetector": "anomaly",
+    "build_report": "report",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'ecorice' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # Resolve once; later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,278 @@
+import time
+import logging
+import argparse
+
+log = logging.getLogger("ecorice")
+
+# Default of --retention-days (matches ecorice.compaction.RETENTION_DAYS, kept here so --help stays light)
+RETENTION_DAYS = 90
+# Seconds between rewrites of the --metrics Prometheus file
+METRICS_INTERVAL = 15
+
+
+# Function to run acquisition, storage and rules without any GUI until interrupted
+def run_gateway(args):
+    from .acquisition import AcquisitionEngine, RandomDriver, TcpDriver, UdpDriver
+    from .anomaly import AnomalyDetector
+    from .loader import DEFAULT_FARM, DEFAULT_PLOT
+    from .rules import RuleEngine, columns_from_records
+    from .store import open_store
+    from .writer import SensorWriter, StoreSink
+    from .compaction import Compactor
+    from . import metrics
+
+    store = open_store(args.store, args.csv)
+    writer = SensorWriter(StoreSink(store, crash_safe=True), batch_size=256, max_age=2.0)
+    rule_engine = RuleEngine.from_file(args.rules) if args.rules else RuleEngine.from_file()
+    # Faulty sensor values are screened out before they are written
+    detector = AnomalyDetector(action=args.on_fault)
+    engine = AcquisitionEngine(maxsize=1000, detector=detector)
+    # Field nodes given as name=tcp://host:port or name=udp://host:port; simulated when none are given
+    nodes = args.node or ["field-1=random"]
+    for spec in nodes:
+        name, _, address = spec.partition("=")
+        scheme, _, hostport = address.partition("://")
+        host, _, port = hostport.rpartition(":")
+        if scheme == "tcp":
+            driver = TcpDriver(host, int(port))
+        elif scheme == "udp":
+            driver = UdpDriver(host, int(port))
+        elif scheme == "random":
+            driver = RandomDriver()
+        else:
+            raise SystemExit(f"Unsupported node address: {spec}")
+        engine.add_device(name, driver, interval=args.interval, timeout=2.0, retries=2,
+                          farm_id=args.farm or DEFAULT_FARM, plot_id=args.plot or DEFAULT_PLOT)
+
+    compactor = Compactor(store, retention_days=args.retention_days)
+    engine.start()
+    compactor.start()
+    log.info("Gateway started with %d node(s); writing to %s", len(nodes), args.store)
+    metrics_due = time.monotonic() + METRICS_INTERVAL
+    try:
+        while True:
+            time.sleep(1.0)
+            if args.metrics and time.monotonic() >= metrics_due:
+                metrics.write_prometheus(args.metrics)
+                metrics_due = time.monotonic() + METRICS_INTERVAL
+            for timestamp, field, _, _, message in detector.pop_alerts():
+                log.warning("%s %s: %s", timestamp, field, message)
+            readings = engine.drain()
+            if not readings:
+                continue
+            for reading in readings:
+                try:
+                    writer.write(reading)
+                except Exception as e:  # The reading is queued and the failed batch is retried: keep going
+                    log.error("Writing to %s failed, retrying: %s", args.store, e)
+                    metrics.count("gateway.write_errors")
+            with metrics.timing("gateway.rules"):
+                insights = rule_engine.latest_insights(columns_from_records(readings))
+            for field, messages in insights.items():
+                for message in messages:
+                    log.warning("%s: %s", field, message)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        compactor.stop()
+        writer.close()
+    return 0
+
+
+# Function to roll up the store and expire raw days once
+def run_compact(args):
+    from .compaction import Compactor
+    from .store import open_store
+
+    stats = Compactor(open_store(args.store, args.csv), retention_days=args.retention_days).run_once()
+    log.info("Rebuilt %(rebuilt)d rollup partitions, expired %(expired)d raw days in %(seconds).2f s", stats)
+    return 0
+
+
+# Function to export sensor history without loading it all into memory
+def run_export(args):
+    from .exchange import expired_history, export_history
+    from .store import open_store
+
+    store = open_store(args.store, args.csv)
+    rows = export_history(store, args.output, args.format, args.start, args.end, args.farm, args.plot)
+    log.info("Exported %d rows to %s", rows, args.output)
+    expired = expired_history(store, args.start, args.end, args.farm, args.plot)
+    if expired:
+        log.warning("%d days (%s to %s) expired under retention and were not exported: only their rollups remain",
+                    len(expired), min(day for _, _, day in expired), max(day for _, _, day in expired))
+    return 0
+
+
+# Function to import an exported file chunk by chunk
+def run_import(args):
+    import csv
+    from .exchange import import_history
+    from .loader import DEFAULT_FARM, DEFAULT_PLOT
+    from .store import open_store
+
+    quarantine = []
+    rows = import_history(open_store(args.store, args.csv), args.input, args.format,
+                          args.farm or DEFAULT_FARM, args.plot or DEFAULT_PLOT, quarantine)
+    log.info("Imported %d rows (%d quarantined) from %s", rows, len(quarantine), args.input)
+    if quarantine and args.quarantine:
+        with open(args.quarantine, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["file", "line", "reason", "raw"])
+            writer.writerows(quarantine)
+        log.warning("%d rejected rows written to %s", len(quarantine), args.quarantine)
+    elif quarantine:
+        log.warning("%d rows did not parse and were skipped (--quarantine saves them)", len(quarantine))
+    return 0
+
+
+# Function to backfill logger CSV dumps on a process pool, then roll up, check rules and account carbon
+def run_backfill(args):
+    import csv
+    from .backfill import backfill_files, parse_spec
+    from .store import open_store
+
+    store = open_store(args.store, args.csv)
+    quarantine = [] if args.quarantine else None
+    result = backfill_files(store, [parse_spec(spec) for spec in args.input], args.workers,
+                            args.chunk_mb << 20, args.rules, quarantine)
+    for series, summary in result["series"].items():
+        carbon = summary.get("carbon", {})
+        log.info("%s: %d rows (%d quarantined) over %d days, %.2f kg CO2e avoided", series, summary["rows"],
+                 summary["quarantined"], summary.get("days", 0), carbon.get("co2_reduction_kg", 0.0))
+        for rule, readings in summary.get("rules", {}).items():
+            if readings:
+                log.info("%s: %s fired on %d readings", series, rule, readings)
+    rows = sum(summary["rows"] for summary in result["series"].values())
+    log.info("Backfilled %d rows in %d chunks on %d workers in %.2f s (parsing %.2f s, %.0f rows/s)", rows,
+             result["chunks"], result["workers"], result["seconds"], result["parse_seconds"],
+             rows / result["seconds"] if result["seconds"] else 0.0)
+    if quarantine:
+        with open(args.quarantine, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["file", "line", "reason", "raw"])
+            writer.writerows(quarantine)
+        log.warning("%d rejected rows written to %s", len(quarantine), args.quarantine)
+    return 0
+
+
+# Function to render the consolidated multi-farm report, re-rendering only farms whose data changed
+def run_report(args):
+    from .report import build_report
+    from .store import open_store, range_for
+
+    start, end = range_for(args.period)
+    result = build_report(open_store(args.store, args.csv), args.output, args.start or start, args.end or end,
+                          args.farm, args.workers, dpi=args.dpi)
+    log.info("Report of %(farms)d farms (%(rendered)d rendered, %(cached)d from cache) in %(seconds).2f s", result)
+    log.info("Written to %s", args.output)
+    return 0
+
+
+# Function to serve readings, rollups, insights and carbon figures over HTTP/JSON until interrupted
+def run_serve(args):
+    from .server import EcoRiceServer
+    from .store import open_store
+
+    server = EcoRiceServer(open_store(args.store, args.csv), args.csv, ttl=args.ttl, rules_file=args.rules)
+    try:
+        server.serve_forever(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# Function to build the command line parser; each subcommand sets its handler as `func`
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ecorice", description="EcoRice headless tools")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug messages")
+    commands = parser.add_subparsers(dest="command", required=True)
+    store_options = argparse.ArgumentParser(add_help=False)
+    store_options.add_argument("--store", default="ecorice_store", help="store directory")
+    store_options.add_argument("--csv", default="ecorice_data.csv", help="logger CSV whose new rows are imported first")
+
+    gateway = commands.add_parser("gateway", parents=[store_options],
+                                  help="poll field nodes into the store and log rule insights")
+    gateway.add_argument("--rules", default=None, help="rules file (defaults to the packaged AWD rules)")
+    gateway.add_argument("--node", action="append", help="name=tcp://host:port, name=udp://host:port or name=random")
+    gateway.add_argument("--farm", default=None, help="farm id for the nodes")
+    gateway.add_argument("--plot", default=None, help="plot id for the nodes")
+    gateway.add_argument("--interval", type=float, default=1.0, help="poll interval in seconds")
+    gateway.add_argument("--retention-days", type=int, default=RETENTION_DAYS,
+                         help="delete raw days older than this once rolled up")
+    gateway.add_argument("--metrics", default=None,
+                         help=f"write timing metrics to this Prometheus text file every {METRICS_INTERVAL} s")
+    gateway.add_argument("--on-fault", choices=("mask", "drop", "tag"), default="mask",
+                         help="faulty sensor values: store them as missing (mask), skip the reading (drop) or keep them (tag)")
+    gateway.set_defaults(func=run_gateway)
+
+    compact = commands.add_parser("compact", parents=[store_options],
+                                  help="roll raw readings into 1m/1h/1d tables and apply retention")
+    compact.add_argument("--retention-days", type=int, default=RETENTION_DAYS,
+                         help="delete raw days older than this once rolled up")
+    compact.set_defaults(func=run_compact)
+
+    export = commands.add_parser("export", parents=[store_options],
+                                 help="stream sensor history to Parquet, Arrow IPC or gzip CSV")
+    export.add_argument("output", help="file to write (.parquet, .arrow or .csv.gz)")
+    export.add_argument("--format", choices=("parquet", "arrow", "csv.gz"), default=None,
+                        help="output format (defaults to the file extension)")
+    export.add_argument("--farm", default=None, help="only this farm")
+    export.add_argument("--plot", default=None, help="only this plot")
+    export.add_argument("--start", default=None, help='first timestamp, "YYYY-mm-dd HH:MM:SS"')
+    export.add_argument("--end", default=None, help='timestamp to stop before, "YYYY-mm-dd HH:MM:SS"')
+    export.set_defaults(func=run_export)
+
+    load = commands.add_parser("import", parents=[store_options],
+                               help="append an exported file or a logger CSV to the store")
+    load.add_argument("input", help="file to read (.parquet, .arrow, .csv.gz or .csv)")
+    load.add_argument("--format", choices=("parquet", "arrow", "csv.gz", "csv"), default=None,
+                      help="input format (defaults to the file extension)")
+    load.add_argument("--farm", default=None, help="farm id for files without farm/plot columns")
+    load.add_argument("--plot", default=None, help="plot id for files without farm/plot columns")
+    load.add_argument("--quarantine", default=None, help="write rejected rows to this CSV")
+    load.set_defaults(func=run_import)
+
+    backfill = commands.add_parser("backfill", parents=[store_options],
+                                   help="parse logger CSV dumps on all cores, then roll up, check rules and account carbon")
+    backfill.add_argument("input", nargs="+",
+                          help="logger CSV as farm/plot=path, or a plain path for the default plot")
+    backfill.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    backfill.add_argument("--chunk-mb", type=int, default=16, help="MB of CSV parsed per task")
+    backfill.add_argument("--rules", default=None, help="rules file (defaults to the packaged AWD rules)")
+    backfill.add_argument("--quarantine", default=None, help="write rejected rows to this CSV")
+    backfill.set_defaults(func=run_backfill)
+
+    serve = commands.add_parser("serve", parents=[store_options],
+                                help="serve readings, rollups, insights and carbon figures over HTTP/JSON")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the LAN)")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--ttl", type=float, default=10.0, help="seconds a cached response is reused")
+    serve.add_argument("--rules", default=None, help="rules file (defaults to the packaged AWD rules)")
+    serve.set_defaults(func=run_serve)
+
+    report = commands.add_parser("report", parents=[store_options],
+                                 help="render a printable report of every farm's charts and summary tables")
+    report.add_argument("output", help="PDF file (.pdf), or a directory for PNG pages")
+    report.add_argument("--period", choices=("today", "week", "month", "season", "all"), default="season",
+                        help="range to report (default: the current season)")
+    report.add_argument("--start", default=None, help='first timestamp, "YYYY-mm-dd HH:MM:SS" (overrides --period)')
+    report.add_argument("--end", default=None, help='timestamp to stop before, "YYYY-mm-dd HH:MM:SS"')
+    report.add_argument("--farm", action="append", help="only this farm (repeatable)")
+    report.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    report.add_argument("--dpi", type=int, default=150, help="resolution of the farm pages")
+    report.set_defaults(func=run_report)
+    return parser
+
+
+# Function to parse the command line and run the chosen subcommand
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,293 @@
+import time
+import queue
+import random
+import asyncio
+import threading
+from datetime import datetime
+from .loader import load_csv, DEFAULT_FARM, DEFAULT_PLOT
+from . import metrics
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHANNELS = ["soil_moisture", "water_level", "air_temp", "air_humidity", "co2_emissions"]
+
+# Value ranges of the simulated sensors
+DEFAULT_RANGES = {
+    "soil_moisture": (20.0, 80.0),  # Percentage
+    "water_level": (0.0, 15.0),  # cm
+    "air_temp": (25.0, 35.0),  # Celsius
+    "air_humidity": (40.0, 90.0),  # Percentage
+    "co2_emissions": (300.0, 450.0),  # ppm
+}
+
+
+# Function to build a reading record stamped with the current time
+def make_reading(values, timestamp=None):
+    reading = {"timestamp": timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)}
+    reading.update(values)
+    return reading
+
+
+# Function to simulate one sensor reading
+def collect_sensor_data(ranges=DEFAULT_RANGES):
+    return make_reading({name: random.uniform(lo, hi) for name, (lo, hi) in ranges.items()})
+
+
+# Driver producing simulated readings, the stand-in used until real nodes are wired up
+class RandomDriver:
+    def __init__(self, ranges=None):
+        self.ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+
+    async def read(self):
+        return collect_sensor_data(self.ranges)
+
+    async def close(self):
+        pass
+
+
+# Function to parse a "soil,water,temp,humidity,co2" line sent by a field node
+def parse_node_line(line):
+    values = [float(value) for value in line.decode().strip().split(",")]
+    if len(values) != len(CHANNELS):
+        raise ValueError(f"expected {len(CHANNELS)} values, got {len(values)}")
+    return make_reading(dict(zip(CHANNELS, values)))
+
+
+# Driver for a node on a local TCP socket (or a serial-to-TCP bridge): send READ, get one line
+class TcpDriver:
+    def __init__(self, host="127.0.0.1", port=5020):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def read(self):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self._writer.write(b"READ\n")
+            await self._writer.drain()
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError("node closed the connection")
+            return parse_node_line(line)
+        except Exception:
+            await self.close()  # Reconnect on the next attempt
+            raise
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+
+# Protocol collecting UDP replies for UdpDriver
+class _UdpReplies(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.replies = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.replies.put_nowait(data)
+
+
+# Driver for a node answering READ datagrams over UDP
+class UdpDriver:
+    def __init__(self, host="127.0.0.1", port=5021):
+        self.host = host
+        self.port = port
+        self._transport = None
+        self._protocol = None
+
+    async def read(self):
+        if self._transport is None:
+            loop = asyncio.get_running_loop()
+            self._transport, self._protocol = await loop.create_datagram_endpoint(
+                _UdpReplies, remote_addr=(self.host, self.port))
+        while not self._protocol.replies.empty():
+            self._protocol.replies.get_nowait()  # Late replies to timed-out requests
+        self._transport.sendto(b"READ\n")
+        return parse_node_line(await self._protocol.replies.get())
+
+    async def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+# Driver replaying a logged CSV, paced by its own timestamps (speed > 1 is faster).
+# read() sleeps for the gap between rows, so poll it with timeout=None and interval=0.
+class CsvReplayDriver:
+    def __init__(self, filename="ecorice_data.csv", speed=1.0, loop=False):
+        table = load_csv(filename)
+        self.table = table
+        self.speed = speed
+        self.loop = loop
+        self.position = 0
+        self._epochs = table["timestamp"].astype("int64")
+
+    async def read(self):
+        if self.position >= len(self.table):
+            if not self.loop or len(self.table) == 0:
+                raise EOFError("replay finished")
+            self.position = 0
+        i = self.position
+        if i > 0 and self.speed:
+            await asyncio.sleep(max(self._epochs[i] - self._epochs[i - 1], 0) / self.speed)
+        self.position += 1
+        return make_reading({name: float(self.table[name][i]) for name in CHANNELS})
+
+    async def close(self):
+        pass
+
+
+# A polled device: driver plus its own interval, timeout, retry and backoff policy.
+# Its readings are stamped with the farm and plot the device is installed in.
+class Device:
+    def __init__(self, name, driver, interval=1.0, timeout=2.0, retries=2, backoff=1.0, max_backoff=60.0,
+                 farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT):
+        self.name = name
+        self.driver = driver
+        self.farm_id = farm_id
+        self.plot_id = plot_id
+        self.interval = interval
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failures = 0  # Consecutive failed polls
+        self.last_error = None
+        self.last_reading = None  # time.time() of the last good reading
+
+
+# Polls every device concurrently on an asyncio loop in a background thread and hands
+# readings to the Tk thread through a bounded queue. An optional AnomalyDetector screens every
+# reading before it is queued, so faulty values never reach the UI or storage.
+class AcquisitionEngine:
+    def __init__(self, maxsize=1000, detector=None):
+        self.queue = queue.Queue(maxsize)
+        self.detector = detector
+        self.devices = []
+        self.dropped = 0  # Readings discarded because the queue was full
+        self._loop = None
+        self._thread = None
+        self._tasks = []
+
+    def add_device(self, name, driver, **policy):
+        device = Device(name, driver, **policy)
+        self.devices.append(device)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._start_device, device)
+        return device
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        # Devices added from now on are scheduled by add_device itself
+        devices = list(self.devices)
+        self._thread = threading.Thread(target=self._run, args=(devices,), name="acquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+        self._loop = None
+
+    # Function to take every queued reading without blocking (called from the Tk thread)
+    def drain(self, max_items=None):
+        readings = []
+        while max_items is None or len(readings) < max_items:
+            try:
+                readings.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        metrics.count("readings.drained", len(readings))
+        return readings
+
+    def status(self):
+        return {
+            device.name: {"failures": device.failures, "last_error": device.last_error,
+                          "last_reading": device.last_reading}
+            for device in self.devices
+        }
+
+    def _run(self, devices):
+        asyncio.set_event_loop(self._loop)
+        for device in devices:
+            self._start_device(device)
+        self._loop.run_forever()
+
+    def _start_device(self, device):
+        self._tasks.append(self._loop.create_task(self._poll(device)))
+
+    async def _shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for device in self.devices:
+            await device.driver.close()
+        self._tasks = []
+
+    def _publish(self, reading):
+        if self.detector is not None:
+            reading = self.detector.check(reading)
+            if reading is None:  # Faulty reading dropped by the detector
+                return
+        try:
+            self.queue.put_nowait(reading)
+        except queue.Full:
+            # Keep the newest data: drop the oldest reading the UI has not drained yet
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+                metrics.count("readings.dropped")
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(reading)
+
+    async def _poll(self, device):
+        while True:
+            started = time.monotonic()
+            reading = await self._read_with_retries(device)
+            if reading is None:
+                device.failures += 1
+                delay = min(device.backoff * 2 ** (device.failures - 1), device.max_backoff)
+            else:
+                device.failures = 0
+                device.last_error = None
+                device.last_reading = time.time()
+                reading["device"] = device.name
+                reading["farm_id"] = device.farm_id
+                reading["plot_id"] = device.plot_id
+                self._publish(reading)
+                delay = device.interval - (time.monotonic() - started)
+            await asyncio.sleep(max(delay, 0))
+
+    async def _read_with_retries(self, device):
+        for _ in range(device.retries + 1):
+            try:
+                return await asyncio.wait_for(device.driver.read(), device.timeout)
+            except asyncio.CancelledError:
+                raise
+            except EOFError as e:
+                device.last_error = str(e)
+                return None
+            except Exception as e:
+                device.last_error = f"{type(e).__name__}: {e}"
+        return None
+
+
+# Function to drain the engine on the Tk event loop every `interval_ms`
+def drain_with_after(widget, engine, callback, interval_ms=200):
+    def tick():
+        with metrics.timing("tk.drain_tick"):
+            readings = engine.drain()
+            if readings:
+                callback(readings)
+        widget.after(interval_ms, tick)
+    tick()
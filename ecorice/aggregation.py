@@ -0,0 +1,251 @@
+import numpy as np
+from .loader import DEFAULT_FARM, DEFAULT_PLOT
+from .store import to_epoch
+
+CHANNELS = ["soil_moisture", "water_level", "air_temp", "air_humidity", "co2_emissions"]
+WATER_CHANNEL = CHANNELS.index("water_level")
+
+# Rolling windows kept for every farm and for the whole fleet (seconds)
+WINDOWS = {"1m": 60, "1h": 3600, "1d": 86400}
+# Each window is a ring of this many time buckets, so a summary merges a fixed
+# number of buckets no matter how many readings arrived
+BUCKETS = 60
+
+# Fixed histogram range per channel for the percentile estimates (values outside are clamped)
+HISTOGRAM_RANGES = np.array([
+    (0.0, 100.0),  # soil_moisture, %
+    (0.0, 30.0),  # water_level, cm
+    (0.0, 50.0),  # air_temp, °C
+    (0.0, 100.0),  # air_humidity, %
+    (0.0, 1000.0),  # co2_emissions, ppm
+])
+HISTOGRAM_BINS = 100
+PERCENTILES = (50, 90, 99)
+
+# AWD threshold: the field needs water below this level (cm)
+WATER_THRESHOLD = 7.0
+# Gaps longer than this between two readings of a plot are not counted as time below threshold
+MAX_GAP = 300
+
+
+# Ring of time buckets holding count/sum/min/max/histogram per channel for one window
+class WindowRollup:
+    def __init__(self, window):
+        self.width = window / BUCKETS
+        channels = len(CHANNELS)
+        self.bucket_ids = np.full(BUCKETS, -1, dtype=np.int64)
+        self.count = np.zeros((BUCKETS, channels), dtype=np.int64)
+        self.sum = np.zeros((BUCKETS, channels))
+        self.min = np.full((BUCKETS, channels), np.inf)
+        self.max = np.full((BUCKETS, channels), -np.inf)
+        self.hist = np.zeros((BUCKETS, channels, HISTOGRAM_BINS), dtype=np.int64)
+        self.below = np.zeros(BUCKETS)  # Seconds with water below threshold
+
+    def _slot(self, epoch):
+        bucket_id = int(epoch // self.width)
+        slot = bucket_id % BUCKETS
+        if self.bucket_ids[slot] != bucket_id:
+            if self.bucket_ids[slot] > bucket_id:
+                return None  # Older than the window: nothing to update
+            self.bucket_ids[slot] = bucket_id
+            self.count[slot] = 0
+            self.sum[slot] = 0.0
+            self.min[slot] = np.inf
+            self.max[slot] = -np.inf
+            self.hist[slot] = 0
+            self.below[slot] = 0.0
+        return slot
+
+    def add(self, epoch, values, bins, below_seconds):
+        slot = self._slot(epoch)
+        if slot is None:
+            return
+        valid = ~np.isnan(values)
+        self.count[slot] += valid
+        self.sum[slot] += np.where(valid, values, 0.0)
+        np.fmin(self.min[slot], values, out=self.min[slot])
+        np.fmax(self.max[slot], values, out=self.max[slot])
+        channels = np.flatnonzero(valid)
+        self.hist[slot, channels, bins[channels]] += 1
+        self.below[slot] += below_seconds
+
+    # Function to fold a batch of readings in with one bincount/ufunc.at pass per statistic. The end
+    # state is the same as add() per reading: a slot moves to the newest bucket that reaches it,
+    # and only that bucket's readings are counted in it.
+    def add_many(self, epochs, values, bins, below_seconds):
+        bucket_ids = (epochs // self.width).astype(np.int64)
+        slots = bucket_ids % BUCKETS
+        newest = self.bucket_ids.copy()
+        np.maximum.at(newest, slots, bucket_ids)
+        moved = newest != self.bucket_ids
+        self.bucket_ids = newest
+        self.count[moved] = 0
+        self.sum[moved] = 0.0
+        self.min[moved] = np.inf
+        self.max[moved] = -np.inf
+        self.hist[moved] = 0
+        self.below[moved] = 0.0
+        keep = bucket_ids == newest[slots]
+        slots, values, bins, below_seconds = slots[keep], values[keep], bins[keep], below_seconds[keep]
+
+        channels = len(CHANNELS)
+        valid = ~np.isnan(values)
+        cells = slots[:, None] * channels + np.arange(channels)  # (slot, channel) of every value
+        self.count += np.bincount(cells[valid], minlength=BUCKETS * channels).reshape(BUCKETS, channels)
+        self.sum += np.bincount(cells.ravel(), np.where(valid, values, 0.0).ravel(),
+                                BUCKETS * channels).reshape(BUCKETS, channels)
+        np.fmin.at(self.min, slots, values)
+        np.fmax.at(self.max, slots, values)
+        self.hist += np.bincount((cells * HISTOGRAM_BINS + bins)[valid],
+                                 minlength=self.hist.size).reshape(self.hist.shape)
+        self.below += np.bincount(slots, below_seconds, BUCKETS)
+
+    # Function to merge the buckets still inside the window ending at `now`
+    def summary(self, now):
+        current = int(now // self.width)
+        live = (self.bucket_ids > current - BUCKETS) & (self.bucket_ids <= current)
+        count = self.count[live].sum(axis=0)
+        total = self.sum[live].sum(axis=0)
+        low = self.min[live].min(axis=0, initial=np.inf)
+        high = self.max[live].max(axis=0, initial=-np.inf)
+        hist = self.hist[live].sum(axis=0)
+        result = {}
+        for i, channel in enumerate(CHANNELS):
+            n = int(count[i])
+            stats = {"count": n, "mean": total[i] / n if n else np.nan,
+                     "min": low[i] if n else np.nan, "max": high[i] if n else np.nan}
+            for q in PERCENTILES:
+                stats[f"p{q}"] = _histogram_percentile(hist[i], HISTOGRAM_RANGES[i], q) if n else np.nan
+            result[channel] = stats
+        result["below_threshold_seconds"] = float(self.below[live].sum())
+        return result
+
+
+# Function to estimate a percentile from a fixed-range histogram (linear within the bin)
+def _histogram_percentile(hist, value_range, q):
+    cumulative = np.cumsum(hist)
+    target = q / 100 * cumulative[-1]
+    index = int(np.searchsorted(cumulative, target, side="left"))
+    before = cumulative[index - 1] if index else 0
+    fraction = (target - before) / hist[index] if hist[index] else 0.0
+    lo, hi = value_range
+    return lo + (index + fraction) * (hi - lo) / len(hist)
+
+
+# Incremental per-farm and fleet-wide rollups over the 1m/1h/1d windows
+class AggregationEngine:
+    def __init__(self, windows=WINDOWS):
+        self.windows = windows
+        self.farms = {}  # farm_id -> {window name: WindowRollup}
+        self.fleet = self._new_rollups()
+        self.latest = None  # Newest reading time seen (epoch seconds), the default "now"
+        self._last_reading = {}  # (farm_id, plot_id) -> (epoch, water_level)
+
+    def _new_rollups(self):
+        return {name: WindowRollup(seconds) for name, seconds in self.windows.items()}
+
+    # Function to fold one reading (as produced by the acquisition engine) into the rollups
+    def add(self, reading):
+        epoch = to_epoch(reading["timestamp"])
+        farm_id = reading.get("farm_id") or DEFAULT_FARM
+        plot_id = reading.get("plot_id") or DEFAULT_PLOT
+        values = np.array([reading.get(channel, np.nan) for channel in CHANNELS], dtype=float)
+        lo, hi = HISTOGRAM_RANGES[:, 0], HISTOGRAM_RANGES[:, 1]
+        scaled = np.nan_to_num((values - lo) / (hi - lo) * HISTOGRAM_BINS)
+        bins = np.clip(scaled.astype(np.int64), 0, HISTOGRAM_BINS - 1)
+
+        # The interval since the plot's previous reading counts as time below the threshold
+        # when that previous reading was below it
+        below_seconds = 0.0
+        previous = self._last_reading.get((farm_id, plot_id))
+        if previous is not None and 0 < epoch - previous[0] <= MAX_GAP and previous[1] < WATER_THRESHOLD:
+            below_seconds = float(epoch - previous[0])
+        if previous is None or epoch >= previous[0]:
+            self._last_reading[(farm_id, plot_id)] = (epoch, values[WATER_CHANNEL])
+
+        rollups = self.farms.get(farm_id)
+        if rollups is None:
+            rollups = self.farms[farm_id] = self._new_rollups()
+        for name in self.windows:
+            rollups[name].add(epoch, values, bins, below_seconds)
+            self.fleet[name].add(epoch, values, bins, below_seconds)
+        if self.latest is None or epoch > self.latest:
+            self.latest = epoch
+
+    # Function to fold a batch of readings into the rollups: grouped per plot for the time below
+    # the threshold and per farm for the buckets, with vectorized updates instead of one per reading
+    def add_many(self, readings):
+        if not readings:
+            return
+        # Timestamps parsed in one go, as columns_from_records does
+        epochs = np.array([reading["timestamp"] for reading in readings], dtype="datetime64[s]").astype(np.int64)
+        values = np.array([[reading.get(channel, np.nan) for channel in CHANNELS] for reading in readings], dtype=float)
+        farms, plots = {}, {}  # farm_id / (farm_id, plot_id) -> code, in order of appearance
+        farm_codes = np.empty(len(readings), dtype=np.int64)
+        plot_codes = np.empty(len(readings), dtype=np.int64)
+        for i, reading in enumerate(readings):
+            farm_id = reading.get("farm_id") or DEFAULT_FARM
+            farm_codes[i] = farms.setdefault(farm_id, len(farms))
+            plot_codes[i] = plots.setdefault((farm_id, reading.get("plot_id") or DEFAULT_PLOT), len(plots))
+        lo, hi = HISTOGRAM_RANGES[:, 0], HISTOGRAM_RANGES[:, 1]
+        scaled = np.nan_to_num((values - lo) / (hi - lo) * HISTOGRAM_BINS)
+        bins = np.clip(scaled.astype(np.int64), 0, HISTOGRAM_BINS - 1)
+        below = self._below_seconds(list(plots), plot_codes, epochs, values[:, WATER_CHANNEL])
+
+        for name in self.windows:
+            self.fleet[name].add_many(epochs, values, bins, below)
+        order = np.argsort(farm_codes, kind="stable")
+        for farm_id, index in zip(farms, np.split(order, np.flatnonzero(np.diff(farm_codes[order])) + 1)):
+            rollups = self.farms.get(farm_id)
+            if rollups is None:
+                rollups = self.farms[farm_id] = self._new_rollups()
+            for name in self.windows:
+                rollups[name].add_many(epochs[index], values[index], bins[index], below[index])
+        newest = int(epochs.max())
+        if self.latest is None or newest > self.latest:
+            self.latest = newest
+
+    # Function to get each reading's seconds below the threshold as add() would, without a loop:
+    # readings are sorted by plot, each plot's group starts with its previous reading (or a
+    # placeholder too old to count), and the running newest reading of the group is its previous
+    def _below_seconds(self, keys, plot_codes, epochs, water):
+        order = np.argsort(plot_codes, kind="stable")
+        codes = plot_codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        placeholder = (int(epochs.min()) - MAX_GAP - 1, np.nan)
+        previous = [self._last_reading.get(keys[code], placeholder) for code in codes[starts]]
+        all_epochs = np.insert(epochs[order], starts, [epoch for epoch, _ in previous])
+        all_water = np.insert(water[order], starts, [level for _, level in previous])
+        all_codes = np.insert(codes, starts, codes[starts])
+        offset = all_codes << 40  # Keeps every plot's running maximum within its group
+        newest = np.maximum.accumulate(all_epochs + offset) - offset
+        positions = np.arange(len(all_epochs))
+        # Position of the newest reading so far in each group (ties go to the later one, as in add())
+        owner = np.maximum.accumulate(np.where(all_epochs == newest, positions, -1))
+        real = np.ones(len(all_epochs), dtype=bool)
+        real[starts + np.arange(len(starts))] = False
+        previous_at = owner[np.flatnonzero(real) - 1]
+        gap = all_epochs[real] - all_epochs[previous_at]
+        below = np.empty(len(epochs))
+        below[order] = np.where((gap > 0) & (gap <= MAX_GAP) & (all_water[previous_at] < WATER_THRESHOLD), gap, 0.0)
+        ends = np.r_[starts[1:] + np.arange(1, len(starts)), len(all_epochs)] - 1
+        for code, last in zip(codes[starts], owner[ends]):
+            if real[last]:
+                self._last_reading[keys[code]] = (int(all_epochs[last]), all_water[last])
+        return below
+
+    # Function to summarise one farm (or the whole fleet when farm_id is None) over a window
+    def summary(self, farm_id=None, window="1h", now=None):
+        now = self.latest if now is None else to_epoch(now)
+        if now is None:
+            now = 0
+        rollups = self.fleet if farm_id is None else self.farms.get(farm_id)
+        if rollups is None:
+            raise KeyError(f"Unknown farm: {farm_id}")
+        return rollups[window].summary(now)
+
+    # Function to build the manager report: every farm plus the fleet total
+    def report(self, window="1h", now=None):
+        rows = {farm_id: self.summary(farm_id, window, now) for farm_id in sorted(self.farms)}
+        rows["fleet"] = self.summary(None, window, now)
+        return rows
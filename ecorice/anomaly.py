@@ -0,0 +1,203 @@
+import math
+import threading
+from collections import deque
+from datetime import datetime
+from .acquisition import CHANNELS, DEFAULT_RANGES
+from .aggregation import MAX_GAP
+from .loader import DEFAULT_FARM, DEFAULT_PLOT
+from .store import EPOCH
+from .metrics import timed
+from . import metrics
+
+# Values outside these ranges are faults (by default the ranges of the installed sensors)
+VALID_RANGES = dict(DEFAULT_RANGES)
+# Weight of each new value in the running mean/variance; the first WARMUP values of a sensor are
+# averaged evenly (Welford) before spikes are judged against them
+ALPHA = 0.05
+WARMUP = 30
+# A value this many standard deviations from the running mean is a spike; the deviation is floored
+# at SPIKE_FLOOR of the valid range so very steady sensors do not flag every small step
+SPIKE_SIGMAS = 4.0
+SPIKE_FLOOR = 0.01
+# This many spikes in a row are taken as a real level change: the statistics start over
+SHIFT_SAMPLES = 5
+# A sensor repeating the same value for this many readings and this long is stuck
+FLAT_SAMPLES = 20
+FLAT_SECONDS = 1800
+FLAT_TOLERANCE = 1e-9
+# Readings of a plot further apart than this are a gap (the carbon accounting's limit)
+GAP_SECONDS = MAX_GAP
+# What happens to readings with faulty values: "mask" replaces the faulty values with NaN (missing
+# for storage, charts and credits), "drop" discards the whole reading, "tag" only marks it
+ACTIONS = ("mask", "drop", "tag")
+# Fault events kept until pop_alerts() takes them (the gateway logs them)
+ALERT_HISTORY = 256
+
+NAMES = {
+    "soil_moisture": "Soil moisture",
+    "water_level": "Water level",
+    "air_temp": "Air temperature",
+    "air_humidity": "Humidity",
+    "co2_emissions": "CO₂",
+}
+
+
+# Function to read a reading's timestamp ("YYYY-mm-dd HH:MM:SS", datetime or epoch) as epoch seconds
+def _epoch(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        return (timestamp - EPOCH).total_seconds()
+    return float(timestamp)
+
+
+# Running state of one sensor of one plot: EWMA mean and variance, the last value and its repeats
+class SensorState:
+    __slots__ = ("n", "mean", "var", "spikes", "last", "repeats", "repeat_since", "fault")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.spikes = 0  # Spikes in a row
+        self.last = None
+        self.repeats = 0  # Readings equal to `last` in a row, after the first
+        self.repeat_since = 0.0
+        self.fault = None  # Fault kind of the last reading, None when it was good
+
+
+# Online sensor-fault detector for the live reading stream. Every value costs a constant amount of
+# work and memory per sensor of each plot, so it sits between acquisition and storage:
+# out-of-range values, stuck (flat-lined) sensors, spikes and gaps between readings are flagged,
+# and faulty values are masked, dropped or only tagged ("faults": {channel: kind}) per `action`.
+class AnomalyDetector:
+    def __init__(self, ranges=None, action="mask", alpha=ALPHA, warmup=WARMUP, spike_sigmas=SPIKE_SIGMAS,
+                 flat_samples=FLAT_SAMPLES, flat_seconds=FLAT_SECONDS, gap_seconds=GAP_SECONDS):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown fault action {action!r}: expected one of {', '.join(ACTIONS)}")
+        self.ranges = dict(VALID_RANGES, **(ranges or {}))
+        self.action = action
+        self.alpha = alpha
+        self.warmup = warmup
+        self.spike_sigmas = spike_sigmas
+        self.flat_samples = flat_samples
+        self.flat_seconds = flat_seconds
+        self.gap_seconds = gap_seconds
+        self.alerts = deque(maxlen=ALERT_HISTORY)  # (timestamp, field, channel, kind, message), oldest first
+        self._floors = {channel: (SPIKE_FLOOR * (hi - lo)) ** 2 for channel, (lo, hi) in self.ranges.items()}
+        self._sensors = {}  # (field, channel) -> SensorState
+        self._last_seen = {}  # field -> epoch of its newest reading
+        self._gaps = {}  # field -> (message, epoch the gap ended)
+        self._active = {}  # field -> {channel: message} for sensors whose last value was faulty
+        self._lock = threading.Lock()  # Checks run on the acquisition side, messages are read by the UI
+
+    # Function to classify one value of a sensor and update its running statistics
+    def _classify(self, state, channel, value, epoch):
+        lo, hi = self.ranges.get(channel, (-math.inf, math.inf))
+        if not lo <= value <= hi:
+            return "range"
+
+        # Stuck sensor: the same value over and over
+        if state.last is not None and abs(value - state.last) <= FLAT_TOLERANCE:
+            state.repeats += 1
+        else:
+            state.repeats = 0
+            state.repeat_since = epoch
+        state.last = value
+        if state.repeats + 1 >= self.flat_samples and epoch - state.repeat_since >= self.flat_seconds:
+            return "flatline"
+
+        # Spike against the running mean; spikes are left out of the statistics
+        deviation = value - state.mean
+        if state.n >= self.warmup and deviation * deviation > self.spike_sigmas ** 2 * max(state.var, self._floors[channel]):
+            state.spikes += 1
+            if state.spikes >= SHIFT_SAMPLES:  # The level really changed: learn it again
+                state.n = state.spikes = 0
+                state.mean = state.var = 0.0
+            return "spike"
+        state.spikes = 0
+        state.n += 1
+        weight = max(self.alpha, 1.0 / state.n)
+        increment = weight * deviation
+        state.mean += increment
+        state.var = (1.0 - weight) * (state.var + deviation * increment)
+        return None
+
+    def _message(self, channel, kind, value, state):
+        name = NAMES.get(channel, channel)
+        if kind == "range":
+            lo, hi = self.ranges[channel]
+            return f"{name} sensor reads {value:.2f}, outside {lo:g}–{hi:g}: check the probe."
+        if kind == "flatline":
+            return f"{name} sensor has been stuck at {value:.2f} for {state.repeats + 1} readings: check the probe."
+        return f"{name} sensor spiked to {value:.2f} (expected about {state.mean:.2f}): reading ignored."
+
+    # Function to check one reading; returns it (masked or tagged per `action`), or None when dropped
+    @timed("anomaly.check")
+    def check(self, reading):
+        field = f"{reading.get('farm_id') or DEFAULT_FARM}/{reading.get('plot_id') or DEFAULT_PLOT}"
+        epoch = _epoch(reading["timestamp"])
+        faults = {}
+        with self._lock:
+            previous = self._last_seen.get(field)
+            if previous is None or epoch > previous:
+                self._last_seen[field] = epoch
+                if previous is not None and epoch - previous > self.gap_seconds:
+                    minutes = (epoch - previous) / 60
+                    message = f"No readings from {field} for {minutes:.0f} min: check the node and its link."
+                    self._gaps[field] = (message, epoch)
+                    self.alerts.append((reading["timestamp"], field, None, "gap", message))
+                    metrics.count("anomaly.gap")
+            active = self._active.setdefault(field, {})
+            for channel in CHANNELS:
+                value = reading.get(channel)
+                if value is None or value != value:
+                    continue  # Missing (e.g. already masked upstream): nothing to judge
+                state = self._sensors.get((field, channel))
+                if state is None:
+                    state = self._sensors[(field, channel)] = SensorState()
+                value = float(value)
+                kind = self._classify(state, channel, value, epoch)
+                if kind is None:
+                    state.fault = None
+                    active.pop(channel, None)
+                    continue
+                faults[channel] = kind
+                if kind != state.fault:  # Alert once when a fault starts, not on every reading
+                    message = self._message(channel, kind, value, state)
+                    self.alerts.append((reading["timestamp"], field, channel, kind, message))
+                    active[channel] = message
+                    metrics.count("anomaly." + kind)
+                state.fault = kind
+        if not faults:
+            return reading
+        if self.action == "drop":
+            metrics.count("anomaly.dropped")
+            return None
+        reading = dict(reading, faults=faults)
+        if self.action == "mask":
+            for channel in faults:
+                reading[channel] = math.nan
+        return reading
+
+    # Function to check a batch of readings; returns the ones kept, in order
+    def filter(self, readings):
+        checked = [self.check(reading) for reading in readings]
+        return [reading for reading in checked if reading is not None]
+
+    # Function to list the current sensor-fault messages of a plot (a recent gap included)
+    def messages(self, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT):
+        field = f"{farm_id or DEFAULT_FARM}/{plot_id or DEFAULT_PLOT}"
+        with self._lock:
+            messages = list(self._active.get(field, {}).values())
+            gap = self._gaps.get(field)
+            if gap is not None and self._last_seen[field] - gap[1] <= self.gap_seconds:
+                messages.append(gap[0])
+        return messages
+
+    # Function to take the alerts raised since the last call (for logging)
+    def pop_alerts(self):
+        with self._lock:
+            alerts = list(self.alerts)
+            self.alerts.clear()
+        return alerts
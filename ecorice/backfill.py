@@ -0,0 +1,199 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from .loader import SCHEMA, DEFAULT_FARM, DEFAULT_PLOT, check_header, parse_rows
+from .store import COLUMNS, FLOAT_COLUMNS, SECONDS_PER_DAY
+
+# Bytes of CSV parsed per task; files are cut at line boundaries into chunks of about this size
+CHUNK_BYTES = 16 << 20
+# Parsed chunks waiting in shared memory per worker, bounding memory on very large backfills
+IN_FLIGHT_PER_WORKER = 2
+
+
+# Function to read a "farm/plot=path" (or plain path, for the default plot) input spec
+def parse_spec(spec):
+    series, separator, path = spec.rpartition("=")
+    if not separator or "/" not in series:
+        return spec, DEFAULT_FARM, DEFAULT_PLOT
+    farm_id, plot_id = series.split("/", 1)
+    return path, farm_id, plot_id
+
+
+# Function to cut a file into line-aligned [start, end) byte ranges of about chunk_bytes
+def split_file(path, chunk_bytes=CHUNK_BYTES):
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as file:
+        while bounds[-1] + chunk_bytes < size:
+            file.seek(bounds[-1] + chunk_bytes)
+            file.readline()  # Move to the start of the next line
+            if file.tell() >= size:
+                break
+            bounds.append(file.tell())
+    return list(zip(bounds, bounds[1:] + [size]))
+
+
+# Function to place parsed columns in one shared-memory block (an 8-byte row per column);
+# returns the block name, or None for an empty chunk. The main process unlinks it.
+def _to_shared(columns):
+    rows = len(columns["timestamp"])
+    if not rows:
+        return None
+    block = shared_memory.SharedMemory(create=True, size=rows * len(COLUMNS) * 8)
+    table = np.ndarray((len(COLUMNS), rows), dtype="<f8", buffer=block.buf)
+    table[0].view("<i8")[:] = columns["timestamp"]
+    for row, column in enumerate(FLOAT_COLUMNS, 1):
+        table[row] = columns[column]
+    del table
+    name = block.name
+    block.close()
+    # Hand ownership to the main process: without this the worker's exit would unlink the block
+    resource_tracker.unregister(block._name, "shared_memory")
+    return name
+
+
+# Function to attach a worker's block and view it as store columns (caller closes and unlinks)
+def _from_shared(name, rows):
+    block = shared_memory.SharedMemory(name=name)
+    table = np.ndarray((len(COLUMNS), rows), dtype="<f8", buffer=block.buf)
+    columns = {"timestamp": table[0].view("<i8")}
+    for row, column in enumerate(FLOAT_COLUMNS, 1):
+        columns[column] = table[row]
+    return block, columns
+
+
+# Worker: parse and validate one byte range of a logger CSV with the loader's schema.
+# Returns (shared block name, rows, lines in the chunk, quarantined rows with chunk-relative lines).
+def parse_chunk(path, start, end):
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    lines = data.split(b"\n")
+    first_line = 1
+    if start == 0:
+        check_header(lines[0], SCHEMA, path)
+        lines, first_line = lines[1:], 2
+    parsed, quarantined, _ = parse_rows(lines, SCHEMA, "quarantine", first_line)
+    columns = {"timestamp": parsed["timestamp"].astype(np.int64)}
+    for column in FLOAT_COLUMNS:
+        columns[column] = parsed[column]
+    return _to_shared(columns), len(columns["timestamp"]), data.count(b"\n"), quarantined
+
+
+# Worker: roll up, evaluate the insight rules and compute the carbon day partials of one plot
+# over [start, end) epoch seconds (whole days), reading the rows phase one appended
+def analyze_series(root, farm_id, plot_id, start, end, rules_file=None):
+    from .store import FarmStore
+    from .rules import RuleEngine
+    from .carbon import day_partials
+    from .compaction import Compactor
+
+    store = FarmStore(root)
+    rebuilt, _ = Compactor(store, retention_days=None).compact_series(farm_id, plot_id)
+    engine = RuleEngine.from_file(rules_file) if rules_file else RuleEngine.from_file()
+    field = f"{farm_id}/{plot_id}"
+    active = {rule.name: 0 for rule in engine.rules}  # Readings each rule fired on
+    insights = []
+    partials = {}
+    for day, view in store.series(farm_id, plot_id).scan(FLOAT_COLUMNS, start, end):
+        partials[day] = day_partials(view["timestamp"], view["water_level"], view["co2_emissions"]).tolist()
+        batch = dict(view, field=np.full(len(view["timestamp"]), field))
+        results = engine.evaluate(batch)
+        for name, flags in results.items():
+            active[name] += int(flags.sum())
+        # Rules active at the plot's newest reading
+        insights = [rule.message for rule in engine.rules if results[rule.name][-1]]
+    return {"rebuilt": rebuilt, "rules": active, "insights": insights, "partials": partials}
+
+
+# Function to clean up after a failed phase one: cancel the chunks not started and unlink the
+# shared blocks of those that still finish (unregistered blocks would stay in /dev/shm until reboot)
+def _discard(pending):
+    for _, future in pending:
+        future.cancel()
+    for _, future in pending:
+        if future.cancelled():
+            continue
+        try:
+            name = future.result()[0]
+        except Exception:  # A failed chunk left no block
+            continue
+        if name is not None:
+            block = shared_memory.SharedMemory(name=name)
+            block.close()
+            block.unlink()
+    pending.clear()
+
+
+# Function to backfill logger CSV dumps into the store on a process pool. Phase one parses
+# line-aligned chunks of every file in parallel and appends them in file order; phase two rolls
+# up, evaluates the rules and accounts carbon for every plot it touched, one plot per task.
+# `inputs` are (path, farm_id, plot_id); returns {"series": {"farm/plot": summary}, ...timings}.
+# Rejected rows are appended to `quarantine` as (path, line, reason, raw line) when a list is given.
+def backfill_files(store, inputs, workers=None, chunk_bytes=CHUNK_BYTES, rules_file=None, quarantine=None):
+    from .carbon import PARTIAL_SUMS, carbon_balance
+
+    began = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    summary = {}
+    spans = {}  # (farm_id, plot_id) -> [first, last] epoch backfilled
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = [(number, path, farm_id, plot_id, start, end)
+                 for number, (path, farm_id, plot_id) in enumerate(inputs)
+                 for start, end in split_file(path, chunk_bytes)]
+        pending = deque()
+        lines_before = {}
+        index = 0
+        try:
+            while index < len(tasks) or pending:
+                while index < len(tasks) and len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                    _, path, _, _, start, end = tasks[index]
+                    pending.append((tasks[index], pool.submit(parse_chunk, path, start, end)))
+                    index += 1
+                # Results are taken in submission order, so every plot receives its rows in file order
+                (number, path, farm_id, plot_id, _, _), future = pending.popleft()
+                name, rows, lines, rejected = future.result()
+                offset = lines_before.get(number, 0)  # Lines of the file's earlier chunks
+                lines_before[number] = offset + lines
+                entry = summary.setdefault(f"{farm_id}/{plot_id}", {"rows": 0, "quarantined": 0})
+                entry["rows"] += rows
+                entry["quarantined"] += len(rejected)
+                if quarantine is not None:
+                    quarantine.extend((path, line + offset, reason, raw) for line, raw, reason in rejected)
+                if name is None:
+                    continue
+                block, columns = _from_shared(name, rows)
+                try:
+                    store.series(farm_id, plot_id).append_columns(columns)
+                    span = spans.setdefault((farm_id, plot_id), [columns["timestamp"].min(), columns["timestamp"].max()])
+                    span[0] = min(span[0], columns["timestamp"].min())
+                    span[1] = max(span[1], columns["timestamp"].max())
+                finally:
+                    del columns
+                    block.close()
+                    block.unlink()
+        finally:
+            _discard(pending)  # Only left over when a chunk failed
+        parse_seconds = time.perf_counter() - began
+
+        futures = {
+            key: pool.submit(analyze_series, store.root, *key,
+                             int(first) // SECONDS_PER_DAY * SECONDS_PER_DAY,
+                             (int(last) // SECONDS_PER_DAY + 1) * SECONDS_PER_DAY, rules_file)
+            for key, (first, last) in spans.items()
+        }
+        for (farm_id, plot_id), future in futures.items():
+            result = future.result()
+            partials = result.pop("partials")
+            total = np.sum(list(partials.values()), axis=0) if partials else np.zeros(len(PARTIAL_SUMS))
+            entry = summary[f"{farm_id}/{plot_id}"]
+            entry.update(result)
+            entry["days"] = len(partials)
+            entry["carbon"] = carbon_balance(total)
+            # Workers rewrote partitions and rollups behind this process's cached views
+            store.invalidate(farm_id, plot_id)
+    return {"series": summary, "chunks": len(tasks), "workers": workers,
+            "parse_seconds": parse_seconds, "seconds": time.perf_counter() - began}
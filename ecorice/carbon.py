@@ -0,0 +1,161 @@
+import os
+from datetime import date, datetime
+import numpy as np
+from .aggregation import WATER_THRESHOLD, MAX_GAP
+from .compaction import rollup_store
+from .finance import CARBON_PRICE_THB_PER_KG
+from .store import SECONDS_PER_DAY
+
+# Growing seasons as (first month, first day) .. (month, day) of the next season.
+# The dry season runs over the new year, so it is named after the year it starts in.
+SEASONS = {
+    "wet": ((5, 1), (11, 1)),
+    "dry": ((11, 1), (5, 1)),
+}
+# Calibration of the field chamber: kg CO₂-equivalent per ppm-hour above ambient,
+# applied to the emissions avoided while the field was dried instead of flooded
+KG_CO2E_PER_PPM_HOUR = 0.005
+# Per-day partial sums kept for every field day, in this order
+PARTIAL_SUMS = ("flooded_seconds", "flooded_ppm_seconds", "dried_seconds", "dried_ppm_seconds")
+
+
+# Function to get the [start, end) dates of a named season starting in `year`
+def season_bounds(name, year):
+    (start_month, start_day), (end_month, end_day) = SEASONS[name]
+    end_year = year + 1 if (end_month, end_day) <= (start_month, start_day) else year
+    return date(year, start_month, start_day), date(end_year, end_month, end_day)
+
+
+# Function to find the season (name, start year) a day falls in
+def season_of(day=None):
+    day = day or date.today()
+    if isinstance(day, datetime):
+        day = day.date()
+    for year in (day.year, day.year - 1):
+        for name in SEASONS:
+            start, end = season_bounds(name, year)
+            if start <= day < end:
+                return name, year
+    raise ValueError(f"No season covers {day}")
+
+
+# Function to compute the flooded/dried partial sums of one day partition in one vectorized pass.
+# Each reading holds until the next one (left Riemann sum); gaps over MAX_GAP and intervals
+# with a missing value count as no data, and so does the interval running past midnight.
+def day_partials(timestamps, water_level, co2_emissions, threshold=WATER_THRESHOLD):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) < 2:
+        return np.zeros(len(PARTIAL_SUMS))
+    water = np.asarray(water_level, dtype=float)[:-1]
+    co2 = np.asarray(co2_emissions, dtype=float)[:-1]
+    seconds = np.diff(timestamps).astype(float)
+    seconds[(seconds > MAX_GAP) | np.isnan(water) | np.isnan(co2)] = 0.0
+    flooded = water >= threshold
+    dried = ~flooded & ~np.isnan(water)
+    ppm_seconds = np.where(seconds > 0, co2, 0.0) * seconds
+    return np.array([
+        seconds[flooded].sum(), ppm_seconds[flooded].sum(),
+        seconds[dried].sum(), ppm_seconds[dried].sum(),
+    ])
+
+
+# Function to turn summed partials into a field's carbon balance against continuous flooding.
+# The baseline is the field's own mean flooded CO₂ level: had the dried intervals stayed
+# flooded they would have emitted at that level, so the difference is the avoided emission.
+def carbon_balance(partials, kg_per_ppm_hour=KG_CO2E_PER_PPM_HOUR, price=CARBON_PRICE_THB_PER_KG):
+    flooded_seconds, flooded_ppm_seconds, dried_seconds, dried_ppm_seconds = (float(value) for value in partials)
+    baseline_ppm = flooded_ppm_seconds / flooded_seconds if flooded_seconds else np.nan
+    dried_ppm = dried_ppm_seconds / dried_seconds if dried_seconds else np.nan
+    if flooded_seconds and dried_seconds:
+        avoided_ppm_hours = max(baseline_ppm * dried_seconds - dried_ppm_seconds, 0.0) / 3600
+    else:
+        avoided_ppm_hours = 0.0  # No baseline or nothing dried: no reduction can be claimed
+    co2_reduction = avoided_ppm_hours * kg_per_ppm_hour
+    return {
+        "flooded_hours": flooded_seconds / 3600,
+        "dried_hours": dried_seconds / 3600,
+        "baseline_ppm": float(baseline_ppm),
+        "dried_ppm": float(dried_ppm),
+        "co2_reduction_kg": co2_reduction,
+        "income_thb": co2_reduction * price,
+    }
+
+
+# Carbon-credit accounting over a FarmStore, with per-day partial sums cached in memory.
+# A cached day is reused while its timestamp column keeps the same size and mtime, so
+# re-querying a season only reads the days written since the last query.
+class CarbonAccountant:
+    def __init__(self, store, threshold=WATER_THRESHOLD, kg_per_ppm_hour=KG_CO2E_PER_PPM_HOUR,
+                 price=CARBON_PRICE_THB_PER_KG):
+        self.store = store
+        self.threshold = threshold
+        self.kg_per_ppm_hour = kg_per_ppm_hour
+        self.price = price
+        self._days = {}  # (farm_id, plot_id, day[, level]) -> (signature, partials)
+        self.recomputed = 0  # Day partitions recomputed by the last season_report
+
+    def _signature(self, table, day):
+        stat = os.stat(table._column_path(day, "timestamp"))
+        return stat.st_size, stat.st_mtime_ns
+
+    # Function to get cached partials of a day, recomputing them when its partition changed
+    def _day(self, key, table, day, compute):
+        signature = self._signature(table, day)
+        cached = self._days.get(key)
+        if cached is None or cached[0] != signature:
+            cached = self._days[key] = (signature, compute())
+            self.recomputed += 1
+        return cached[1]
+
+    # Function to get the partial sums of every day of one field in [start, end) dates. Days whose
+    # raw partition expired under the retention policy are accounted from their 1-minute rollups.
+    def field_partials(self, farm_id, plot_id, start, end):
+        series = self.store.series(farm_id, plot_id)
+        start_epoch = int(np.datetime64(start, "D").astype(np.int64)) * SECONDS_PER_DAY
+        end_epoch = int(np.datetime64(end, "D").astype(np.int64)) * SECONDS_PER_DAY
+        partials = {}
+        for day, view in series.scan(["water_level", "co2_emissions"], start_epoch, end_epoch):
+            # Days are whole partitions, so the views cover the full day
+            partials[day] = self._day((farm_id, plot_id, day), series, day, lambda: day_partials(
+                view["timestamp"], view["water_level"], view["co2_emissions"], self.threshold))
+        minutes = rollup_store(series, "1m")
+        names = ["water_level_sum", "water_level_count", "co2_emissions_sum", "co2_emissions_count"]
+        for day, view in minutes.scan(names, start_epoch, end_epoch):
+            if day in partials:
+                continue
+
+            # Function to account a day from its per-minute means (one reading per minute)
+            def from_minutes():
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    water = view["water_level_sum"] / view["water_level_count"]
+                    co2 = view["co2_emissions_sum"] / view["co2_emissions_count"]
+                return day_partials(view["timestamp"], water, co2, self.threshold)
+
+            partials[day] = self._day((farm_id, plot_id, day, "1m"), minutes, day, from_minutes)
+        return dict(sorted(partials.items()))
+
+    # Function to account one field over [start, end) dates
+    def field_balance(self, farm_id, plot_id, start, end):
+        partials = self.field_partials(farm_id, plot_id, start, end)
+        total = np.sum(list(partials.values()), axis=0) if partials else np.zeros(len(PARTIAL_SUMS))
+        balance = carbon_balance(total, self.kg_per_ppm_hour, self.price)
+        balance["days"] = len(partials)
+        return balance
+
+    # Function to account one field for a season (the current one by default)
+    def season_balance(self, farm_id, plot_id, name=None, year=None):
+        if name is None:
+            name, year = season_of()
+        balance = self.field_balance(farm_id, plot_id, *season_bounds(name, year))
+        balance["season"] = (name, year)
+        return balance
+
+    # Function to account every field (or one farm's fields) for a season, e.g. ("wet", 2025)
+    def season_report(self, name, year, farm_id=None):
+        start, end = season_bounds(name, year)
+        self.recomputed = 0
+        report = {}
+        for series_farm, plot_id in self.store.series_ids():
+            if farm_id is None or series_farm == farm_id:
+                report[f"{series_farm}/{plot_id}"] = self.field_balance(series_farm, plot_id, start, end)
+        return report
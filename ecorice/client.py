@@ -0,0 +1,153 @@
+import json
+import queue
+import threading
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+import numpy as np
+from .loader import DEFAULT_FARM, DEFAULT_PLOT
+
+# Seconds to wait for the server before a request fails
+TIMEOUT = 2.0
+# Seconds between RemoteFeed polls of the server's newest reading
+POLL_INTERVAL = 1.0
+
+
+# Thin client of `python -m ecorice serve`. It answers the store and carbon calls the dashboards
+# make, so they can chart and account a shared store without parsing any data themselves.
+# Responses are revalidated with their ETag, so unchanged data costs a 304 and no JSON parsing.
+class ApiClient:
+    def __init__(self, url, timeout=TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._cached = {}  # Request URL -> (etag, decoded response)
+
+    # Function to GET an endpoint as decoded JSON
+    def get(self, path, **params):
+        url = self.url + path
+        params = {key: value for key, value in params.items() if value is not None}
+        if params:
+            url += "?" + urlencode(params)
+        request = Request(url)
+        cached = self._cached.get(url)
+        if cached is not None:
+            request.add_header("If-None-Match", cached[0])
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                value = json.load(response)
+                if response.headers.get("ETag"):
+                    self._cached[url] = (response.headers["ETag"], value)
+                return value
+        except HTTPError as e:
+            if e.code == 304 and cached is not None:
+                return cached[1]
+            try:
+                message = json.load(e).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ValueError(f"{path}: {message}") from None
+
+    def series_ids(self):
+        return [tuple(series.split("/", 1)) for series in self.get("/api/series")["series"]]
+
+    # Function to get the newest reading of a plot as a reading dict (None before its first reading).
+    # Missing values (null, e.g. masked as faulty) come back as NaN, as in query().
+    def latest(self, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT):
+        reading = self.get("/api/latest", farm=farm_id, plot=plot_id)["latest"].get(f"{farm_id}/{plot_id}")
+        if reading is not None:
+            reading = {key: np.nan if value is None else value for key, value in reading.items()}
+            reading.update(farm_id=farm_id, plot_id=plot_id)
+        return reading
+
+    # Function matching FarmStore.query: columns over [start, end), timestamps as epoch seconds
+    def query(self, fields=None, start=None, end=None, farm=None, plot=None, resolution=None):
+        response = self.get("/api/readings", fields=",".join(fields) if fields else None, start=start, end=end,
+                            farm=farm, plot=plot, level=resolution)
+        data = {}
+        for name, values in response["columns"].items():  # Cached responses are shared: never modified
+            if name == "timestamp":
+                data[name] = np.array(values, dtype="datetime64[s]").astype(np.int64)
+            elif name == "field":
+                data[name] = np.array(values, dtype=str)
+            else:
+                data[name] = np.array([np.nan if value is None else value for value in values], dtype=float)
+        return data
+
+    # Function matching CarbonAccountant.season_balance for one plot
+    def season_balance(self, farm_id, plot_id, name=None, year=None):
+        response = self.get("/api/carbon", season=name, year=year, farm=farm_id)
+        balance = response["report"].get(f"{farm_id}/{plot_id}")
+        if balance is None:
+            raise ValueError(f"No carbon figures for {farm_id}/{plot_id}")
+        balance = {key: np.nan if value is None else value for key, value in balance.items()}
+        balance["season"] = (response["season"], response["year"])
+        return balance
+
+    def insights(self, farm_id=None, plot_id=None):
+        return self.get("/api/insights", farm=farm_id, plot=plot_id)["insights"]
+
+
+# Stand-in for an AcquisitionEngine that polls the server's newest reading instead of field nodes,
+# so a dashboard can run as a thin client of a gateway plus server. Like the engine it polls on its
+# own thread and hands readings over through a queue, so a slow or unreachable server never blocks
+# the Tk thread that drains it.
+class RemoteFeed:
+    def __init__(self, client, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT, detector=None,
+                 interval=POLL_INTERVAL, maxsize=1000):
+        self.client = client
+        self.detector = detector  # Optional AnomalyDetector screening the readings shown
+        self.farm_id = farm_id
+        self.plot_id = plot_id
+        self.interval = interval
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self._last = None  # Timestamp of the last reading handed out
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="remote-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            for reading in self.poll():
+                try:
+                    self.queue.put_nowait(reading)
+                except queue.Full:  # Nobody draining: the newest reading is what matters
+                    pass
+            self._stop.wait(self.interval)
+
+    # Function to fetch the newest reading when the server has one we have not shown; returns [] or [reading]
+    def poll(self):
+        try:
+            reading = self.client.latest(self.farm_id, self.plot_id)
+            self.error = None
+        except (OSError, ValueError) as e:  # Server down or restarting: retried on the next poll
+            self.error = e
+            return []
+        if reading is None or reading["timestamp"] == self._last:
+            return []
+        self._last = reading["timestamp"]
+        if self.detector is not None:
+            return self.detector.filter([reading])
+        return [reading]
+
+    # Function to take every reading polled since the last call without blocking (called from the Tk thread)
+    def drain(self, max_items=None):
+        readings = []
+        while max_items is None or len(readings) < max_items:
+            try:
+                readings.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return readings
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from .store import COLUMNS, FLOAT_COLUMNS, ColumnStore, SECONDS_PER_DAY, partition_for, to_epoch
+
+# Rollup levels as (name, bucket seconds, partition unit); each level is built from the one before
+LEVELS = [("1m", 60, "D"), ("1h", 3600, "M"), ("1d", 86400, "Y")]
+STATISTICS = ("count", "sum", "min", "max", "last")
+ROLLUP_COLUMNS = {"timestamp": COLUMNS["timestamp"]}  # Bucket start
+for _column in FLOAT_COLUMNS:
+    for _statistic in STATISTICS:
+        ROLLUP_COLUMNS[f"{_column}_{_statistic}"] = np.dtype("<i8") if _statistic == "count" else np.dtype("<f8")
+
+# Raw day partitions older than this are deleted once they are rolled up
+RETENTION_DAYS = 90
+# Seconds between background compaction runs
+COMPACT_INTERVAL = 3600
+# Most rows an "auto" query returns per plot before it switches to a coarser level
+POINT_BUDGET = 100_000
+# Raw partition signatures already rolled up, kept next to the plot's partitions
+COMPACTION_STATE = ".compaction.json"
+# State of a raw day removed by retention: its rows live on only in the rollups
+EXPIRED = "expired"
+
+_rollup_stores = {}
+
+
+# Function to get (creating on first use) the rollup table of one plot at one level
+def rollup_store(series, level):
+    path = os.path.join(series.root, ".rollup-" + level)
+    store = _rollup_stores.get(path)
+    if store is None:
+        unit = {name: unit for name, _, unit in LEVELS}[level]
+        store = _rollup_stores[path] = ColumnStore(path, ROLLUP_COLUMNS, unit)
+    return store
+
+
+# Function to forget the cached rollup tables of one plot (after another process rewrote them)
+def drop_rollup_stores(root):
+    for level, _, _ in LEVELS:
+        _rollup_stores.pop(os.path.join(root, ".rollup-" + level), None)
+
+
+# Function to get the [start, end) epoch range of a partition name ("2025-06-01", "2025-06" or "2025")
+def partition_range(name):
+    start = np.datetime64(name)
+    return int(start.astype("datetime64[s]").astype(np.int64)), int((start + 1).astype("datetime64[s]").astype(np.int64))
+
+
+# Function to list the raw days of one plot that retention removed (their rows live on only in the rollups)
+def expired_days(series):
+    state_path = os.path.join(series.root, COMPACTION_STATE)
+    if not os.path.exists(state_path):
+        return []
+    with open(state_path) as file:
+        state = json.load(file)
+    return sorted(day for day, value in state.items() if value == EXPIRED)
+
+
+# Function to take the last non-NaN value of every group starting at `starts`
+def _last_valid(values, starts):
+    positions = np.where(np.isnan(values), -1, np.arange(len(values)))
+    last = np.maximum.accumulate(positions)[np.r_[starts[1:], len(values)] - 1]
+    return np.where(last >= starts, values[np.maximum(last, 0)], np.nan)
+
+
+# Function to roll sorted columns into buckets of `width` seconds in one vectorized pass.
+# Raw columns hold readings; rollup columns hold the statistics of a finer level.
+def rollup(columns, width, raw=True):
+    timestamps = np.asarray(columns["timestamp"], dtype=np.int64)
+    if not len(timestamps):
+        return {name: np.empty(0, dtype=dtype) for name, dtype in ROLLUP_COLUMNS.items()}
+    buckets = timestamps // width * width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    result = {"timestamp": buckets[starts]}
+    for column in FLOAT_COLUMNS:
+        if raw:
+            values = np.asarray(columns[column], dtype=float)
+            valid = ~np.isnan(values)
+            result[f"{column}_count"] = np.add.reduceat(valid.astype(np.int64), starts)
+            result[f"{column}_sum"] = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            result[f"{column}_min"] = np.fmin.reduceat(values, starts)
+            result[f"{column}_max"] = np.fmax.reduceat(values, starts)
+            result[f"{column}_last"] = _last_valid(values, starts)
+        else:
+            result[f"{column}_count"] = np.add.reduceat(np.asarray(columns[f"{column}_count"]), starts)
+            result[f"{column}_sum"] = np.add.reduceat(np.asarray(columns[f"{column}_sum"]), starts)
+            result[f"{column}_min"] = np.fmin.reduceat(np.asarray(columns[f"{column}_min"]), starts)
+            result[f"{column}_max"] = np.fmax.reduceat(np.asarray(columns[f"{column}_max"]), starts)
+            result[f"{column}_last"] = _last_valid(np.asarray(columns[f"{column}_last"]), starts)
+    return result
+
+
+# Function to read rollup rows over [start, end) as the mean of each field plus its min and max
+def read_rollup(series, level, fields, start=None, end=None):
+    names = [f"{field}_{statistic}" for field in fields for statistic in ("count", "sum", "min", "max")]
+    data = rollup_store(series, level).read(names, start, end)
+    result = {"timestamp": data["timestamp"]}
+    for field in fields:
+        count = data[f"{field}_count"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[field] = np.where(count > 0, data[f"{field}_sum"] / count, np.nan)
+        result[f"{field}_min"] = data[f"{field}_min"]
+        result[f"{field}_max"] = data[f"{field}_max"]
+    return result
+
+
+# Function to pick the finest level that covers [start, end) within the point budget: "raw"
+# while the raw partitions are there and small enough, else the first rollup level that fits
+def choose_level(series, start=None, end=None, budget=POINT_BUDGET):
+    start = None if start is None else to_epoch(start)
+    end = None if end is None else to_epoch(end)
+    raw_days = series.partitions()
+    first_minute = rollup_store(series, LEVELS[0][0]).partitions()[:1]
+    expired = bool(first_minute) and (not raw_days or first_minute[0] < raw_days[0])
+    # Once retention has removed every raw day, only the rollups are left
+    if raw_days and (not expired or (start is not None and partition_for(start) >= raw_days[0])):
+        if sum(series._row_count(day) for day in series._partitions_between(start, end)) <= budget:
+            return "raw"
+    for level, width, _ in LEVELS:
+        table = rollup_store(series, level)
+        if sum(table._row_count(name) for name in table._partitions_between(start, end)) <= budget:
+            return level
+    return LEVELS[-1][0]
+
+
+# Rolls raw readings into 1m/1h/1d tables and expires raw partitions past the retention period.
+# A run only re-reads raw days whose files changed since the last run, and only rebuilds the
+# month and year rollups that contain them.
+class Compactor:
+    def __init__(self, store, retention_days=RETENTION_DAYS, interval=COMPACT_INTERVAL):
+        self.store = store
+        self.retention_days = retention_days
+        self.interval = interval
+        self.last_run = None  # Stats of the last run
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _signature(self, series, day):
+        stat = os.stat(series._column_path(day, "timestamp"))
+        return [stat.st_size, stat.st_mtime_ns]
+
+    # Function to compact one plot; returns (partitions rebuilt, raw days expired)
+    def compact_series(self, farm_id, plot_id, now=None):
+        series = self.store.series(farm_id, plot_id)
+        state_path = os.path.join(series.root, COMPACTION_STATE)
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path) as file:
+                state = json.load(file)
+        first = rollup_store(series, LEVELS[0][0])
+        width = LEVELS[0][1]
+        changed = []
+        for day in series.partitions():
+            if state.get(day) == self._signature(series, day) and day in first.partitions():
+                continue
+            with series._lock:  # Appends wait, so the signature covers exactly the rows read
+                series._sort_partition(day)
+                signature = self._signature(series, day)
+                columns = series.read(FLOAT_COLUMNS, *partition_range(day))
+                if state.get(day) == EXPIRED:
+                    # Late rows for a day retention already removed: merge them into the day's
+                    # rollup (rebuilding it from them alone would drop its history) and remove
+                    # them again, so the next run cannot merge them twice
+                    late = rollup(columns, width)
+                    if day in first.partitions():
+                        old = first.read(list(ROLLUP_COLUMNS), *partition_range(day))
+                        order = np.argsort(np.concatenate([old["timestamp"], late["timestamp"]]), kind="stable")
+                        late = rollup({name: np.concatenate([old[name], late[name]])[order] for name in ROLLUP_COLUMNS},
+                                      width, raw=False)
+                    first.replace_partition(day, late)
+                    series.remove_partition(day)
+                    changed.append(day)
+                    continue
+            first.replace_partition(day, rollup(columns, width))
+            state[day] = signature
+            changed.append(day)
+        rebuilt = len(changed)
+        # Each coarser level rebuilds only the partitions holding a changed finer partition
+        for (level, width, unit), (source, _, _) in zip(LEVELS[1:], LEVELS):
+            source_table, table = rollup_store(series, source), rollup_store(series, level)
+            missing = set(source_table.partitions()) and not table.partitions()
+            names = sorted({partition_for(partition_range(name)[0], unit)
+                            for name in (source_table.partitions() if missing else changed)})
+            for name in names:
+                columns = source_table.read(list(ROLLUP_COLUMNS), *partition_range(name))
+                table.replace_partition(name, rollup(columns, width, raw=False))
+            changed = names
+            rebuilt += len(names)
+        expired = 0
+        if self.retention_days is not None:
+            now = time.time() if now is None else to_epoch(now)
+            cutoff = partition_for(now - self.retention_days * SECONDS_PER_DAY)
+            for day in series.partitions():
+                with series._lock:  # No append between the check and the removal
+                    if day < cutoff and state.get(day) == self._signature(series, day):
+                        series.remove_partition(day)  # Only days whose rollups are current
+                        state[day] = EXPIRED
+                        expired += 1
+        with open(state_path + ".tmp", "w") as file:
+            json.dump(state, file)
+        os.replace(state_path + ".tmp", state_path)
+        return rebuilt, expired
+
+    # Function to compact every plot once; returns {"rebuilt": n, "expired": n, "seconds": t}
+    def run_once(self, now=None):
+        began = time.perf_counter()
+        rebuilt = expired = 0
+        for farm_id, plot_id in self.store.series_ids():
+            done, gone = self.compact_series(farm_id, plot_id, now)
+            rebuilt += done
+            expired += gone
+        self.last_run = {"rebuilt": rebuilt, "expired": expired, "seconds": time.perf_counter() - began}
+        return self.last_run
+
+    # Function to run compaction every `interval` seconds on a background thread
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ecorice-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.error = None
+            except Exception as e:  # Kept for the UI to show; the next run retries
+                self.error = e
+            self._stop.wait(self.interval)
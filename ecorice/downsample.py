@@ -0,0 +1,150 @@
+import numpy as np
+
+# Each pyramid level keeps the min and max of every group of this many points
+# of the level below, so a level is half the size of the one under it
+LEVEL_FACTOR = 4
+# Levels are not built below this many points (plotting that few is already cheap)
+MIN_LEVEL_POINTS = 512
+
+
+# Function to pick a point budget from the plot width in pixels
+def budget_from_width(width_px, mode="minmax"):
+    width_px = max(int(width_px), 1)
+    return 2 * width_px if mode == "minmax" else width_px
+
+
+# Function to downsample with min/max per bucket: keeps every peak and trough, in time order
+def minmax(x, y, budget):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    count = len(x)
+    buckets = max(budget // 2, 1)
+    if count <= budget or count < 2 * buckets:
+        return x, y
+    edges = np.linspace(0, count, buckets + 1).astype(np.intp)[:-1]
+    # NaN gaps must not win min/max, but a bucket that is all NaN stays NaN
+    filled_low = np.where(np.isnan(y), np.inf, y)
+    filled_high = np.where(np.isnan(y), -np.inf, y)
+    lo_index = _reduce_argext(filled_low, edges, np.minimum)
+    hi_index = _reduce_argext(filled_high, edges, np.maximum)
+    index = np.sort(np.concatenate([lo_index, hi_index]))
+    return x[index], y[index]
+
+
+# Function to find, for each bucket starting at `edges`, the index of its extreme value
+def _reduce_argext(values, edges, ufunc):
+    extremes = ufunc.reduceat(values, edges)
+    bucket = np.repeat(np.arange(len(edges)), np.diff(np.append(edges, len(values))))
+    hit = values == extremes[bucket]
+    # The first hit in each bucket: positions of hits, then the first per bucket
+    positions = np.flatnonzero(hit)
+    first = np.unique(bucket[positions], return_index=True)[1]
+    return positions[first]
+
+
+# Function to downsample with Largest-Triangle-Three-Buckets (keeps the visual shape)
+def lttb(x, y, budget):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    count = len(x)
+    if budget >= count or budget < 3:
+        return x, y
+    xf = x.astype(float)
+    edges = np.linspace(1, count - 1, budget - 1).astype(np.intp)
+    selected = np.empty(budget, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous = 0
+    for bucket in range(budget - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else count
+        # Average of the next bucket is the third vertex of the triangle
+        next_x = xf[stop:next_stop].mean()
+        next_y = np.nanmean(y[stop:next_stop]) if np.isfinite(y[stop:next_stop]).any() else y[previous]
+        areas = np.abs(
+            (xf[previous] - next_x) * (y[start:stop] - y[previous])
+            - (xf[previous] - xf[start:stop]) * (next_y - y[previous])
+        )
+        areas = np.where(np.isnan(areas), -1.0, areas)
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return x[selected], y[selected]
+
+
+# Growable 1-D buffer used for the pyramid levels (amortised O(1) append)
+class _Buffer:
+    def __init__(self, dtype):
+        self.data = np.empty(0, dtype=dtype)
+        self.size = 0
+
+    def view(self):
+        return self.data[:self.size]
+
+    def truncate(self, size):
+        self.size = min(self.size, size)
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data), 1024), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+
+# Precomputed min/max levels of one series so any zoom level renders from a small slice
+class Pyramid:
+    def __init__(self, x=None, y=None, mode="minmax"):
+        self.mode = mode
+        self.levels = [(_Buffer("f8"), _Buffer("f8"))]
+        if x is not None:
+            self.extend(x, y)
+
+    def __len__(self):
+        return self.levels[0][0].size
+
+    # Function to append points (x must keep increasing) and update the affected level tails
+    def extend(self, x, y):
+        if len(x) == 0:
+            return
+        base_x, base_y = self.levels[0]
+        base_x.extend(np.asarray(x, dtype=float))
+        base_y.extend(np.asarray(y, dtype=float))
+        level = 0
+        while self.levels[level][0].size >= MIN_LEVEL_POINTS * LEVEL_FACTOR // 2:
+            if level + 1 == len(self.levels):
+                self.levels.append((_Buffer("f8"), _Buffer("f8")))
+            self._rebuild_tail(level)
+            level += 1
+
+    def _rebuild_tail(self, level):
+        below_x, below_y = self.levels[level]
+        above_x, above_y = self.levels[level + 1]
+        # The last group may have been partial last time, so recompute from it
+        first_group = max(above_x.size // 2 - 1, 0)
+        start = first_group * LEVEL_FACTOR
+        tail_x, tail_y = below_x.view()[start:], below_y.view()[start:]
+        edges = np.arange(0, len(tail_x), LEVEL_FACTOR)
+        lo = _reduce_argext(np.where(np.isnan(tail_y), np.inf, tail_y), edges, np.minimum)
+        hi = _reduce_argext(np.where(np.isnan(tail_y), -np.inf, tail_y), edges, np.maximum)
+        index = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()  # Exactly two points per group
+        new_x, new_y = tail_x[index], tail_y[index]
+        above_x.truncate(2 * first_group)
+        above_y.truncate(2 * first_group)
+        above_x.extend(new_x)
+        above_y.extend(new_y)
+
+    # Function to return at most ~budget points covering [x0, x1] (None = unbounded)
+    def select(self, x0=None, x1=None, budget=2000):
+        # The finest level with few enough points in range; the coarsest one as a last resort
+        for number, (level_x, level_y) in enumerate(self.levels):
+            xs = level_x.view()
+            lo = 0 if x0 is None else max(int(np.searchsorted(xs, x0, side="left")) - 1, 0)
+            hi = len(xs) if x1 is None else min(int(np.searchsorted(xs, x1, side="right")) + 1, len(xs))
+            if hi - lo <= budget * LEVEL_FACTOR or number == len(self.levels) - 1:
+                break
+        xs, ys = xs[lo:hi], level_y.view()[lo:hi]
+        if self.mode == "lttb":
+            return lttb(xs, ys, budget)
+        return minmax(xs, ys, budget)
@@ -0,0 +1,219 @@
+import os
+import gzip
+import itertools
+import numpy as np
+from .loader import SCHEMA, DEFAULT_FARM, DEFAULT_PLOT, parse_rows, check_header
+from .store import FLOAT_COLUMNS, to_epoch
+from .compaction import expired_days, partition_range
+
+# Hand-off formats: chunked Parquet for analytics, Arrow IPC for zero-copy loading,
+# gzip CSV for tools that only read text
+FORMATS = ("parquet", "arrow", "csv.gz")
+# Layout of exported CSV files: the logger columns plus the farm/plot of every row
+EXCHANGE_SCHEMA = SCHEMA[:6] + [("farm_id", "U64", True), ("plot_id", "U64", True)]
+# Decimals written to CSV; the sensors resolve far less than full float precision
+CSV_PRECISION = 4
+# gzip level of exported CSV: level 6 compresses several times slower for files about 10% smaller
+CSV_COMPRESSLEVEL = 1
+# Rows read per chunk on import, bounding memory whatever the file size
+BATCH_ROWS = 65536
+
+
+# Function to import pyarrow, which only the Parquet and Arrow formats need
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow files need pyarrow (pip install pyarrow); csv.gz works without it") from None
+    return pyarrow
+
+
+# Function to infer the format from a file name
+def format_for(path):
+    name = path.lower()
+    if name.endswith(".parquet"):
+        return "parquet"
+    if name.endswith((".arrow", ".feather", ".ipc")):
+        return "arrow"
+    if name.endswith(".csv.gz"):
+        return "csv.gz"
+    if name.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"Cannot tell the format of {path!r}; expected one of {FORMATS} or csv")
+
+
+# Generator yielding (farm_id, plot_id, columns) one day partition at a time
+def iter_history(store, start=None, end=None, farm=None, plot=None):
+    for farm_id, plot_id in store.series_ids():
+        if (farm is None or farm_id == farm) and (plot is None or plot_id == plot):
+            for _, view in store.series(farm_id, plot_id).scan(FLOAT_COLUMNS, start, end):
+                yield farm_id, plot_id, view
+
+
+def _arrow_schema(pa):
+    return pa.schema(
+        [("timestamp", pa.timestamp("s")),
+         ("farm_id", pa.dictionary(pa.int32(), pa.string())),
+         ("plot_id", pa.dictionary(pa.int32(), pa.string()))]
+        + [(column, pa.float64()) for column in FLOAT_COLUMNS]
+    )
+
+
+# Function to wrap one partition's columns as a record batch (float and time columns are not copied).
+# Every batch shares the same farm and plot dictionaries, as Arrow IPC files allow only one per field.
+def _record_batch(pa, schema, farms, plots, farm_id, plot_id, view):
+    rows = len(view["timestamp"])
+    arrays = [
+        pa.array(np.asarray(view["timestamp"]), type=pa.timestamp("s")),
+        pa.DictionaryArray.from_arrays(pa.array(np.full(rows, farms.index(farm_id), dtype=np.int32)), pa.array(farms)),
+        pa.DictionaryArray.from_arrays(pa.array(np.full(rows, plots.index(plot_id), dtype=np.int32)), pa.array(plots)),
+    ] + [pa.array(np.asarray(view[column])) for column in FLOAT_COLUMNS]
+    return pa.record_batch(arrays, schema=schema)
+
+
+# Function to format one partition as CSV text with one %-template per row
+def _csv_lines(farm_id, plot_id, view):
+    timestamps = np.char.replace(np.datetime_as_string(np.asarray(view["timestamp"]).astype("datetime64[s]")), "T", " ")
+    template = "%s" + f",%.{CSV_PRECISION}f" * len(FLOAT_COLUMNS) + f",{farm_id},{plot_id}"
+    rows = zip(timestamps.tolist(), *(np.asarray(view[column]).tolist() for column in FLOAT_COLUMNS))
+    return "\n".join(map(template.__mod__, rows)) + "\n"
+
+
+# Function to list (farm_id, plot_id, day) of the days in a selection that retention removed
+def expired_history(store, start=None, end=None, farm=None, plot=None):
+    start = None if start is None else to_epoch(start)
+    end = None if end is None else to_epoch(end)
+    expired = []
+    for farm_id, plot_id in store.series_ids():
+        if (farm is None or farm_id == farm) and (plot is None or plot_id == plot):
+            for day in expired_days(store.series(farm_id, plot_id)):
+                first, last = partition_range(day)
+                if (start is None or last > start) and (end is None or first < end):
+                    expired.append((farm_id, plot_id, day))
+    return expired
+
+
+# Function to stream the sensor history to a Parquet, Arrow IPC or gzip CSV file; returns rows written.
+# One day partition is held at a time, and the file only replaces `path` once complete.
+# Only raw readings are exported: days removed by retention, which live on only as rollups, are left
+# out (expired_history lists them) rather than mixing bucket means in with readings.
+def export_history(store, path, fmt=None, start=None, end=None, farm=None, plot=None):
+    fmt = fmt or format_for(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {FORMATS}")
+    chunks = iter_history(store, start, end, farm, plot)
+    temp = path + ".tmp"
+    rows = 0
+    if fmt == "csv.gz":
+        with gzip.open(temp, "wt", compresslevel=CSV_COMPRESSLEVEL, newline="") as file:
+            file.write(",".join(name for name, _, _ in EXCHANGE_SCHEMA) + "\n")
+            for farm_id, plot_id, view in chunks:
+                file.write(_csv_lines(farm_id, plot_id, view))
+                rows += len(view["timestamp"])
+    else:
+        pa = _pyarrow()
+        schema = _arrow_schema(pa)
+        series_ids = store.series_ids()
+        farms = sorted({farm_id for farm_id, _ in series_ids})
+        plots = sorted({plot_id for _, plot_id in series_ids})
+        if fmt == "parquet":
+            # Farm/plot ids are dictionary encoded, timestamps delta encoded and floats byte-split
+            # ahead of zstd; every partition becomes one row group
+            encodings = {"timestamp": "DELTA_BINARY_PACKED"}
+            encodings.update({column: "BYTE_STREAM_SPLIT" for column in FLOAT_COLUMNS})
+            writer = pa.parquet.ParquetWriter(temp, schema, compression="zstd",
+                                              use_dictionary=["farm_id", "plot_id"], column_encoding=encodings)
+        else:
+            # Uncompressed, so readers can memory-map the batches without copying
+            writer = pa.ipc.new_file(temp, schema)
+        with writer:
+            for farm_id, plot_id, view in chunks:
+                writer.write_batch(_record_batch(pa, schema, farms, plots, farm_id, plot_id, view))
+                rows += len(view["timestamp"])
+    os.replace(temp, path)
+    return rows
+
+
+# Function to split a chunk with farm/plot columns into per-plot column dicts
+def _split_series(farm_ids, plot_ids, columns):
+    keys = np.char.add(np.char.add(farm_ids.astype(str), "/"), plot_ids.astype(str))
+    for key in np.unique(keys):
+        index = np.flatnonzero(keys == key)
+        farm_id, plot_id = str(key).split("/", 1)
+        if len(index) == len(keys):
+            yield farm_id, plot_id, columns
+        else:
+            yield farm_id, plot_id, {name: values[index] for name, values in columns.items()}
+
+
+# Function to get a (possibly dictionary encoded) Arrow string column as a NumPy array
+def _strings(pa, column):
+    if pa.types.is_dictionary(column.type):
+        return np.asarray(column.dictionary.to_pylist(), dtype=str)[column.indices.to_numpy()]
+    return np.asarray(column.to_pylist(), dtype=str)
+
+
+# Function to turn a record batch into per-plot columns (timestamps as epoch seconds)
+def _from_batch(pa, batch):
+    # Parquet keeps second timestamps as milliseconds, so convert back to seconds first
+    columns = {"timestamp": batch.column("timestamp").cast(pa.timestamp("s")).cast(pa.int64()).to_numpy()}
+    for column in FLOAT_COLUMNS:
+        # Zero-copy when the column has no nulls (always the case for exported files)
+        columns[column] = batch.column(column).to_numpy(zero_copy_only=False)
+    return _split_series(_strings(pa, batch.column("farm_id")), _strings(pa, batch.column("plot_id")), columns)
+
+
+# Function to read CSV chunks; the logger layout (no farm/plot columns) goes to the given plot.
+# Rejected rows are appended to `quarantine` as (path, line, reason, raw line) when a list is given.
+def _iter_csv(path, fmt, farm_id, plot_id, batch_rows, quarantine):
+    with (gzip.open(path, "rb") if fmt == "csv.gz" else open(path, "rb")) as file:
+        header = file.readline().rstrip(b"\r\n")
+        schema = EXCHANGE_SCHEMA if b"farm_id" in header.split(b",") else SCHEMA
+        check_header(header, schema, path)
+        line = 2
+        while True:
+            rows = [row.rstrip(b"\r\n") for row in itertools.islice(file, batch_rows)]
+            if not rows:
+                return
+            parsed, rejected, _ = parse_rows(rows, schema, "quarantine", first_line=line)
+            line += len(rows)
+            if quarantine is not None:
+                quarantine.extend((path, number, reason, raw) for number, raw, reason in rejected)
+            columns = {"timestamp": parsed["timestamp"].astype(np.int64)}
+            for column in FLOAT_COLUMNS:
+                columns[column] = parsed[column]
+            if schema is SCHEMA:
+                yield farm_id, plot_id, columns
+            else:
+                yield from _split_series(parsed["farm_id"], parsed["plot_id"], columns)
+
+
+# Generator yielding (farm_id, plot_id, columns) chunks of at most batch_rows rows from an exported file.
+# CSV rows that do not parse are skipped, and appended to `quarantine` when a list is given.
+def iter_import(path, fmt=None, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT, batch_rows=BATCH_ROWS, quarantine=None):
+    fmt = fmt or format_for(path)
+    if fmt in ("csv", "csv.gz"):
+        yield from _iter_csv(path, fmt, farm_id, plot_id, batch_rows, quarantine)
+    elif fmt == "parquet":
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            yield from _from_batch(pa, batch)
+    elif fmt == "arrow":
+        pa = _pyarrow()
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield from _from_batch(pa, reader.get_batch(i))
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}")
+
+
+# Function to append an exported file (or a logger CSV) to the store chunk by chunk; returns rows imported.
+# Rejected rows are appended to `quarantine` as (path, line, reason, raw line) when a list is given.
+def import_history(store, path, fmt=None, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT, quarantine=None):
+    rows = 0
+    for series_farm, series_plot, columns in iter_import(path, fmt, farm_id, plot_id, quarantine=quarantine):
+        rows += store.series(series_farm, series_plot).append_columns(columns)
+    return rows
@@ -0,0 +1,7 @@
+# Assumed carbon credit price (THB per kg of CO₂ reduced)
+CARBON_PRICE_THB_PER_KG = 0.5
+
+
+# Function to calculate net profit (negative for a loss) from total cost and revenue
+def net_profit(cost, revenue):
+    return float(revenue) - float(cost)
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+from .loader import SCHEMA, parse_rows, check_header
+
+
+# Follows a growing sensor CSV, parsing only the bytes appended since the last refresh
+class CsvFollower:
+    def __init__(self, filename="ecorice_data.csv", schema=SCHEMA, on_error="quarantine",
+                 keep_history=True, state=None):
+        self.filename = filename
+        self.schema = schema
+        self.on_error = on_error
+        self.keep_history = keep_history
+        self.quarantined = []
+        self.resets = 0  # Truncations/rotations seen
+        self._clear()
+        if state:
+            self.offset = state["offset"]
+            self.lines = state["lines"]
+            self.rows = state["rows"]
+            self.identity = tuple(state["identity"]) if state.get("identity") else None
+
+    # Function to forget everything read so far (used on truncation or rotation)
+    def reset(self):
+        self._clear()
+        self.resets += 1
+
+    def _clear(self):
+        self.offset = 0  # Byte offset just past the last complete line consumed
+        self.lines = 0  # Lines consumed, including the header
+        self.rows = 0  # Rows accepted by the parser
+        self.identity = None  # (st_dev, st_ino) of the file being followed
+        self._size = 0
+        self._buffers = {name: np.empty(0, dtype=dtype) for name, dtype, _ in self.schema}
+
+    # Resume point that can be persisted and passed back as `state`
+    def state(self):
+        return {"offset": self.offset, "lines": self.lines, "rows": self.rows,
+                "identity": list(self.identity) if self.identity else None}
+
+    # In-memory history accumulated so far (views, no copy)
+    @property
+    def history(self):
+        return {name: values[:self._size] for name, values in self._buffers.items()}
+
+    # Function to read and parse newly appended rows; returns the new rows as columns
+    def refresh(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return self._empty()  # Mid-rotation: the new file is not there yet
+        identity = (stat.st_dev, stat.st_ino)
+        if self.identity is not None and (identity != self.identity or stat.st_size < self.offset):
+            self.reset()  # Rotated (new inode) or truncated in place
+        self.identity = identity
+        if stat.st_size == self.offset:
+            return self._empty()
+
+        with open(self.filename, "rb") as file:
+            file.seek(self.offset)
+            data = file.read(stat.st_size - self.offset)
+        end = data.rfind(b"\n")
+        if end < 0:
+            return self._empty()  # Only a partial line so far; wait for its newline
+        data = data[:end + 1]
+        lines = data.split(b"\n")[:-1]
+        first_line = self.lines + 1
+        if self.offset == 0:
+            check_header(lines.pop(0), self.schema, self.filename)
+            first_line += 1
+        columns, quarantined, _ = parse_rows(lines, self.schema, self.on_error, first_line)
+
+        self.offset += len(data)
+        self.lines = first_line - 1 + len(lines)
+        self.rows += len(columns["timestamp"])
+        self.quarantined.extend(quarantined)
+        if self.keep_history:
+            self._append_history(columns)
+        return columns
+
+    def _empty(self):
+        return {name: np.empty(0, dtype=dtype) for name, dtype, _ in self.schema}
+
+    # Function to append to the history buffers, growing them geometrically
+    def _append_history(self, columns):
+        count = len(columns["timestamp"])
+        needed = self._size + count
+        for name, values in self._buffers.items():
+            if needed > len(values):
+                grown = np.empty(max(needed, 2 * len(values), 1024), dtype=values.dtype)
+                grown[:self._size] = values[:self._size]
+                self._buffers[name] = values = grown
+            values[self._size:needed] = columns[name]
+        self._size = needed
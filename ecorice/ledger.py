@@ -0,0 +1,212 @@
+import math
+import sqlite3
+import threading
+from datetime import date, datetime
+from .carbon import season_of
+from .finance import net_profit
+from .loader import DEFAULT_FARM
+
+# Default ledger database, next to the sensor store
+LEDGER_FILE = "ecorice_ledger.db"
+# Entry categories and whether they are a cost or revenue of the household
+CATEGORIES = {
+    "fertilizer": "cost",
+    "water": "cost",
+    "labour": "cost",
+    "seed": "cost",
+    "sales": "revenue",
+    "carbon_credits": "revenue",
+}
+
+# Entries are the source of truth; `totals` holds one running cost/revenue row per farm, season and
+# category, updated in the same transaction as every entry insert, update or delete. Summaries read
+# those few rows instead of summing years of entries.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    farm_id TEXT NOT NULL,
+    season TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('cost', 'revenue')),
+    amount REAL NOT NULL CHECK (amount >= 0),
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS entries_by_season ON entries (farm_id, year, season, day);
+CREATE INDEX IF NOT EXISTS entries_by_day ON entries (day);
+
+CREATE TABLE IF NOT EXISTS totals (
+    farm_id TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    season TEXT NOT NULL,
+    category TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (farm_id, year, season, category)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS totals_by_season ON totals (year, season);
+"""
+
+
+# Function to read a day given as a date, datetime or "YYYY-mm-dd" string (today by default)
+def _to_date(day):
+    if day is None:
+        return date.today()
+    if isinstance(day, datetime):
+        return day.date()
+    if isinstance(day, str):
+        return date.fromisoformat(day[:10])
+    return day
+
+
+# Persistent household account: cost and revenue entries per farm in SQLite, booked to the growing
+# season of their day, with running profit/loss totals per farm, season and category.
+class Ledger:
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Function to validate one entry and turn it into an `entries` row
+    def _row(self, farm_id, category, amount, day=None, note=""):
+        kind = CATEGORIES.get(category)
+        if kind is None:
+            raise ValueError(f"Unknown category {category!r}: expected one of {', '.join(CATEGORIES)}")
+        amount = float(amount)
+        if not (math.isfinite(amount) and amount >= 0):
+            raise ValueError(f"Amount must be a finite number, zero or more, got {amount}")
+        day = _to_date(day)
+        name, year = season_of(day)
+        return farm_id, name, year, day.isoformat(), category, kind, amount, note
+
+    # Function to add (sign=1) or take back (sign=-1) entry rows in the running totals, summed per
+    # farm, season and category first, so a bulk import costs one write per total it touches
+    def _book(self, rows, sign=1):
+        deltas = {}
+        for farm_id, name, year, _, category, kind, amount, _ in rows:
+            delta = deltas.setdefault((farm_id, year, name, category), [0.0, 0.0, 0])
+            delta[kind == "revenue"] += sign * amount
+            delta[2] += sign
+        self._db.executemany(
+            "INSERT INTO totals (farm_id, year, season, category, cost, revenue, entries)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET cost = cost + excluded.cost,"
+            " revenue = revenue + excluded.revenue, entries = entries + excluded.entries",
+            [(*key, *delta) for key, delta in deltas.items()])
+        if sign < 0:  # Drop totals left without entries
+            self._db.executemany(
+                "DELETE FROM totals WHERE farm_id = ? AND year = ? AND season = ? AND category = ? AND entries <= 0",
+                list(deltas))
+
+    def _insert(self, rows):
+        self._db.executemany(
+            "INSERT INTO entries (farm_id, season, year, day, category, kind, amount, note)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._book(rows)
+
+    # Function to take an entry out of the ledger and its totals; returns its row
+    def _delete(self, entry_id):
+        row = self._db.execute(
+            "SELECT farm_id, season, year, day, category, kind, amount, note FROM entries WHERE id = ?",
+            (entry_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"No ledger entry {entry_id}")
+        self._db.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+        self._book([row], -1)
+        return row
+
+    # Function to book one cost or revenue entry; returns its id
+    def add(self, category, amount, day=None, farm_id=DEFAULT_FARM, note=""):
+        row = self._row(farm_id, category, amount, day, note)
+        with self._lock, self._db:
+            entry_id = self._db.execute(
+                "INSERT INTO entries (farm_id, season, year, day, category, kind, amount, note)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row).lastrowid
+            self._book([row])
+        return entry_id
+
+    # Function to book many (farm_id, category, amount, day, note) entries in one transaction,
+    # e.g. a cooperative's season import; nothing is booked if any entry is invalid
+    def add_many(self, entries):
+        rows = [self._row(*entry) for entry in entries]
+        with self._lock, self._db:
+            self._insert(rows)
+        return len(rows)
+
+    # Function to correct an entry's category, amount, day or note (it keeps its id)
+    def update(self, entry_id, category, amount, day=None, note=""):
+        with self._lock, self._db:
+            farm_id = self._delete(entry_id)[0]
+            row = self._row(farm_id, category, amount, day, note)
+            self._db.execute(
+                "INSERT INTO entries (id, farm_id, season, year, day, category, kind, amount, note)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (entry_id, *row))
+            self._book([row])
+
+    def remove(self, entry_id):
+        with self._lock, self._db:
+            self._delete(entry_id)
+
+    # Function to list a farm's entries of a season (the current one by default), newest first
+    def entries(self, farm_id=DEFAULT_FARM, name=None, year=None, limit=None):
+        if name is None or year is None:
+            name, year = season_of()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, day, category, kind, amount, note FROM entries"
+                " WHERE farm_id = ? AND year = ? AND season = ? ORDER BY day DESC, id DESC LIMIT ?",
+                (farm_id, year, name, -1 if limit is None else limit)).fetchall()
+        return [dict(zip(("id", "day", "category", "kind", "amount", "note"), row)) for row in rows]
+
+    # Function to summarize a season (the current one by default) for one farm, or for every farm
+    # with farm_id=None: {"season", "cost", "revenue", "net", "categories": {category: amount}}
+    def season_summary(self, farm_id=DEFAULT_FARM, name=None, year=None):
+        if name is None or year is None:
+            name, year = season_of()
+        query = "SELECT category, SUM(cost), SUM(revenue) FROM totals WHERE year = ? AND season = ?"
+        params = [year, name]
+        if farm_id is not None:
+            query += " AND farm_id = ?"
+            params.append(farm_id)
+        with self._lock:
+            rows = self._db.execute(query + " GROUP BY category", params).fetchall()
+        categories = {category: cost + revenue for category, cost, revenue in rows}
+        cost = sum(row[1] for row in rows)
+        revenue = sum(row[2] for row in rows)
+        return {"season": (name, year), "cost": cost, "revenue": revenue,
+                "net": net_profit(cost, revenue), "categories": categories}
+
+    # Function to get a farm's (or with farm_id=None every farm's) profit/loss per season, newest first:
+    # [{"season": (name, year), "cost", "revenue", "net"}]
+    def season_history(self, farm_id=DEFAULT_FARM):
+        query = "SELECT season, year, SUM(cost), SUM(revenue) FROM totals"
+        params = []
+        if farm_id is not None:
+            query += " WHERE farm_id = ?"
+            params.append(farm_id)
+        with self._lock:
+            rows = self._db.execute(query + " GROUP BY year, season", params).fetchall()
+        history = [{"season": (name, year), "cost": cost, "revenue": revenue, "net": net_profit(cost, revenue)}
+                   for name, year, cost, revenue in rows]
+        # Newest season first: the dry season of a year starts after its wet season
+        return sorted(history, key=lambda entry: (entry["season"][1], entry["season"][0] == "dry"), reverse=True)
+
+    # Function to recompute every running total from the entries (after editing the file by hand)
+    def rebuild_totals(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM totals")
+            self._db.execute(
+                "INSERT INTO totals (farm_id, year, season, category, cost, revenue, entries)"
+                " SELECT farm_id, year, season, category,"
+                " SUM(CASE kind WHEN 'cost' THEN amount ELSE 0 END),"
+                " SUM(CASE kind WHEN 'revenue' THEN amount ELSE 0 END), COUNT(*)"
+                " FROM entries GROUP BY farm_id, year, season, category")
@@ -0,0 +1,171 @@
+import os
+import numpy as np
+
+# Declared layout of ecorice_data.csv. The field loggers append two weather-station
+# channels after the six columns named in the header, so those are declared as
+# optional trailing columns instead of ending up under csv.DictReader's None key.
+SCHEMA = [
+    ("timestamp", "datetime64[s]", True),
+    ("soil_moisture", "f8", True),  # Percentage
+    ("water_level", "f8", True),  # cm
+    ("air_temp", "f8", True),  # Celsius
+    ("air_humidity", "f8", True),  # Percentage
+    ("co2_emissions", "f8", True),  # ppm
+    ("solar_radiation", "f8", False),  # W/m², logger-only
+    ("rainfall", "f8", False),  # mm, logger-only
+]
+
+# Every reading belongs to a farm and a plot (field) within it. Rows from the
+# logger CSV and other sources without identifiers are attributed to the defaults.
+FARM_KEYS = ("farm_id", "plot_id")
+DEFAULT_FARM = "farm-1"
+DEFAULT_PLOT = "plot-1"
+
+# Ways of handling rows that do not fit the schema
+ON_ERROR_MODES = ("quarantine", "repair", "raise")
+
+# Parsed tables keyed on (path, schema, mode) -> (size, mtime_ns, table)
+_cache = {}
+
+
+# Parsed sensor history: one NumPy array per schema column plus the rejected rows
+class SensorTable:
+    def __init__(self, columns, quarantined, repaired=0):
+        self.columns = columns
+        self.quarantined = quarantined  # List of (line_number, raw_line, reason)
+        self.repaired = repaired
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __len__(self):
+        return len(self.columns["timestamp"])
+
+
+# Function to build an empty array for every schema column
+def _empty_columns(schema):
+    return {name: np.empty(0, dtype=dtype) for name, dtype, _ in schema}
+
+
+# Function to convert one group of equal-width rows; returns (columns, bad row mask, reasons)
+def _convert(fields, schema):
+    columns = {}
+    bad = np.zeros(len(fields), dtype=bool)
+    reasons = {}
+    for position, (name, dtype, _) in enumerate(schema):
+        if position >= fields.shape[1]:
+            columns[name] = np.full(len(fields), np.datetime64("NaT") if dtype.startswith("datetime") else np.nan, dtype=dtype)
+            continue
+        raw = fields[:, position]
+        if dtype.startswith("datetime"):
+            raw = np.char.strip(raw)
+        try:
+            columns[name] = raw.astype(dtype)
+        except ValueError:
+            # Slow path, only taken for groups that actually contain bad values
+            values = np.empty(len(raw), dtype=dtype)
+            for i, value in enumerate(raw):
+                try:
+                    values[i] = np.array(value).astype(dtype)
+                except ValueError:
+                    values[i] = np.datetime64("NaT") if dtype.startswith("datetime") else np.nan
+                    bad[i] = True
+                    reasons.setdefault(i, f"invalid {name}: {value.decode(errors='replace')!r}")
+            columns[name] = values
+    return columns, bad, reasons
+
+
+# Function to parse CSV data lines (bytes, no header) into schema columns in one vectorized pass
+def parse_rows(rows, schema=SCHEMA, on_error="quarantine", first_line=2):
+    if on_error not in ON_ERROR_MODES:
+        raise ValueError(f"on_error must be one of {ON_ERROR_MODES}")
+    required = sum(1 for _, _, is_required in schema if is_required)
+    lines = np.array([row.rstrip(b"\r") for row in rows], dtype=bytes)
+    line_numbers = np.arange(first_line, first_line + len(lines))
+    keep = np.char.str_len(lines) > 0
+    lines, line_numbers = lines[keep], line_numbers[keep]
+    if len(lines) == 0:
+        return _empty_columns(schema), [], 0
+
+    widths = np.char.count(lines, b",") + 1
+    groups, quarantined = [], []
+    repaired = 0
+    for width in np.unique(widths):
+        index = np.flatnonzero(widths == width)
+        if width < required or width > len(schema):
+            if on_error == "raise":
+                raise ValueError(f"line {line_numbers[index[0]]}: expected {required}-{len(schema)} fields, got {width}")
+            if on_error == "quarantine":
+                for i in index:
+                    quarantined.append((int(line_numbers[i]), lines[i].decode(errors="replace"), f"{width} fields"))
+                continue
+            repaired += len(index)  # Repair: pad missing values with NaN, drop unknown extras
+        fields = np.array(b",".join(lines[index]).split(b","), dtype=bytes).reshape(len(index), width)
+        fields = fields[:, :len(schema)]
+        columns, bad, reasons = _convert(fields, schema)
+        if on_error == "repair":
+            # Bad values were replaced by NaN; a reading without a usable timestamp
+            # cannot be repaired, only quarantined
+            unusable = np.isnat(columns["timestamp"])
+            repaired += int((bad & ~unusable).sum())
+            bad &= unusable
+        if bad.any():
+            if on_error == "raise":
+                first = int(np.flatnonzero(bad)[0])
+                raise ValueError(f"line {line_numbers[index[first]]}: {reasons[first]}")
+            for i in np.flatnonzero(bad):
+                quarantined.append((int(line_numbers[index[i]]), lines[index[i]].decode(errors="replace"), reasons[i]))
+            columns = {name: values[~bad] for name, values in columns.items()}
+            index = index[~bad]
+        groups.append((index, columns))
+
+    # Put the width groups back into file order
+    order = np.argsort(np.concatenate([index for index, _ in groups] or [np.empty(0, dtype=np.intp)]), kind="stable")
+    merged = {}
+    for name, dtype, _ in schema:
+        parts = [columns[name] for _, columns in groups]
+        merged[name] = np.concatenate(parts)[order] if parts else np.empty(0, dtype=dtype)
+    quarantined.sort()
+    return merged, quarantined, repaired
+
+
+# Function to check a CSV header line (bytes) against the schema
+def check_header(line, schema=SCHEMA, filename="ecorice_data.csv"):
+    header = line.rstrip(b"\r").decode().split(",")
+    expected = [name for name, _, _ in schema[:len(header)]]
+    if header != expected:
+        raise ValueError(f"{filename}: header {header} does not match schema {expected}")
+
+
+# Function to load a sensor CSV into NumPy arrays, reusing the cached parse if the file is unchanged
+def load_csv(filename="ecorice_data.csv", schema=SCHEMA, on_error="quarantine", use_cache=True):
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), tuple(schema), on_error)
+    cached = _cache.get(key)
+    if use_cache and cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    with open(filename, "rb") as file:
+        data = file.read()
+    lines = data.split(b"\n")
+    check_header(lines[0], schema, filename)
+    columns, quarantined, repaired = parse_rows(lines[1:], schema, on_error)
+    for values in columns.values():
+        values.flags.writeable = False  # Shared through the cache
+    table = SensorTable(columns, quarantined, repaired)
+    if use_cache:
+        _cache[key] = (stat.st_size, stat.st_mtime_ns, table)
+    return table
+
+
+# Function to forget cached parses (all files, or just one)
+def clear_cache(filename=None):
+    if filename is None:
+        _cache.clear()
+        return
+    path = os.path.abspath(filename)
+    for key in [key for key in _cache if key[0] == path]:
+        del _cache[key]
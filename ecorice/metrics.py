@@ -0,0 +1,161 @@
+import os
+import time
+import threading
+import functools
+from collections import deque
+import numpy as np
+
+# Latency samples kept per timer; percentiles cover the most recent ones only
+WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+# Default file for the Prometheus text export (node_exporter's textfile collector can pick it up)
+PROMETHEUS_FILE = "ecorice_metrics.prom"
+
+# Off switch: ECORICE_METRICS=0 in the environment, or set_enabled(False) at run time.
+# Disabled timers call straight through without reading the clock.
+_enabled = os.environ.get("ECORICE_METRICS", "1").lower() not in ("0", "false", "off", "no")
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+
+
+# Rolling latency window plus lifetime count and sum of one timed operation (seconds)
+class LatencyWindow:
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def clear(self):
+        with _lock:
+            self.samples.clear()
+            self.count = 0
+            self.total = 0.0
+
+    def record(self, seconds):
+        with _lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    # Function to summarize the window: count, sum, p50/p95/p99 and max
+    def snapshot(self):
+        with _lock:
+            samples = np.fromiter(self.samples, dtype=float, count=len(self.samples))
+            count, total = self.count, self.total
+        summary = {"count": count, "sum": total, "max": float(samples.max()) if len(samples) else 0.0}
+        for quantile in QUANTILES:
+            summary[quantile] = float(np.quantile(samples, quantile)) if len(samples) else 0.0
+        return summary
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+# Function to get (creating on first use) the latency window of a timer
+def timer(name):
+    window = _timers.get(name)
+    if window is None:
+        with _lock:
+            window = _timers.setdefault(name, LatencyWindow())
+    return window
+
+
+# Function to record one latency sample in seconds
+def observe(name, seconds):
+    if _enabled:
+        timer(name).record(seconds)
+
+
+# Function to add to a counter
+def count(name, amount=1):
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+# Decorator timing every call of a function under `name`
+def timed(name):
+    def decorate(function):
+        window = timer(name)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            began = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                window.record(time.perf_counter() - began)
+        return wrapper
+    return decorate
+
+
+# Context manager timing a block under `name`
+class timing:
+    def __init__(self, name):
+        self.name = name
+        self.began = None
+
+    def __enter__(self):
+        self.began = time.perf_counter() if _enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.began is not None:
+            timer(self.name).record(time.perf_counter() - self.began)
+        return False
+
+
+# Function to summarize every timer and counter: ({name: summary}, {name: value})
+def snapshot():
+    with _lock:
+        timers, counters = dict(_timers), dict(_counters)
+    return {name: window.snapshot() for name, window in sorted(timers.items())}, dict(sorted(counters.items()))
+
+
+# Function to forget all samples and counters (timers stay registered, as decorators hold them)
+def reset():
+    for window in list(_timers.values()):
+        window.clear()
+    with _lock:
+        _counters.clear()
+
+
+def _metric_name(name):
+    return "ecorice_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+# Function to render the Prometheus text exposition format: timers as summaries, counters as counters
+def prometheus_text():
+    timers, counters = snapshot()
+    lines = []
+    for name, summary in timers.items():
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# HELP {metric} Latency of {name} (quantiles over the last {WINDOW} calls)")
+        lines.append(f"# TYPE {metric} summary")
+        for quantile in QUANTILES:
+            lines.append(f'{metric}{{quantile="{quantile:g}"}} {summary[quantile]:.9g}')
+        lines.append(f"{metric}_sum {summary['sum']:.9g}")
+        lines.append(f"{metric}_count {summary['count']}")
+    for name, value in counters.items():
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Function to write the Prometheus text file atomically, so a scraper never reads half of it
+def write_prometheus(path=PROMETHEUS_FILE):
+    with open(path + ".tmp", "w") as file:
+        file.write(prometheus_text())
+    os.replace(path + ".tmp", path)
+    return path
+
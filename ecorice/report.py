@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import hashlib
+import shutil
+from datetime import date, timedelta
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .store import FarmStore, from_epoch, to_epoch
+from .compaction import LEVELS, rollup_store
+from .aggregation import WATER_THRESHOLD
+from .downsample import minmax, budget_from_width
+
+# Rendered farm pages and their index, kept next to the farms in the store (hidden from farms())
+CACHE_DIR = ".report-cache"
+MANIFEST = "manifest.json"
+# Bump when the page layout changes, so every cached page is rendered again
+RENDER_VERSION = 1
+# Page size (A4 portrait, inches) and resolution of the farm pages
+PAGE_SIZE = (8.27, 11.69)
+DPI = 150
+# Farms per page of the fleet summary
+SUMMARY_ROWS = 40
+SUMMARY_COLUMNS = ("Plot", "Days", "CO₂ mean", "CO₂ max", "Water mean", "Dried h", "CO₂ avoided kg", "Income THB")
+
+
+# Function to fingerprint what a farm's page reads without reading it: the size and mtime of the
+# raw and rollup partitions of every plot over [start, end). An unchanged signature means the
+# cached page is current; a changed one is settled by the worker's content hash.
+def farm_signature(store, farm_id, start=None, end=None):
+    digest = hashlib.blake2b(digest_size=16)
+    for plot_id in store.plots(farm_id):
+        series = store.series(farm_id, plot_id)
+        for table in [series] + [rollup_store(series, level) for level, _, _ in LEVELS]:
+            for name in table._partitions_between(start, end):
+                stat = os.stat(table._column_path(name, "timestamp"))
+                digest.update(f"{plot_id}/{table.root}/{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+# Function to get the [start, end) dates a plot's carbon balance covers for an epoch range
+def _account_dates(series, start, end):
+    # Days retention removed from the raw partitions live on in the 1m rollup (and the 1h one by month)
+    days = sorted(set(series.partitions()) | set(rollup_store(series, LEVELS[0][0]).partitions()))
+    if not days:
+        months = rollup_store(series, LEVELS[1][0]).partitions()
+        if months:
+            days = [months[0] + "-01", str((np.datetime64(months[-1], "M") + 1).astype("datetime64[D]") - 1)]
+    first = date.fromisoformat(from_epoch(start)[:10]) if start is not None else \
+        date.fromisoformat(days[0]) if days else date.today()
+    last = date.fromisoformat(from_epoch(end - 1)[:10]) if end is not None else \
+        date.fromisoformat(days[-1]) if days else date.today()
+    return first, last + timedelta(days=1)
+
+
+# Worker: read one farm's plots over [start, end) at the level the store picks for the range,
+# downsample every line to the page width and summarize each plot. Returns (lines, summary rows).
+def farm_data(store, farm_id, start=None, end=None, dpi=DPI):
+    from .carbon import CarbonAccountant
+
+    accountant = CarbonAccountant(store)
+    budget = budget_from_width(PAGE_SIZE[0] * dpi)
+    lines = {}
+    rows = []
+    for plot_id in store.plots(farm_id):
+        data = store.query(["co2_emissions", "water_level"], start, end, farm_id, plot_id, resolution="auto")
+        x = data["timestamp"]
+        lines[plot_id] = {name: minmax(x, data[name], budget) for name in ("co2_emissions", "water_level")}
+        balance = accountant.field_balance(farm_id, plot_id, *_account_dates(store.series(farm_id, plot_id), start, end))
+        co2 = data["co2_emissions"][~np.isnan(data["co2_emissions"])]
+        water = data["water_level"][~np.isnan(data["water_level"])]
+        rows.append([plot_id, balance["days"], float(co2.mean()) if len(co2) else np.nan,
+                     float(co2.max()) if len(co2) else np.nan, float(water.mean()) if len(water) else np.nan,
+                     balance["dried_hours"], balance["co2_reduction_kg"], balance["income_thb"]])
+    return lines, rows
+
+
+# Function to hash what a farm page shows (the drawn points, the summary rows and the range)
+def content_hash(farm_id, start, end, lines, rows, dpi=DPI):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{RENDER_VERSION}:{farm_id}:{start}:{end}:{dpi}:{json.dumps(rows)}".encode())
+    for plot_id, plot_lines in sorted(lines.items()):
+        for name, (x, y) in sorted(plot_lines.items()):
+            digest.update(plot_id.encode() + name.encode())
+            digest.update(np.ascontiguousarray(x, dtype=np.int64).tobytes())
+            digest.update(np.ascontiguousarray(y, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def _range_text(start, end):
+    return f"{from_epoch(start)[:10] if start is not None else 'start'} to {from_epoch(end - 1)[:10] if end is not None else 'now'}"
+
+
+# Function to format a summary row for a table (NaN shows as "–")
+def _cells(row):
+    return [str(row[0]), str(row[1])] + ["–" if value != value else f"{value:.1f}" for value in row[2:]]
+
+
+# Function to draw one farm page with Agg: CO₂ and water level per plot over the range, plus its summary table
+def draw_farm_page(farm_id, start, end, lines, rows, path, dpi=DPI):
+    from matplotlib import dates as mdates
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=PAGE_SIZE, dpi=dpi)
+    FigureCanvasAgg(figure)
+    figure.suptitle(f"{farm_id}: {_range_text(start, end)}", fontsize=14)
+    grid = figure.add_gridspec(3, 1, height_ratios=(3, 3, 2), hspace=0.35)
+    co2_axes = figure.add_subplot(grid[0])
+    water_axes = figure.add_subplot(grid[1], sharex=co2_axes)
+    for plot_id, plot_lines in sorted(lines.items()):
+        for axes, name in ((co2_axes, "co2_emissions"), (water_axes, "water_level")):
+            x, y = plot_lines[name]
+            axes.plot(np.asarray(x, dtype="datetime64[s]"), y, linewidth=0.8, label=plot_id)
+    water_axes.axhline(WATER_THRESHOLD, color="red", linestyle="--", linewidth=0.8, label="AWD threshold")
+    for axes, title, ylabel in ((co2_axes, "CO₂ Levels", "ppm"), (water_axes, "Water Level", "cm")):
+        axes.set_title(title)
+        axes.set_ylabel(ylabel)
+        axes.grid(True)
+        axes.legend(loc="upper left", fontsize=7)
+        locator = mdates.AutoDateLocator()
+        axes.xaxis.set_major_locator(locator)
+        axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    table_axes = figure.add_subplot(grid[2])
+    table_axes.axis("off")
+    if rows:
+        table = table_axes.table(cellText=[_cells(row) for row in rows], colLabels=SUMMARY_COLUMNS, loc="upper center")
+        table.auto_set_font_size(False)
+        table.set_fontsize(7)
+    figure.savefig(path, dpi=dpi)
+
+
+# Worker: render one farm page into the cache unless its content hash matches the cached page.
+# Returns {"content", "file", "rows", "rendered"}.
+def render_farm(root, farm_id, start, end, cache_dir, cached_content=None, dpi=DPI):
+    store = FarmStore(root)
+    lines, rows = farm_data(store, farm_id, start, end, dpi)
+    content = content_hash(farm_id, start, end, lines, rows, dpi)
+    file = f"{farm_id}-{content}.png"
+    if content == cached_content and os.path.exists(os.path.join(cache_dir, file)):
+        return {"content": content, "file": file, "rows": rows, "rendered": False}
+    draw_farm_page(farm_id, start, end, lines, rows, os.path.join(cache_dir, file), dpi)
+    return {"content": content, "file": file, "rows": rows, "rendered": True}
+
+
+def _load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST), encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):  # No cache yet, or a damaged one: render everything
+        return {}
+
+
+def _save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(path + ".tmp", path)
+
+
+# Function to yield the fleet summary pages: one row per plot of every farm
+def _summary_pages(title, pages, dpi=DPI):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rows = [[farm_id] + _cells(row) for farm_id, page in pages for row in page["rows"]] or [["–"] * (len(SUMMARY_COLUMNS) + 1)]
+    for first in range(0, len(rows), SUMMARY_ROWS):
+        figure = Figure(figsize=PAGE_SIZE, dpi=dpi)
+        FigureCanvasAgg(figure)
+        figure.suptitle(title, fontsize=14)
+        axes = figure.add_subplot()
+        axes.axis("off")
+        table = axes.table(cellText=rows[first:first + SUMMARY_ROWS], colLabels=("Farm",) + SUMMARY_COLUMNS, loc="upper center")
+        table.auto_set_font_size(False)
+        table.set_fontsize(7)
+        yield figure
+
+
+# Function to build the consolidated multi-farm report over [start, end) epoch seconds. Farm pages
+# are rendered offscreen (Agg) on a process pool and cached by data range and content hash, so a
+# nightly run only re-renders the farms whose data changed. `output` ending in .pdf gets one PDF
+# (fleet summary, then a page per farm); anything else is a directory of PNG pages.
+def build_report(store, output, start=None, end=None, farms=None, workers=None, cache_dir=None, dpi=DPI):
+    began = time.perf_counter()
+    start = None if start is None else to_epoch(start)
+    end = None if end is None else to_epoch(end)
+    cache_dir = cache_dir or os.path.join(store.root, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+    farms = farms or store.farms()
+
+    pages = {}
+    stale = {}
+    for farm_id in farms:
+        key = f"{farm_id}|{start}|{end}|{dpi}"
+        entry = manifest.get(key)
+        signature = farm_signature(store, farm_id, start, end)
+        if entry and entry["signature"] == signature and os.path.exists(os.path.join(cache_dir, entry["file"])):
+            pages[farm_id] = entry
+        else:
+            stale[farm_id] = (key, signature, entry)
+
+    rendered = 0
+    if stale:
+        workers = min(workers or os.cpu_count() or 1, len(stale))
+        # Workers come from a fresh server process, not forked from the caller: the GUI calls this while
+        # its acquisition and writer threads may hold locks a forked child would inherit
+        context = multiprocessing.get_context("forkserver")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                farm_id: pool.submit(render_farm, store.root, farm_id, start, end, cache_dir,
+                                     entry["content"] if entry else None, dpi)
+                for farm_id, (_, _, entry) in stale.items()
+            }
+            for farm_id, future in futures.items():
+                key, signature, entry = stale[farm_id]
+                result = future.result()
+                rendered += result.pop("rendered")
+                if entry and entry["file"] != result["file"]:  # Superseded page
+                    try:
+                        os.remove(os.path.join(cache_dir, entry["file"]))
+                    except OSError:
+                        pass
+                pages[farm_id] = manifest[key] = dict(result, signature=signature)
+        _save_manifest(cache_dir, manifest)
+
+    ordered = [(farm_id, pages[farm_id]) for farm_id in farms]
+    title = f"EcoRice farm report: {_range_text(start, end)}"
+    if output.lower().endswith(".pdf"):
+        _write_pdf(output, title, ordered, cache_dir, dpi)
+    else:
+        os.makedirs(output, exist_ok=True)
+        for number, figure in enumerate(_summary_pages(title, ordered, dpi), 1):
+            figure.savefig(os.path.join(output, f"summary-{number}.png"), dpi=dpi)
+        for farm_id, page in ordered:
+            shutil.copyfile(os.path.join(cache_dir, page["file"]), os.path.join(output, f"{farm_id}.png"))
+    return {"farms": len(farms), "rendered": rendered, "cached": len(farms) - rendered,
+            "seconds": time.perf_counter() - began}
+
+
+# Function to write the PDF: fleet summary pages, then each cached farm page placed as an image
+def _write_pdf(path, title, pages, cache_dir, dpi=DPI):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.image import imread
+
+    with PdfPages(path) as pdf:
+        for figure in _summary_pages(title, pages, dpi):
+            pdf.savefig(figure)
+        for farm_id, page in pages:
+            image = imread(os.path.join(cache_dir, page["file"]))
+            figure = Figure(figsize=(image.shape[1] / dpi, image.shape[0] / dpi), dpi=dpi)
+            FigureCanvasAgg(figure)
+            figure.figimage(image, resize=False)
+            pdf.savefig(figure, dpi=dpi)
@@ -0,0 +1,179 @@
+import os
+import json
+import operator
+import numpy as np
+from .loader import DEFAULT_FARM, DEFAULT_PLOT
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+RULE_TYPES = ("threshold", "hysteresis", "rate", "sustained")
+ALL_CLEAR = "All parameters are within optimal range."
+# AWD rules shipped with the package
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(__file__), "rules.json")
+
+
+# Function to load rule definitions from a JSON file
+def load_rules(filename=DEFAULT_RULES_FILE):
+    with open(filename, encoding="utf-8") as file:
+        return json.load(file)
+
+
+# Function to turn a list of reading dicts into the column batch the engine evaluates
+def columns_from_records(records):
+    columns = {
+        "timestamp": np.array([r["timestamp"] for r in records], dtype="datetime64[s]"),
+        "field": np.array([f"{r.get('farm_id') or DEFAULT_FARM}/{r.get('plot_id') or DEFAULT_PLOT}" for r in records]),
+    }
+    for name in records[0] if records else []:
+        if name not in ("timestamp", "farm_id", "plot_id", "device", "faults"):
+            columns[name] = np.array([r.get(name, np.nan) for r in records], dtype=float)
+    return columns
+
+
+# One compiled rule: validated parameters plus the comparison functions it needs
+class Rule:
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.type = spec["type"]
+        if self.type not in RULE_TYPES:
+            raise ValueError(f"Rule {self.name}: unknown type {self.type!r}")
+        self.channel = spec["channel"]
+        self.message = spec["message"]
+        if self.type == "hysteresis":
+            self.on = (OPERATORS[spec["on"][0]], float(spec["on"][1]))
+            self.off = (OPERATORS[spec["off"][0]], float(spec["off"][1]))
+        else:
+            self.op = OPERATORS[spec["op"]]
+            self.value = float(spec["value"])
+        self.window = int(spec.get("window_minutes", 0) * 60)  # rate
+        self.duration = int(spec.get("minutes", 0) * 60)  # sustained
+
+
+# Rules compiled once and evaluated over column batches holding many fields at once.
+# State that spans batches (hysteresis, running conditions, rate look-back) is kept per field.
+class RuleEngine:
+    def __init__(self, rules):
+        self.rules = [Rule(spec) for spec in rules]
+        self.lookback = max([rule.window for rule in self.rules if rule.type == "rate"], default=0)
+        self._state = {}  # (rule name, field) -> carried state
+        self._carry = None  # Recent rows kept for rate look-back
+
+    @classmethod
+    def from_file(cls, filename=DEFAULT_RULES_FILE):
+        return cls(load_rules(filename))
+
+    # Function to evaluate every rule; returns {rule name: bool array} aligned with the batch
+    def evaluate(self, batch):
+        count = len(batch["timestamp"])
+        fields = np.asarray(batch.get("field", np.full(count, f"{DEFAULT_FARM}/{DEFAULT_PLOT}")))
+        times = np.asarray(batch["timestamp"]).astype("datetime64[s]").astype(np.int64)
+        channels = {rule.channel for rule in self.rules}
+        values = {name: np.asarray(batch[name], dtype=float) for name in channels}
+
+        # Rows carried over from earlier batches come first; they are only used for look-back
+        carried = 0
+        if self._carry is not None:
+            carried = len(self._carry["time"])
+            fields = np.concatenate([self._carry["field"], fields])
+            times = np.concatenate([self._carry["time"], times])
+            values = {name: np.concatenate([self._carry[name], values[name]]) for name in channels}
+
+        # Sort by (field, time) so every field is one contiguous, time-ordered run
+        field_names, field_index = np.unique(fields, return_inverse=True)
+        order = np.lexsort((times, field_index))
+        group = field_index[order]
+        t = times[order]
+        starts = np.ones(len(order), dtype=bool)
+        starts[1:] = group[1:] != group[:-1]
+        fresh = order >= carried  # Rows of this batch (not carried look-back rows)
+        sorted_values = {name: values[name][order] for name in channels}
+
+        results = {}
+        for rule in self.rules:
+            v = sorted_values[rule.channel]
+            if rule.type == "threshold":
+                active = rule.op(v, rule.value)
+            elif rule.type == "hysteresis":
+                active = self._hysteresis(rule, v, group, starts, fresh, field_names)
+            elif rule.type == "rate":
+                active = self._rate(rule, v, t, group)
+            else:
+                active = self._sustained(rule, v, t, group, starts, fresh, field_names)
+            unsorted = np.empty(len(order), dtype=bool)
+            unsorted[order] = active & fresh
+            results[rule.name] = unsorted[carried:]
+
+        self._keep_carry(fields, times, values, channels)
+        return results
+
+    # Function to forward-fill values from "anchor" rows to the rows after them in each run
+    def _forward_fill(self, anchors, anchor_values):
+        index = np.where(anchors, np.arange(len(anchors)), 0)
+        np.maximum.accumulate(index, out=index)
+        return anchor_values[index]
+
+    def _hysteresis(self, rule, v, group, starts, fresh, field_names):
+        switch_on = rule.on[0](v, rule.on[1])
+        switch_off = rule.off[0](v, rule.off[1])
+        # Each field's first row is an anchor seeded with the state left by the previous batch
+        seed = np.array([self._state.get((rule.name, field), False) for field in field_names])[group]
+        anchor_values = np.where(switch_on, True, np.where(switch_off, False, seed))
+        active = self._forward_fill(switch_on | switch_off | starts, anchor_values)
+        self._save_last(rule, active, group, fresh, field_names, lambda i: bool(active[i]))
+        return active
+
+    def _sustained(self, rule, v, t, group, starts, fresh, field_names):
+        condition = rule.op(v, rule.value)
+        changed = starts.copy()
+        changed[1:] |= condition[1:] != condition[:-1]
+        # A run of true values starts at its first row, or earlier if it continues a previous batch
+        previous_start = np.array([self._state.get((rule.name, field), -1) for field in field_names])[group]
+        run_start = np.where(starts & condition & (previous_start >= 0), previous_start, t)
+        since = self._forward_fill(changed, run_start)
+        active = condition & (t - since >= rule.duration)
+        self._save_last(rule, active, group, fresh, field_names, lambda i: int(since[i]) if condition[i] else -1)
+        return active
+
+    def _rate(self, rule, v, t, group):
+        # Key that keeps fields apart, so one searchsorted finds the look-back row of every row
+        offset = t - (t.min() if len(t) else 0)
+        key = group.astype(np.int64) * (int(offset.max(initial=0)) + rule.window + 1) + offset
+        reference = np.searchsorted(key, key - rule.window, side="left")
+        span = t - t[reference]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_hour = (v - v[reference]) / span * 3600
+        # Only judge a rate once at least half the window is covered
+        return (span >= rule.window / 2) & rule.op(per_hour, rule.value)
+
+    def _save_last(self, rule, active, group, fresh, field_names, value_at):
+        last = np.flatnonzero(np.append(group[1:] != group[:-1], True) & fresh)
+        for i in last:
+            self._state[(rule.name, field_names[group[i]])] = value_at(i)
+
+    def _keep_carry(self, fields, times, values, channels):
+        if not self.lookback or not len(times):
+            self._carry = None
+            return
+        keep = times >= times.max() - self.lookback
+        self._carry = {"field": fields[keep], "time": times[keep]}
+        for name in channels:
+            self._carry[name] = values[name][keep]
+
+    # Function to evaluate a batch and list the active rule messages at each field's newest row
+    def latest_insights(self, batch):
+        results = self.evaluate(batch)
+        fields = np.asarray(batch.get("field", np.full(len(batch["timestamp"]), f"{DEFAULT_FARM}/{DEFAULT_PLOT}")))
+        times = np.asarray(batch["timestamp"]).astype("datetime64[s]").astype(np.int64)
+        names, group = np.unique(fields, return_inverse=True)
+        # One sort by (field, time) instead of a scan per field: each field's newest row ends its run
+        # (on equal times the earliest row sorts last, as argmax would pick it)
+        order = np.lexsort((-np.arange(len(times)), times, group))
+        newest = order[np.append(group[order][1:] != group[order][:-1], True)]
+        active = [(rule.message, results[rule.name][newest]) for rule in self.rules]
+        return {str(field): [message for message, fired in active if fired[i]] for i, field in enumerate(names)}
+
+
+# Function to evaluate drained readings and return the messages for the newest reading's field
+def field_insights(engine, readings):
+    insights = engine.latest_insights(columns_from_records(readings))
+    newest = readings[-1]
+    return insights.get(f"{newest.get('farm_id') or DEFAULT_FARM}/{newest.get('plot_id') or DEFAULT_PLOT}", [])
@@ -0,0 +1,372 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from . import metrics
+from .store import FLOAT_COLUMNS, PERIODS, range_for, to_epoch, ingest_csv
+
+log = logging.getLogger("ecorice")
+
+# Seconds a cached response is served before it is recomputed (ingestion invalidates sooner)
+CACHE_TTL = 10.0
+# Seconds between checks of the logger CSV and the store for new rows
+POLL_INTERVAL = 1.0
+# Largest range /api/readings returns as one JSON document; longer ones must use format=ndjson
+MAX_JSON_ROWS = 200_000
+# Minutes of history the insight rules are evaluated over
+INSIGHT_MINUTES = 60
+LEVELS = ("raw", "1m", "1h", "1d", "auto")
+
+
+# Error answered with an HTTP status and a JSON message
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Computed responses kept in memory for `ttl` seconds and dropped whenever new rows arrive.
+# Concurrent misses on the same key wait for the first one instead of computing it again.
+class ResponseCache:
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.generation = 0  # Bumped by every invalidation
+        self._entries = {}  # key -> (expires, etag, body)
+        self._computing = {}  # key -> lock held while one thread computes it
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+        metrics.count("server.cache_invalidations")
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry
+        return None
+
+    # Function to get (etag, body) for a key, computing the body with `compute` on a miss
+    def get(self, key, compute):
+        entry = self._fresh(key)
+        if entry is None:
+            with self._lock:
+                key_lock = self._computing.setdefault(key, threading.Lock())
+            with key_lock:
+                entry = self._fresh(key)  # Another request may have filled it while we waited
+                if entry is None:
+                    metrics.count("server.cache_misses")
+                    generation = self.generation
+                    try:
+                        body = compute()
+                    finally:
+                        with self._lock:
+                            self._computing.pop(key, None)
+                    entry = (time.monotonic() + self.ttl, '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest(), body)
+                    with self._lock:
+                        if generation == self.generation:  # Rows that arrived mid-compute make it stale
+                            self._entries[key] = entry
+                    return entry[1], entry[2]
+        metrics.count("server.cache_hits")
+        return entry[1], entry[2]
+
+
+# Function to convert NumPy columns to JSON-ready lists (timestamps as "YYYY-mm-dd HH:MM:SS", NaN as null)
+def _json_columns(data):
+    result = {}
+    for name, values in data.items():
+        values = np.asarray(values)
+        if not len(values):
+            result[name] = []  # np.char.replace cannot size an empty result
+        elif name == "timestamp":
+            result[name] = np.char.replace(np.datetime_as_string(values.astype("datetime64[s]")), "T", " ").tolist()
+        elif values.dtype.kind == "f" and np.isnan(values).any():
+            result[name] = [None if value != value else value for value in values.tolist()]
+        else:
+            result[name] = values.tolist()
+    return result
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), allow_nan=False).encode()
+
+
+# Read-only view of a FarmStore for HTTP clients. A background thread imports new logger rows
+# and watches the store for rows written by other processes (a gateway), invalidating the cache.
+class EcoRiceServer:
+    def __init__(self, store, csv=None, ttl=CACHE_TTL, poll_interval=POLL_INTERVAL, rules_file=None):
+        from .carbon import CarbonAccountant
+        self.store = store
+        self.csv = csv
+        self.poll_interval = poll_interval
+        self.rules_file = rules_file
+        self.cache = ResponseCache(ttl)
+        self.accountant = CarbonAccountant(store)
+        self._accountant_lock = threading.Lock()
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.error = None
+
+    # Function to summarize what is on disk: newest partition of every plot with its size and mtime
+    def store_signature(self):
+        signature = []
+        for farm_id, plot_id in self.store.series_ids():
+            series = self.store.series(farm_id, plot_id)
+            days = series.partitions()
+            if days:
+                stat = os.stat(series._column_path(days[-1], "timestamp"))
+                signature.append((farm_id, plot_id, days[-1], stat.st_size, stat.st_mtime_ns, len(days)))
+        return signature
+
+    # Function to import new logger rows and invalidate the cache if anything changed; True if it did
+    def poll(self):
+        if self.csv and os.path.exists(self.csv):
+            ingest_csv(self.store, self.csv)
+        signature = self.store_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.cache.invalidate()
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self.poll()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ecorice-server-poll", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+                self.error = None
+            except Exception as e:  # A CSV mid-rewrite is retried on the next poll
+                self.error = e
+
+    # Function to read the farm/plot/time range parameters shared by the query endpoints
+    def _range(self, params):
+        farm, plot = params.get("farm"), params.get("plot")
+        start, end = params.get("start"), params.get("end")
+        if params.get("period"):
+            if params["period"] not in PERIODS:
+                raise ApiError(400, f"period must be one of {PERIODS}")
+            start, end = range_for(params["period"])
+        try:
+            start = None if start is None else to_epoch(int(start) if str(start).isdigit() else start)
+            end = None if end is None else to_epoch(int(end) if str(end).isdigit() else end)
+        except ValueError:
+            raise ApiError(400, 'start/end must be epoch seconds or "YYYY-mm-dd HH:MM:SS"') from None
+        return farm, plot, start, end
+
+    def _fields(self, params):
+        fields = params["fields"].split(",") if params.get("fields") else FLOAT_COLUMNS
+        unknown = [field for field in fields if field not in FLOAT_COLUMNS]
+        if unknown:
+            raise ApiError(400, f"unknown fields {unknown}, expected some of {FLOAT_COLUMNS}")
+        return fields
+
+    # GET /api/series
+    def series(self, params):
+        return {"series": [f"{farm_id}/{plot_id}" for farm_id, plot_id in self.store.series_ids()]}
+
+    # Function to list the (farm_id, plot_id, series) selected by farm/plot parameters
+    def _selected(self, params):
+        return [(farm_id, plot_id, self.store.series(farm_id, plot_id)) for farm_id, plot_id in self.store.series_ids()
+                if params.get("farm") in (None, farm_id) and params.get("plot") in (None, plot_id)]
+
+    # Function to read the newest row of a plot (None when it has no rows)
+    def _newest(self, series, fields):
+        for day in reversed(series.partitions()):
+            start = int(np.datetime64(day).astype("datetime64[s]").astype(np.int64))
+            data = series.read(fields, start, start + 86400)
+            if len(data["timestamp"]):
+                return {name: values[-1:] for name, values in data.items()}
+        return None
+
+    # GET /api/latest?farm=&plot= : newest reading of every plot
+    def latest(self, params):
+        latest = {}
+        for farm_id, plot_id, series in self._selected(params):
+            newest = self._newest(series, FLOAT_COLUMNS)
+            if newest is not None:
+                latest[f"{farm_id}/{plot_id}"] = {name: values[0] for name, values in _json_columns(newest).items()}
+        return {"latest": latest}
+
+    # GET /api/readings (and /api/rollups with level=1m|1h|1d|auto): columns over a range
+    def readings(self, params, level=None):
+        farm, plot, start, end = self._range(params)
+        level = params.get("level", level)
+        if level not in LEVELS + (None,):
+            raise ApiError(400, f"level must be one of {LEVELS}")
+        data = self.store.query(self._fields(params), start, end, farm, plot, resolution=level)
+        if len(data["timestamp"]) > MAX_JSON_ROWS:
+            raise ApiError(413, f"{len(data['timestamp'])} rows; ask for format=ndjson or a coarser level")
+        return {"rows": len(data["timestamp"]), "columns": _json_columns(data)}
+
+    # GET /api/insights?minutes=60 : active rule messages at every plot's newest reading
+    def insights(self, params):
+        from .rules import RuleEngine
+        if not str(params.get("minutes", INSIGHT_MINUTES)).isdigit():
+            raise ApiError(400, "minutes must be a whole number")
+        minutes = int(params.get("minutes", INSIGHT_MINUTES))
+        engine = RuleEngine.from_file(self.rules_file) if self.rules_file else RuleEngine.from_file()
+        insights = {}
+        for farm_id, plot_id, series in self._selected(params):
+            newest = self._newest(series, [])
+            if newest is not None:
+                # The rules see the last `minutes` of the plot's own history, however old it is
+                batch = self.store.query(None, int(newest["timestamp"][0]) - minutes * 60, None, farm_id, plot_id)
+                insights.update(engine.latest_insights(batch))
+        return {"minutes": minutes, "insights": insights}
+
+    # GET /api/carbon?season=wet&year=2025&farm= : carbon balance of every plot (current season by default)
+    def carbon(self, params):
+        from .carbon import season_of, SEASONS
+        if params.get("season"):
+            if params["season"] not in SEASONS or not params.get("year", "").isdigit():
+                raise ApiError(400, f"season must be one of {tuple(SEASONS)} with a numeric year")
+            name, year = params["season"], int(params["year"])
+        else:
+            name, year = season_of()
+        with self._accountant_lock:
+            report = self.accountant.season_report(name, year, params.get("farm"))
+        # NaN baselines (nothing flooded yet) become null
+        report = {series: {key: None if value != value else value for key, value in balance.items()}
+                  for series, balance in report.items()}
+        return {"season": name, "year": year, "report": report}
+
+    # GET /api/health
+    def health(self, params):
+        return {"status": "ok" if self.error is None else f"poll failing: {self.error}",
+                "generation": self.cache.generation, "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+    # Function to check the parameters of an NDJSON stream up front (an ApiError here is still a clean
+    # 400) and return the generator of its lines, one partition at a time
+    def readings_ndjson(self, params):
+        _, _, start, end = self._range(params)
+        fields = self._fields(params)
+        return self._ndjson_lines(self._selected(params), fields, start, end)
+
+    # Generator of NDJSON lines (bytes) for ranges too long for one document
+    def _ndjson_lines(self, selected, fields, start, end):
+        for farm_id, plot_id, series in selected:
+            # One %-template per row; repr() of a float is valid JSON except for NaN, which becomes null
+            template = ('{"field":%s,"timestamp":"%%s",' % json.dumps(f"{farm_id}/{plot_id}")
+                        + ",".join('"%s":%%r' % field for field in fields) + "}")
+            for _, view in series.scan(fields, start, end):
+                columns = _json_columns({name: view[name] for name in ["timestamp"] + fields})
+                lines = "\n".join(map(template.__mod__, zip(*columns.values()))) + "\n"
+                yield lines.replace(":None", ":null").encode()
+
+    # Function to serve on host:port until interrupted
+    def serve_forever(self, host="127.0.0.1", port=8080):
+        self.start()
+        httpd = ThreadingHTTPServer((host, port), make_handler(self))
+        httpd.daemon_threads = True
+        log.info("Serving %s on http://%s:%d", self.store.root, host, port)
+        try:
+            httpd.serve_forever()
+        finally:
+            httpd.server_close()
+            self.stop()
+
+
+# Function to build the request handler class bound to one server
+def make_handler(server):
+    endpoints = {
+        "/api/series": server.series,
+        "/api/latest": server.latest,
+        "/api/readings": server.readings,
+        "/api/rollups": lambda params: server.readings(params, level="auto"),
+        "/api/insights": server.insights,
+        "/api/carbon": server.carbon,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive and chunked responses
+
+        def log_message(self, format, *args):
+            log.debug("%s %s", self.address_string(), format % args)
+
+        def _send(self, status, body, content_type="application/json", etag=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", f"max-age={int(server.cache.ttl)}")
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _stream(self, chunks):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            if self.command == "HEAD":  # Headers only: the rows are never read
+                return
+            try:
+                for chunk in chunks:
+                    if chunk:
+                        self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception:
+                # The 200 is already sent: end the connection without the last chunk, so the client
+                # sees a truncated stream instead of a second response inside this one
+                log.exception("Error streaming %s", self.path)
+                self.close_connection = True
+                return
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            began = time.perf_counter()
+            try:
+                if url.path == "/api/health":
+                    self._send(200, _dumps(server.health(params)))
+                elif url.path == "/metrics":
+                    self._send(200, metrics.prometheus_text().encode(), "text/plain; version=0.0.4")
+                elif url.path == "/api/readings" and (params.get("format") == "ndjson"
+                                                      or "application/x-ndjson" in self.headers.get("Accept", "")):
+                    self._stream(server.readings_ndjson(params))
+                elif url.path in endpoints:
+                    key = (url.path, tuple(sorted(params.items())))
+                    etag, body = server.cache.get(key, lambda: _dumps(endpoints[url.path](params)))
+                    if etag in self.headers.get("If-None-Match", ""):
+                        self._send(304, b"", etag=etag)
+                    else:
+                        self._send(200, body, etag=etag)
+                else:
+                    raise ApiError(404, f"no endpoint {url.path}; try /api/series, /api/latest, /api/readings, "
+                                        "/api/rollups, /api/insights, /api/carbon, /api/health or /metrics")
+            except ApiError as e:
+                self._send(e.status, _dumps({"error": str(e)}))
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                log.exception("Error answering %s", self.path)
+                self._send(500, _dumps({"error": f"{type(e).__name__}: {e}"}))
+            if url.path in endpoints:
+                metrics.observe("server." + url.path.strip("/").replace("/", "."), time.perf_counter() - began)
+
+        do_HEAD = do_GET
+
+    return Handler
@@ -0,0 +1,466 @@
+import os
+import re
+import json
+import bisect
+import threading
+import shutil
+from datetime import datetime, timedelta
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, run a single ingesting process there
+    fcntl = None
+from .follower import CsvFollower
+from .metrics import timed
+from .loader import DEFAULT_FARM, DEFAULT_PLOT
+
+# Fixed-width column layout shared by every day partition
+COLUMNS = {
+    "timestamp": np.dtype("<i8"),  # Epoch seconds (naive local time)
+    "soil_moisture": np.dtype("<f8"),
+    "water_level": np.dtype("<f8"),
+    "air_temp": np.dtype("<f8"),
+    "air_humidity": np.dtype("<f8"),
+    "co2_emissions": np.dtype("<f8"),
+}
+FLOAT_COLUMNS = [name for name in COLUMNS if name != "timestamp"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SECONDS_PER_DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+
+# Marker written next to a partition that received out-of-order rows
+UNSORTED_MARKER = ".unsorted"
+# Resume point of the CSV follower feeding the store
+FOLLOW_STATE = ".follow.json"
+DAY_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Rows per block of the sparse timestamp index (every BLOCK_ROWS-th timestamp is kept in memory)
+BLOCK_ROWS = 4096
+# Named ranges accepted by range_for
+PERIODS = ("today", "week", "month", "season", "all")
+
+
+# Function to convert a "YYYY-mm-dd HH:MM:SS" string (or datetime) to epoch seconds
+def to_epoch(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    if isinstance(timestamp, datetime):
+        return int((timestamp - EPOCH).total_seconds())
+    return int(timestamp)
+
+
+# Function to convert epoch seconds back to the CSV timestamp format
+def from_epoch(epoch):
+    return (EPOCH + timedelta(seconds=int(epoch))).strftime(TIMESTAMP_FORMAT)
+
+
+# Function to get the partition name for an epoch second: YYYY-mm-dd for day partitions,
+# YYYY-mm for month ("M") and YYYY for year ("Y") partitions
+def partition_for(epoch, unit="D"):
+    return str(np.datetime64(int(epoch), "s").astype(f"datetime64[{unit}]"))
+
+
+# Function to get the (start, end) epoch range of a named period up to now. The end is left open
+# (None) so live views keep following new rows; "all" has no start either.
+def range_for(period, now=None):
+    now = datetime.now() if now is None else now
+    today = datetime(now.year, now.month, now.day)
+    if period == "today":
+        start = today
+    elif period == "week":
+        start = today - timedelta(days=today.weekday())
+    elif period == "month":
+        start = today.replace(day=1)
+    elif period == "season":
+        from .carbon import season_of, season_bounds  # carbon imports this module
+        season_start, _ = season_bounds(*season_of(today))
+        start = datetime(season_start.year, season_start.month, season_start.day)
+    elif period == "all":
+        return None, None
+    else:
+        raise ValueError(f"Unknown period {period!r}, expected one of {PERIODS}")
+    return to_epoch(start), None
+
+
+# Append-only sensor history kept as one raw binary file per column per day partition.
+# Rollup tables reuse it with their own column layout and month or year partitions.
+class ColumnStore:
+    def __init__(self, root="ecorice_store", columns=COLUMNS, unit="D"):
+        self.root = root
+        self.columns = columns
+        self.value_columns = [name for name in columns if name != "timestamp"]
+        self.unit = unit
+        os.makedirs(root, exist_ok=True)
+        self._blocks = {}  # day -> (rows, first timestamp of every block)
+        self._lock = threading.RLock()  # Serialises partition rewrites across threads
+
+    # Sorted list of day partitions present on disk
+    def partitions(self):
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name)) and not name.startswith(".")
+        )
+
+    def _column_path(self, day, column):
+        return os.path.join(self.root, day, column + ".bin")
+
+    # Number of complete rows in a partition (a torn append leaves some columns longer)
+    def _row_count(self, day):
+        counts = []
+        for column, dtype in self.columns.items():
+            path = self._column_path(day, column)
+            counts.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(counts)
+
+    def __len__(self):
+        return sum(self._row_count(day) for day in self.partitions())
+
+    # Complete row count of every partition (or of the given ones), used to roll back an interrupted append
+    def row_counts(self, partitions=None):
+        return {day: self._row_count(day) for day in (self.partitions() if partitions is None else partitions)}
+
+    # Function to list the partitions a batch of records falls into
+    def partitions_of(self, records):
+        if isinstance(records, dict):
+            records = [records]
+        days = np.array([r["timestamp"] for r in records], dtype="datetime64[s]").astype(f"datetime64[{self.unit}]")
+        return [str(day) for day in np.unique(days)]
+
+    # Function to drop rows past `rows` in a partition (rows=0 removes the partition data)
+    def truncate(self, day, rows):
+        with self._lock:
+            self._blocks.pop(day, None)
+            for column, dtype in self.columns.items():
+                path = self._column_path(day, column)
+                if os.path.exists(path) and os.path.getsize(path) > rows * dtype.itemsize:
+                    with open(path, "r+b") as file:
+                        file.truncate(rows * dtype.itemsize)
+
+    # Function to append a batch of records (dicts as produced by collect_sensor_data)
+    def append(self, records):
+        if isinstance(records, dict):
+            records = [records]
+        if not records:
+            return 0
+        columns = {"timestamp": np.array([to_epoch(r["timestamp"]) for r in records], dtype=self.columns["timestamp"])}
+        for column in self.value_columns:
+            columns[column] = np.array([r[column] for r in records], dtype=self.columns[column])
+        return self.append_columns(columns)
+
+    # Function to append typed column arrays (timestamp as epoch seconds), split by partition
+    def append_columns(self, columns):
+        epochs = np.asarray(columns["timestamp"], dtype=self.columns["timestamp"])
+        days = epochs.astype("datetime64[s]").astype(f"datetime64[{self.unit}]")
+        for day in np.unique(days):
+            index = np.flatnonzero(days == day)
+            part = {"timestamp": epochs[index]}
+            for column in self.value_columns:
+                part[column] = np.asarray(columns[column], dtype=self.columns[column])[index]
+            self._append_partition(str(day), part)
+        return len(epochs)
+
+    # Function to append already-typed column arrays to a single day partition. Holds the lock so
+    # a reader sorting or replacing the partition never swaps it out under a half-done append.
+    def _append_partition(self, day, columns):
+        with self._lock:
+            directory = os.path.join(self.root, day)
+            os.makedirs(directory, exist_ok=True)
+            rows = self._row_count(day)
+            timestamps = columns["timestamp"]
+            if rows and len(timestamps):
+                last = self._memmap(day, "timestamp", rows)[-1]
+                if timestamps[0] < last or np.any(np.diff(timestamps) < 0):
+                    open(os.path.join(directory, UNSORTED_MARKER), "w").close()
+            # Write the timestamp last so a torn append never exposes a half-written row
+            for column in self.value_columns + ["timestamp"]:
+                path = self._column_path(day, column)
+                with open(path, "r+b" if os.path.exists(path) else "wb") as file:
+                    file.seek(rows * self.columns[column].itemsize)
+                    file.truncate()
+                    file.write(np.ascontiguousarray(columns[column], dtype=self.columns[column]).tobytes())
+
+    def _memmap(self, day, column, rows):
+        if rows == 0:
+            return np.empty(0, dtype=self.columns[column])
+        return np.memmap(self._column_path(day, column), dtype=self.columns[column], mode="r", shape=(rows,))
+
+    # Function to sort a partition that was flagged as out of order
+    def _sort_partition(self, day):
+        with self._lock:
+            if not os.path.exists(os.path.join(self.root, day, UNSORTED_MARKER)):
+                return  # Another thread sorted it first
+            rows = self._row_count(day)
+            order = np.argsort(np.array(self._memmap(day, "timestamp", rows)), kind="stable")
+            columns = {column: np.array(self._memmap(day, column, rows))[order] for column in self.columns}
+            # Swapped in whole (without the marker), so a crash mid-sort keeps the unsorted partition
+            self.replace_partition(day, columns)
+
+    # Function to replace a whole partition with new sorted columns. The new data is written to a
+    # hidden directory and swapped in, so readers see either the old or the new partition.
+    def replace_partition(self, day, columns):
+        with self._lock:
+            staging = os.path.join(self.root, ".new-" + day)
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for column in self.columns:
+                with open(os.path.join(staging, column + ".bin"), "wb") as file:
+                    file.write(np.ascontiguousarray(columns[column], dtype=self.columns[column]).tobytes())
+            # Two renames, so the partition is only missing between them; open memmaps keep the old files
+            directory = os.path.join(self.root, day)
+            retired = os.path.join(self.root, ".old-" + day)
+            shutil.rmtree(retired, ignore_errors=True)
+            if os.path.exists(directory):
+                os.rename(directory, retired)
+            os.rename(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+            self._blocks.pop(day, None)
+
+    # Function to delete a partition (used by retention once it has been rolled up)
+    def remove_partition(self, day):
+        with self._lock:
+            directory = os.path.join(self.root, day)
+            if os.path.exists(directory):
+                retired = os.path.join(self.root, ".old-" + day)
+                shutil.rmtree(retired, ignore_errors=True)
+                os.rename(directory, retired)
+                shutil.rmtree(retired)
+            self._blocks.pop(day, None)
+
+    # Function to get the sparse block index of a partition, extending it after appends
+    def _block_index(self, day, timestamps):
+        rows = len(timestamps)
+        cached = self._blocks.get(day)
+        if cached is None or cached[0] > rows or (rows and cached[1][0] != timestamps[0]):
+            blocks = np.array(timestamps[::BLOCK_ROWS])
+        elif cached[0] == rows:
+            return cached[1]
+        else:
+            done = len(cached[1])  # Blocks already indexed keep their first timestamp
+            blocks = np.concatenate([cached[1], timestamps[done * BLOCK_ROWS::BLOCK_ROWS]])
+        self._blocks[day] = (rows, blocks)
+        return blocks
+
+    # Function to find the first row with timestamp >= epoch: a binary search over the in-memory
+    # block index, then one within a single block of the memmap, so only that block is paged in
+    def _locate(self, day, timestamps, epoch):
+        blocks = self._block_index(day, timestamps)
+        block = int(np.searchsorted(blocks, epoch, side="left"))
+        if block == 0:
+            return 0
+        lo = (block - 1) * BLOCK_ROWS
+        hi = min(block * BLOCK_ROWS, len(timestamps))
+        return lo + int(np.searchsorted(timestamps[lo:hi], epoch, side="left"))
+
+    # Function to list the day partitions that can hold rows in [start, end), by bisecting the sorted names
+    def _partitions_between(self, start, end):
+        days = self.partitions()
+        lo = 0 if start is None else bisect.bisect_left(days, partition_for(start, self.unit))
+        hi = len(days) if end is None else bisect.bisect_right(days, partition_for(end - 1, self.unit))
+        return days[lo:hi]
+
+    # Generator yielding (day, {column: memmap view}) restricted to [start, end)
+    def scan(self, columns=None, start=None, end=None):
+        columns = list(columns or self.value_columns)
+        start = None if start is None else to_epoch(start)
+        end = None if end is None else to_epoch(end)
+        for day in self._partitions_between(start, end):
+            if os.path.exists(os.path.join(self.root, day, UNSORTED_MARKER)):
+                self._sort_partition(day)
+            rows = self._row_count(day)
+            timestamps = self._memmap(day, "timestamp", rows)
+            lo = 0 if start is None else self._locate(day, timestamps, start)
+            hi = rows if end is None else self._locate(day, timestamps, end)
+            if hi <= lo:
+                continue
+            view = {"timestamp": timestamps[lo:hi]}
+            for column in columns:
+                if column != "timestamp":
+                    view[column] = self._memmap(day, column, rows)[lo:hi]
+            yield day, view
+
+    # Function to read columns over a time range; a single partition is returned without copying
+    def read(self, columns=None, start=None, end=None):
+        columns = list(columns or self.value_columns)
+        chunks = [view for _, view in self.scan(columns, start, end)]
+        names = ["timestamp"] + [c for c in columns if c != "timestamp"]
+        if not chunks:
+            return {name: np.empty(0, dtype=self.columns[name]) for name in names}
+        if len(chunks) == 1:
+            return chunks[0]
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in names}
+
+
+# Function to check a farm or plot id before it is used as a directory name
+def check_series_id(value):
+    if not value or value.startswith(".") or "/" in value or "\\" in value:
+        raise ValueError(f"Invalid farm/plot id: {value!r}")
+    return value
+
+
+# Sensor history of many farms: one ColumnStore per (farm, plot) under root/farm/plot
+class FarmStore:
+    def __init__(self, root="ecorice_store"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._series = {}
+        self._migrate_single_series()
+
+    # Function to move day partitions of the old single-stream layout under the default farm/plot
+    def _migrate_single_series(self):
+        days = [name for name in os.listdir(self.root) if DAY_PATTERN.match(name)]
+        if not days:
+            return
+        target = os.path.join(self.root, DEFAULT_FARM, DEFAULT_PLOT)
+        os.makedirs(target, exist_ok=True)
+        for day in days:
+            shutil.move(os.path.join(self.root, day), os.path.join(target, day))
+
+    def _children(self, path):
+        return sorted(
+            name for name in os.listdir(path)
+            if os.path.isdir(os.path.join(path, name)) and not name.startswith(".")
+        )
+
+    def farms(self):
+        return self._children(self.root)
+
+    def plots(self, farm_id):
+        path = os.path.join(self.root, farm_id)
+        return self._children(path) if os.path.isdir(path) else []
+
+    # (farm_id, plot_id) of every series on disk
+    def series_ids(self):
+        return [(farm_id, plot_id) for farm_id in self.farms() for plot_id in self.plots(farm_id)]
+
+    # Function to get (creating on first use) the ColumnStore of one plot
+    def series(self, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT):
+        key = (farm_id, plot_id)
+        if key not in self._series:
+            path = os.path.join(self.root, check_series_id(farm_id), check_series_id(plot_id))
+            self._series[key] = ColumnStore(path)
+        return self._series[key]
+
+    # Function to forget the cached views of one plot, its rollups included, after another process
+    # rewrote its partitions on disk
+    def invalidate(self, farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT):
+        from .compaction import drop_rollup_stores  # compaction imports this module
+        self._series.pop((farm_id, plot_id), None)
+        drop_rollup_stores(os.path.join(self.root, check_series_id(farm_id), check_series_id(plot_id)))
+
+    def __len__(self):
+        return sum(len(self.series(*key)) for key in self.series_ids())
+
+    # Function to append records, routed to their plot by farm_id/plot_id
+    def append(self, records):
+        if isinstance(records, dict):
+            records = [records]
+        groups = {}
+        for record in records:
+            key = (record.get("farm_id") or DEFAULT_FARM, record.get("plot_id") or DEFAULT_PLOT)
+            groups.setdefault(key, []).append(record)
+        for key, group in groups.items():
+            self.series(*key).append(group)
+        return len(records)
+
+    # Function to read fields over [start, end) for every plot (or one farm/plot), oldest first per
+    # plot. The "field" column holds "farm/plot" per row, so the result feeds the RuleEngine directly.
+    # resolution picks raw rows (None), a rollup level ("1m", "1h", "1d") with field means, or "auto"
+    # for the finest level each plot can return within its point budget.
+    @timed("store.query")
+    def query(self, fields=None, start=None, end=None, farm=None, plot=None, resolution=None):
+        fields = [f for f in (fields or FLOAT_COLUMNS) if f != "timestamp"]
+        chunks = []
+        for farm_id, plot_id in self.series_ids():
+            if (farm is None or farm_id == farm) and (plot is None or plot_id == plot):
+                series = self.series(farm_id, plot_id)
+                level = resolution
+                if level is not None:
+                    from .compaction import choose_level, read_rollup  # compaction imports this module
+                    level = choose_level(series, start, end) if level == "auto" else level
+                if level in (None, "raw"):
+                    data = series.read(fields, start, end)
+                else:
+                    data = read_rollup(series, level, fields, start, end)
+                data["field"] = np.full(len(data["timestamp"]), f"{farm_id}/{plot_id}")
+                chunks.append(data)
+        names = ["timestamp", "field"] + fields
+        if not chunks:
+            return {name: np.empty(0, dtype=COLUMNS.get(name, "U")) for name in names}
+        if len(chunks) == 1:
+            return {name: chunks[0][name] for name in names}
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in names}
+
+    # Partition keys ("farm/plot/day") across all series, used by the writer's journal
+    def partitions(self):
+        return [f"{farm_id}/{plot_id}/{day}" for farm_id, plot_id in self.series_ids()
+                for day in self.series(farm_id, plot_id).partitions()]
+
+    def row_counts(self, partitions=None):
+        if partitions is not None:
+            counts = {}
+            for partition in partitions:
+                farm_id, plot_id, day = partition.split("/")
+                counts[partition] = self.series(farm_id, plot_id)._row_count(day)
+            return counts
+        counts = {}
+        for farm_id, plot_id in self.series_ids():
+            for day, rows in self.series(farm_id, plot_id).row_counts().items():
+                counts[f"{farm_id}/{plot_id}/{day}"] = rows
+        return counts
+
+    # Function to list the "farm/plot/day" partitions a batch of records falls into
+    def partitions_of(self, records):
+        if isinstance(records, dict):
+            records = [records]
+        groups = {}
+        for record in records:
+            key = (record.get("farm_id") or DEFAULT_FARM, record.get("plot_id") or DEFAULT_PLOT)
+            groups.setdefault(key, []).append(record)
+        return [f"{farm_id}/{plot_id}/{day}" for (farm_id, plot_id), group in groups.items()
+                for day in self.series(farm_id, plot_id).partitions_of(group)]
+
+    def truncate(self, partition, rows):
+        farm_id, plot_id, day = partition.split("/")
+        self.series(farm_id, plot_id).truncate(day, rows)
+
+
+# Function to ingest rows appended to a CSV since the last call (the first call imports it all).
+# The logger CSV carries no farm/plot ids, so its rows go to the given plot.
+@timed("store.ingest_csv")
+def ingest_csv(store, filename="ecorice_data.csv", farm_id=DEFAULT_FARM, plot_id=DEFAULT_PLOT):
+    state_path = os.path.join(store.root, FOLLOW_STATE)
+    # Dashboards and the server may ingest the same CSV at once: hold an exclusive lock from reading
+    # the offset to saving the new one, or both would append the same rows. The state file itself is
+    # replaced on save, so the lock lives in a file of its own.
+    with open(state_path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return _ingest_csv(store, state_path, filename, farm_id, plot_id)
+
+
+def _ingest_csv(store, state_path, filename, farm_id, plot_id):
+    state = None
+    if os.path.exists(state_path):
+        with open(state_path) as file:
+            state = json.load(file)
+    follower = CsvFollower(filename, keep_history=False, state=state)
+    table = follower.refresh()  # After a rotation the new file's rows are new readings
+    epochs = table["timestamp"].astype("int64")
+    order = np.argsort(epochs, kind="stable")  # Keep partitions ordered
+    columns = {"timestamp": epochs[order]}
+    for column in FLOAT_COLUMNS:
+        columns[column] = table[column][order]
+    ingested = store.series(farm_id, plot_id).append_columns(columns)
+    if follower.state() == state:
+        return ingested  # Nothing new: leave the state file alone (charts poll this several times a second)
+    with open(state_path + ".tmp", "w") as file:
+        json.dump(follower.state(), file)
+    os.replace(state_path + ".tmp", state_path)
+    return ingested
+
+
+# Function to open the store, catching up on rows appended to the CSV since the last open
+def open_store(root="ecorice_store", legacy_csv="ecorice_data.csv"):
+    store = FarmStore(root)
+    if os.path.exists(legacy_csv):
+        ingest_csv(store, legacy_csv)
+    return store
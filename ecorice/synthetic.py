@@ -0,0 +1,91 @@
+import numpy as np
+from .acquisition import DEFAULT_RANGES
+from .store import FLOAT_COLUMNS, to_epoch, from_epoch
+
+# Rows generated per block; every block has its own seed, so the data does not depend on how
+# the caller chunks it and any block can be regenerated on its own
+BLOCK_ROWS = 1 << 16
+# Length of one simulated AWD cycle: flooded, drawn down below the threshold, re-flooded (seconds)
+AWD_CYCLE = 7 * 86400
+
+
+# Function to list the (farm_id, plot_id) series of a synthetic fleet
+def fleet(farms=1, plots=1):
+    return [(f"farm-{farm}", f"plot-{plot}") for farm in range(1, farms + 1) for plot in range(1, plots + 1)]
+
+
+# Function to generate rows [first, first + count) of one series. Values stay inside the
+# collect_sensor_data ranges but follow an AWD cycle and a daily cycle, so rules, rollups and
+# carbon accounting see realistic flooded and dried periods instead of white noise.
+def generate_block(series_index, first, count, seed=0, start="2025-05-01 00:00:00", interval=1):
+    if first % BLOCK_ROWS + count > BLOCK_ROWS:
+        raise ValueError("A generated block cannot cross a seed block boundary")
+    rng = np.random.default_rng([seed, series_index, first // BLOCK_ROWS])
+    skip = first % BLOCK_ROWS
+    # Always draw the whole seed block's noise and keep our slice of it
+    noise = iter(rng.standard_normal((5, BLOCK_ROWS))[:, skip:skip + count])
+
+    epochs = to_epoch(start) + (first + np.arange(count, dtype=np.int64)) * interval
+    phase = (epochs + series_index * 86400) % AWD_CYCLE / AWD_CYCLE  # Fields are a day apart
+    day = np.sin(2 * np.pi * (epochs % 86400) / 86400 - np.pi / 2)  # -1 at midnight, 1 at noon
+
+    def scaled(name, unit):  # Map [0, 1] into the channel's range
+        low, high = DEFAULT_RANGES[name]
+        return low + (high - low) * np.clip(unit, 0.0, 1.0)
+
+    water = np.where(phase < 0.85, 1.0 - phase / 0.85, (phase - 0.85) / 0.15)  # Drawdown, then refill
+    columns = {
+        "timestamp": epochs,
+        "water_level": scaled("water_level", water + 0.02 * next(noise)),
+        "soil_moisture": scaled("soil_moisture", 0.35 + 0.6 * water + 0.03 * next(noise)),
+        "air_temp": scaled("air_temp", 0.5 + 0.4 * day + 0.05 * next(noise)),
+        "air_humidity": scaled("air_humidity", 0.5 - 0.35 * day + 0.05 * next(noise)),
+        "co2_emissions": scaled("co2_emissions", 0.3 + 0.5 * water + 0.1 * day + 0.05 * next(noise)),
+    }
+    return columns
+
+
+# Generator yielding (farm_id, plot_id, columns) blocks for `rows` readings spread over the fleet
+def generate(rows, farms=1, plots=1, seed=0, start="2025-05-01 00:00:00", interval=1, block_rows=BLOCK_ROWS):
+    series = fleet(farms, plots)
+    per_series = -(-rows // len(series))
+    for index, (farm_id, plot_id) in enumerate(series):
+        count = max(0, min(per_series, rows - index * per_series))
+        first = 0
+        while first < count:
+            # Blocks never straddle a seed block, so chunking does not change the values
+            size = min(block_rows, count - first, BLOCK_ROWS - first % BLOCK_ROWS)
+            yield farm_id, plot_id, generate_block(index, first, size, seed, start, interval)
+            first += size
+
+
+# Function to generate a dataset into a store; returns the rows written
+def write_store(store, rows, farms=1, plots=1, seed=0, **options):
+    written = 0
+    for farm_id, plot_id, columns in generate(rows, farms, plots, seed, **options):
+        written += store.series(farm_id, plot_id).append_columns(columns)
+    return written
+
+
+# Function to generate readings as the dicts collect_sensor_data returns
+def records(rows, farms=1, plots=1, seed=0, **options):
+    for farm_id, plot_id, columns in generate(rows, farms, plots, seed, **options):
+        values = [columns[name].tolist() for name in FLOAT_COLUMNS]
+        for epoch, row in zip(columns["timestamp"].tolist(), zip(*values)):
+            reading = {"timestamp": from_epoch(epoch), "farm_id": farm_id, "plot_id": plot_id}
+            reading.update(zip(FLOAT_COLUMNS, row))
+            yield reading
+
+
+# Function to write a dataset in the logger's CSV layout (full float precision); returns rows written
+def write_csv(path, rows, seed=0, **options):
+    written = 0
+    with open(path, "w", newline="") as file:
+        file.write("timestamp," + ",".join(FLOAT_COLUMNS) + "\r\n")
+        for _, _, columns in generate(rows, 1, 1, seed, **options):
+            stamps = np.datetime_as_string(columns["timestamp"].astype("datetime64[s]"))
+            stamps = np.char.replace(stamps, "T", " ").tolist()
+            values = [columns[name].tolist() for name in FLOAT_COLUMNS]
+            file.write("".join(",".join(map(str, (stamp,) + row)) + "\r\n" for stamp, row in zip(stamps, zip(*values))))
+            written += len(stamps)
+    return written
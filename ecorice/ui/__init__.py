@@ -0,0 +1,2 @@
+# Tkinter/Matplotlib helpers shared by the front-end scripts. Kept out of the
+# core package namespace so headless use never imports a GUI toolkit.
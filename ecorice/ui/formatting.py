@@ -0,0 +1,18 @@
+# Dashboard labels and units for each channel of a reading
+LABELS = [
+    ("Soil Moisture", "soil_moisture", "%"),
+    ("Water Level", "water_level", "cm"),
+    ("Temperature", "air_temp", "°C"),
+    ("Humidity", "air_humidity", "%"),
+    ("CO₂ Emissions", "co2_emissions", "ppm"),
+]
+
+
+# Function to format a sensor reading for the dashboard labels (missing values, such as those
+# masked as faulty, show N/A)
+def format_reading(reading):
+    text = {}
+    for label, channel, unit in LABELS:
+        value = reading.get(channel)
+        text[label] = "N/A" if value is None or value != value else f"{value:.2f} {unit}"
+    return text
@@ -0,0 +1,224 @@
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from matplotlib import dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from ..downsample import Pyramid, budget_from_width
+from .. import metrics
+
+# Fraction of the current span added when new data falls outside the axes, so
+# full redraws (the only ones that re-render ticks and labels) stay rare
+HEADROOM = 0.25
+# Markers are only drawn while a line shows at most this many points
+MARKER_LIMIT = 200
+
+
+# Embedded Matplotlib chart that keeps its Line2D artists and blits new points
+class LiveChart:
+    def __init__(self, parent, series, title="", ylabel="Values", fps=5, source=None, figsize=(4.8, 3.5),
+                 mode="minmax"):
+        self.series = series  # List of (column, label, line style kwargs)
+        self.fps = fps
+        self.mode = mode  # Downsampling mode: "minmax" or "lttb"
+        self.source = source  # Optional callable returning newly arrived columns
+        self.figure = Figure(figsize=figsize, dpi=100)
+        self.axes = self.figure.add_subplot()
+        self.axes.set_title(title)
+        self.axes.set_xlabel("Time")
+        self.axes.set_ylabel(ylabel)
+        self.axes.grid()
+        locator = mdates.AutoDateLocator()
+        self.axes.xaxis.set_major_locator(locator)
+        self.axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        self.lines = {}
+        self.markers = {}
+        for column, label, style in series:
+            (self.lines[column],) = self.axes.plot([], [], label=label, animated=True, **style)
+            self.markers[column] = self.lines[column].get_marker()
+        self.axes.legend(loc="upper left")
+        self.figure.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.widget = self.canvas.get_tk_widget()
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+        self._pyramids = {column: Pyramid(mode=mode) for column, _, _ in series}
+        self._shown_limits = None  # X limits the line data was last downsampled for
+        self._background = None
+        self._dirty = False
+        self._needs_full_draw = True
+        self._after_id = None
+
+    def pack(self, **kwargs):
+        self.widget.pack(**kwargs)
+
+    def grid(self, **kwargs):
+        self.widget.grid(**kwargs)
+
+    # Function to replace everything shown with a new history
+    def set_data(self, timestamps, columns):
+        self._pyramids = {column: Pyramid(mode=self.mode) for column in self._pyramids}
+        self._needs_full_draw = True
+        self._shown_limits = None
+        if not len(timestamps):  # An empty range: take the last range's lines off on the next redraw
+            for line in self.lines.values():
+                line.set_data([], [])
+            self._dirty = True
+            return
+        order = np.argsort(np.asarray(timestamps), kind="stable")  # Pyramids need increasing x
+        self.append(np.asarray(timestamps)[order], {column: np.asarray(columns[column])[order] for column in self.lines})
+
+    # Function to add points; they appear on the next refresh tick
+    def append(self, timestamps, columns):
+        count = len(timestamps)
+        if count == 0:
+            return
+        x = mdates.date2num(np.asarray(timestamps, dtype="datetime64[s]"))
+        had_data = len(next(iter(self._pyramids.values()))) > 0
+        for column, pyramid in self._pyramids.items():
+            pyramid.extend(x, columns[column])
+        self._needs_full_draw |= self._expand_limits(x, [columns[column] for column in self._pyramids], had_data)
+        self._shown_limits = None
+        self._dirty = True
+
+    # Function to widen the axes (with headroom) if new points fall outside; True if they changed
+    def _expand_limits(self, x, ys, had_data):
+        x_min, x_max = self.axes.get_xlim() if had_data else (np.inf, -np.inf)
+        y_min, y_max = self.axes.get_ylim() if had_data else (np.inf, -np.inf)
+        ys = np.concatenate([np.asarray(y, dtype=float) for y in ys])
+        ys = ys[np.isfinite(ys)]
+        new_x = (min(x_min, x.min()), max(x_max, x.max()))
+        new_y = (min(y_min, ys.min()), max(y_max, ys.max())) if len(ys) else (y_min, y_max)
+        if new_x == (x_min, x_max) and new_y == (y_min, y_max):
+            return False
+        x_pad = max(new_x[1] - new_x[0], 1 / 1440) * HEADROOM
+        y_pad = max(new_y[1] - new_y[0], 1.0) * HEADROOM
+        self.axes.set_xlim(new_x[0] - (x_pad if new_x[0] < x_min else 0), new_x[1] + (x_pad if new_x[1] > x_max else 0))
+        if np.isfinite(new_y).all():
+            self.axes.set_ylim(new_y[0] - (y_pad if new_y[0] < y_min else 0), new_y[1] + (y_pad if new_y[1] > y_max else 0))
+        return True
+
+    # Capture the static background after every full draw (including resizes and zooms),
+    # then paint the lines on top
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._update_lines()
+        for line in self.lines.values():
+            self.axes.draw_artist(line)
+
+    # Function to give each line a downsampled view of the visible range, sized to the plot width
+    def _update_lines(self):
+        limits = self.axes.get_xlim()
+        if limits == self._shown_limits:
+            return
+        self._shown_limits = limits
+        budget = budget_from_width(self.axes.bbox.width, self.mode)
+        for column, line in self.lines.items():
+            x, y = self._pyramids[column].select(limits[0], limits[1], budget)
+            line.set_data(x, y)
+            line.set_marker(self.markers[column] if len(x) <= MARKER_LIMIT else "None")
+
+    # Function to redraw: full draw when the axes changed, otherwise a blit of the lines only
+    def redraw(self):
+        self._dirty = False
+        self._update_lines()
+        if self._needs_full_draw or self._background is None:
+            self._needs_full_draw = False
+            with metrics.timing("chart.full_draw"):
+                self.canvas.draw()  # Triggers _on_draw
+                self.canvas.blit(self.figure.bbox)
+            return
+        with metrics.timing("chart.blit"):
+            self.canvas.restore_region(self._background)
+            for line in self.lines.values():
+                self.axes.draw_artist(line)
+            self.canvas.blit(self.axes.bbox)
+
+    # Function to start the fixed-FPS refresh loop on the Tk event loop
+    def start(self):
+        if self._after_id is None:
+            self._tick()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        if self.source is not None:
+            with metrics.timing("chart.poll"):
+                new = self.source()
+            if new is not None and len(new["timestamp"]):
+                self.append(new["timestamp"], new)
+        if self._dirty:
+            self.redraw()
+        self._after_id = self.widget.after(int(1000 / self.fps), self._tick)
+
+
+# Function to show a chart in a Toplevel that is created once and reused on later calls
+def chart_window(master, windows, key, title, series, ylabel="Values"):
+    chart = windows.get(key)
+    if chart is not None and chart.widget.winfo_exists():
+        chart.widget.winfo_toplevel().deiconify()
+        chart.widget.winfo_toplevel().lift()
+        return chart
+    window = tk.Toplevel(master)
+    window.title(title)
+    chart = LiveChart(window, series, title=title, ylabel=ylabel, figsize=(10, 5))
+    chart.pack(fill="both", expand=True)
+    windows[key] = chart
+    return chart
+
+
+# Function to wrap a blocking fetch (such as a query to a remote server) as a chart source that never
+# waits: each call returns the last finished result (None while none is ready) and starts the next
+# fetch on a worker thread. A failed fetch is kept in `source.error` and retried on the next tick.
+def background_source(fetch):
+    jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-poll")
+    pending = None
+
+    def source():
+        nonlocal pending
+        result = None
+        if pending is not None and pending.done():
+            try:
+                result = pending.result()
+                source.error = None
+            except Exception as e:
+                source.error = e
+            pending = None
+        if pending is None:
+            pending = jobs.submit(fetch)
+        return result
+
+    source.error = None
+    source.close = lambda: jobs.shutdown(wait=False, cancel_futures=True)
+    return source
+
+
+# Function to load a store range into a chart and, for open-ended ranges, follow rows written after it.
+# Long ranges come from the rollup tables (resolution "auto"); followed rows are always raw.
+# With background=True (a remote store) the follow-up polls run off the Tk thread.
+def show_store_range(chart, store, fields, start=None, end=None, farm=None, plot=None, refresh=None, background=False):
+    history = store.query(fields, start, end, farm=farm, plot=plot, resolution="auto")
+    chart.set_data(history["timestamp"].astype("datetime64[s]"), history)
+    last = history["timestamp"][-1] if len(history["timestamp"]) else None
+
+    # Function to fetch rows written since the last chart tick
+    def poll_store():
+        nonlocal last
+        if refresh is not None:
+            refresh()
+        new = store.query(fields, None if last is None else last + 1, None, farm=farm, plot=plot)
+        if not len(new["timestamp"]):
+            return None
+        last = new["timestamp"][-1]
+        return dict(new, timestamp=new["timestamp"].astype("datetime64[s]"))
+
+    if getattr(chart.source, "close", None) is not None:
+        chart.source.close()  # The worker of the range shown before
+    chart.source = None if end is not None else background_source(poll_store) if background else poll_store
+    chart.redraw()
+    chart.start()
+    return chart
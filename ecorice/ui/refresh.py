@@ -0,0 +1,102 @@
+import time
+from .. import metrics
+
+# Refresh intervals (ms): normal, on a page that does not show the data, and while the window is minimized
+REFRESH_MS = 200
+IDLE_MS = 1000
+HIDDEN_MS = 5000
+# Longest interval the loop backs off to while the event loop is lagging
+MAX_BACKOFF_MS = 2000
+# The loop backs off when a tick fires this late, or when the callback takes this share of the interval
+LAG_LIMIT = 0.05
+BUSY_FRACTION = 0.25
+
+
+# Periodic refresh on the Tk event loop (`after`) that slows down when nobody is looking and when
+# the loop is overloaded: doubles its interval while ticks run late or the callback is expensive,
+# decays back to `interval_ms` once the loop keeps up, and idles on other pages or when minimized.
+class AdaptiveRefresh:
+    def __init__(self, widget, callback, interval_ms=REFRESH_MS, idle_ms=IDLE_MS, hidden_ms=HIDDEN_MS,
+                 max_backoff_ms=MAX_BACKOFF_MS, active=None, name="tk.refresh"):
+        self.widget = widget
+        self.callback = callback
+        self.interval_ms = interval_ms
+        self.idle_ms = idle_ms
+        self.hidden_ms = hidden_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.active = active  # Optional callable: False while the data's page is not raised
+        self.name = name
+        self.current_ms = interval_ms  # Interval in effect, including any back-off
+        self._after_id = None
+        self._due = None
+
+    def start(self):
+        if self._after_id is None:
+            self._schedule(0)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    # Function to refresh right away, e.g. when the page showing the data is raised
+    def poke(self):
+        self.stop()
+        self._schedule(0)
+
+    def _schedule(self, delay_ms):
+        self._due = time.perf_counter() + delay_ms / 1000
+        self._after_id = self.widget.after(delay_ms, self._tick)
+
+    def _visible(self):
+        try:
+            return bool(self.widget.winfo_toplevel().winfo_viewable())
+        except Exception:  # Window being destroyed
+            return False
+
+    # Function to pick the next interval from how late this tick ran and how long it took
+    def _next_interval(self, lag, cost):
+        if lag > LAG_LIMIT or cost > self.current_ms / 1000 * BUSY_FRACTION:
+            self.current_ms = min(self.current_ms * 2, self.max_backoff_ms)
+        else:
+            self.current_ms = max(int(self.current_ms * 0.75), self.interval_ms)
+        if not self._visible():
+            return max(self.current_ms, self.hidden_ms)
+        if self.active is not None and not self.active():
+            return max(self.current_ms, self.idle_ms)
+        return self.current_ms
+
+    def _tick(self):
+        lag = max(time.perf_counter() - self._due, 0.0)
+        began = time.perf_counter()
+        try:
+            self.callback()
+        finally:
+            cost = time.perf_counter() - began
+            metrics.observe(self.name + "_lag", lag)
+            metrics.observe(self.name, cost)
+            self._schedule(self._next_interval(lag, cost))
+
+
+# Widget text updates that only touch Tk when the formatted value changed. Readings drained in
+# one tick collapse to their latest values, so a burst of readings costs one pass over the widgets.
+class TextUpdates:
+    def __init__(self, setter):
+        self.setter = setter  # Callable (key, text) applying one value, e.g. label.config / StringVar.set
+        self.shown = {}
+
+    # Function to show {key: text}; returns the number of widgets actually updated
+    def apply(self, values):
+        changed = 0
+        for key, text in values.items():
+            if self.shown.get(key) != text:
+                self.setter(key, text)
+                self.shown[key] = text
+                changed += 1
+        metrics.count("ui.widget_updates", changed)
+        metrics.count("ui.widget_updates_skipped", len(values) - changed)
+        return changed
+
+    # Function to forget what is shown, so the next apply writes every widget
+    def clear(self):
+        self.shown.clear()
@@ -0,0 +1,242 @@
+import os
+import csv
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from . import metrics
+
+FIELDNAMES = ["timestamp", "soil_moisture", "water_level", "air_temp", "air_humidity", "co2_emissions"]
+
+
+# Function to atomically persist a journal entry (temp file + fsync + rename)
+def write_journal(path, entry):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(entry, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+# Function to read a journal left behind by an interrupted flush (None if there is none)
+def read_journal(path):
+    if os.path.exists(path + ".tmp"):
+        os.remove(path + ".tmp")  # Never renamed, so the batch was never applied
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+# Sink appending batches to the columnar sensor store
+class StoreSink:
+    def __init__(self, store, crash_safe=False):
+        self.store = store
+        self.crash_safe = crash_safe
+        self.journal_path = os.path.join(store.root, ".journal")
+        self.recover()
+
+    # Function to replay a batch whose append was interrupted
+    def recover(self):
+        entry = read_journal(self.journal_path)
+        if entry is None:
+            return
+        self._apply(entry)
+        os.remove(self.journal_path)
+
+    # Function to cut the partitions a batch touched back to their pre-batch sizes
+    def _rollback(self, entry):
+        for partition, rows in entry["rows"].items():
+            self.store.truncate(partition, rows)
+
+    def _apply(self, entry):
+        # Roll every partition back to its pre-batch size, then append the batch again
+        self._rollback(entry)
+        self.store.append(entry["records"])
+
+    def write(self, records):
+        if not self.crash_safe:
+            self.store.append(records)
+            return
+        failed = read_journal(self.journal_path)
+        if failed is not None:  # A failed write being retried: take back the rows it got in
+            self._rollback(failed)
+        # Only the partitions this batch appends to, so a flush costs the same however long the history
+        entry = {"rows": self.store.row_counts(self.store.partitions_of(records)), "records": records}
+        write_journal(self.journal_path, entry)
+        self._apply(entry)
+        os.remove(self.journal_path)
+
+    def close(self):
+        pass
+
+
+# Sink appending batches to a CSV file that is kept open between batches
+class CsvSink:
+    def __init__(self, filename="ecorice_data.csv", fieldnames=FIELDNAMES, crash_safe=False):
+        self.filename = filename
+        self.fieldnames = fieldnames
+        self.crash_safe = crash_safe
+        self.journal_path = filename + ".journal"
+        self.recover()
+        self.file = open(filename, mode="a", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction="ignore")
+        if self.file.tell() == 0:  # Write headers only if the file is new
+            self.writer.writeheader()
+            self.file.flush()
+
+    # Function to replay a batch whose append was interrupted
+    def recover(self):
+        entry = read_journal(self.journal_path)
+        if entry is None:
+            return
+        with open(self.filename, mode="r+", newline="") as file:
+            self._apply(file, entry)
+        os.remove(self.journal_path)
+
+    def _apply(self, file, entry):
+        # Cut off any partial row from the interrupted write before appending the batch
+        file.seek(entry["offset"])
+        file.truncate()
+        file.write(entry["text"])
+        file.flush()
+        os.fsync(file.fileno())
+
+    def _format(self, records):
+        lines = []
+        for record in records:
+            lines.append(",".join(str(record[name]) for name in self.fieldnames) + "\r\n")
+        return "".join(lines)
+
+    def write(self, records):
+        if not self.crash_safe:
+            self.writer.writerows(records)
+            self.file.flush()
+            return
+        failed = read_journal(self.journal_path)
+        if failed is not None:  # A failed write being retried: cut off what it got in
+            self.file.seek(failed["offset"])
+            self.file.truncate()
+        entry = {"offset": self.file.tell(), "text": self._format(records)}
+        write_journal(self.journal_path, entry)
+        self._apply(self.file, entry)
+        os.remove(self.journal_path)
+
+    def close(self):
+        self.file.close()
+
+
+# Buffers records in a bounded ring buffer and flushes them to a sink on a background thread.
+# A batch the sink fails to write goes back to the front of the buffer and is retried every
+# retry_delay seconds (the failure is raised once from the next write/flush/close).
+class SensorWriter:
+    def __init__(self, sink, batch_size=256, max_age=2.0, capacity=8192, retry_delay=1.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.capacity = capacity
+        self.retry_delay = retry_delay
+        self.error = None
+        self._buffer = deque()
+        self._oldest = None  # Arrival time of the oldest buffered record
+        self._retry_at = 0.0  # No flush before this time after a failed one
+        self._flushing = 0  # Records taken from the buffer but not yet on disk
+        self._flush_requested = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="sensor-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Function to queue one record; returns immediately unless the ring buffer is full. A failed
+    # flush is raised here once, after the record is queued, so the record is kept either way.
+    def write(self, record):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Sensor writer is closed")
+            while len(self._buffer) >= self.capacity:
+                # Back-pressure: wait for the flusher instead of dropping readings
+                self._condition.notify_all()
+                self._condition.wait()
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+            self._raise_error()
+
+    # Function to block until everything queued so far has reached the sink, or raise the sink's
+    # error (the records stay queued and are retried)
+    def flush(self):
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while (self._buffer or self._flushing) and self._thread.is_alive() and self.error is None:
+                self._condition.wait(0.1)
+            self._raise_error()
+
+    # Clean-shutdown hook: flush what is buffered, stop the thread and close the sink
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.sink.close()
+        atexit.unregister(self.close)
+        with self._condition:
+            self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _due(self):
+        if self._closed:
+            return True
+        if time.monotonic() < self._retry_at and not self._flush_requested:
+            return False
+        if len(self._buffer) >= self.batch_size:
+            return True
+        if self._flush_requested and self._buffer:
+            return True
+        return bool(self._buffer) and time.monotonic() - self._oldest >= self.max_age
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._due():
+                    timeout = None if not self._buffer else \
+                        max(self._oldest + self.max_age, self._retry_at) - time.monotonic()
+                    self._condition.wait(timeout)
+                if self._closed and not self._buffer:
+                    return
+                batch = list(self._buffer)
+                self._buffer.clear()
+                self._flush_requested = False
+                self._flushing = len(batch)
+                self._condition.notify_all()
+            failed = False
+            try:
+                with metrics.timing("writer.flush"):
+                    self.sink.write(batch)
+                metrics.count("writer.records", len(batch))
+            except Exception as e:
+                self.error = e
+                failed = True
+                metrics.count("writer.failed_flushes")
+            with self._condition:
+                self._flushing = 0
+                if failed:
+                    # Keep the batch, ahead of what arrived meanwhile; a crash-safe sink also keeps
+                    # its journal, so recover() replays the batch if the process dies first
+                    self._buffer.extendleft(reversed(batch))
+                    self._oldest = time.monotonic()
+                    self._retry_at = self._oldest + self.retry_delay
+                    if self._closed:
+                        return  # Closing: one last attempt only, close() raises the error
+                self._condition.notify_all()
@@ -1,160 +1,366 @@
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-import random
-import matplotlib.pyplot as plt
-
-# Mock data function for sensor readings
-def get_sensor_data():
-    return {
-        "Soil Moisture": f"{random.uniform(20, 80):.2f} %",
-        "Water Level": f"{random.uniform(5, 15):.2f} cm",
-        "Temperature": f"{random.uniform(25, 35):.2f} °C",
-        "Humidity": f"{random.uniform(40, 90):.2f} %",
-        "CO₂ Emissions": f"{random.uniform(300, 450):.2f} ppm"
-    }
+from ecorice.acquisition import AcquisitionEngine, RandomDriver
+from ecorice.rules import RuleEngine, field_insights, ALL_CLEAR
+from ecorice.carbon import CarbonAccountant
+from ecorice.client import ApiClient, RemoteFeed
+from ecorice.anomaly import AnomalyDetector
+from ecorice.loader import DEFAULT_FARM, DEFAULT_PLOT
+from ecorice.store import open_store, ingest_csv, range_for, PERIODS
+from ecorice.ledger import Ledger, CATEGORIES
+from ecorice.ui.formatting import format_reading
+from ecorice import metrics
+from ecorice.metrics import timed
+from ecorice.ui.refresh import AdaptiveRefresh, TextUpdates
+
+# Milliseconds between refreshes of the diagnostics page while it is shown
+DIAGNOSTICS_REFRESH_MS = 1000
 
 # Function to update the main dashboard
-def update_dashboard():
-    data = get_sensor_data()
-    for key, value in data.items():
-        labels[key].config(text=value)
-    analyze_data(data)
-
-# Function to analyze data for insights
-def analyze_data(data):
-    water_level = float(data["Water Level"].split()[0])
-    co2_emissions = float(data["CO₂ Emissions"].split()[0])
-    insights = []
-    if water_level < 7:
-        insights.append("Add water to the field.")
-    if co2_emissions > 400:
-        insights.append("Monitor CO₂ levels.")
-    if not insights:
-        insights.append("All parameters are within optimal range.")
+@timed("update_dashboard")
+def update_dashboard(readings=None):
+    readings = readings or engine.drain()
+    if not readings:
+        return
+    label_updates.apply(format_reading(readings[-1]))  # Only labels whose text changed are touched
+    analyze_data(readings)
+
+# Function to analyze readings for insights (numeric readings go straight to the rules engine);
+# sensor faults come first, as the rules cannot be trusted on a faulty sensor
+@timed("analyze_data")
+def analyze_data(readings):
+    newest = readings[-1]
+    faults = detector.messages(newest.get("farm_id"), newest.get("plot_id"))
+    messages = faults + field_insights(rule_engine, readings) or [ALL_CLEAR]
     # Display insights
-    insight_text.set("\n".join(insights))
+    insight_updates.apply({"insights": "\n".join(messages)})
 
-# Function to calculate carbon credits
+# Function to calculate this season's carbon credits against continuous flooding
+@timed("calculate_carbon_credits")
 def calculate_carbon_credits():
-    co2_reduction = random.uniform(100, 300)  # Mock CO₂ reduction value
-    income = co2_reduction * 0.5  # Assume 0.5 THB per kg of CO₂ reduced
-    messagebox.showinfo("Carbon Credits", f"CO₂ Reduction: {co2_reduction:.2f} kg\nPotential Income: {income:.2f} THB")
+    try:
+        ingest_logger()  # Account the logger rows written since the last check
+        balance = accountant.season_balance(DEFAULT_FARM, DEFAULT_PLOT)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"Error reading emission history: {e}")
+        return
+    name, year = balance["season"]
+    messagebox.showinfo("Carbon Credits", (
+        f"{name.title()} season {year}: {balance['dried_hours']:.1f} h dried, {balance['flooded_hours']:.1f} h flooded\n"
+        f"CO₂ Reduction: {balance['co2_reduction_kg']:.2f} kg\nPotential Income: {balance['income_thb']:.2f} THB"
+    ))
 
-# Function to calculate profit or loss
-def calculate_profit_or_loss():
+# Function to book a cost or revenue entry in the household ledger
+def add_ledger_entry():
     try:
-        cost = float(cost_var.get())
-        revenue = float(revenue_var.get())
-        net_profit = revenue - cost
-        result_text.set(f"Net Profit: {'{:.2f}'.format(net_profit)} THB")
-    except ValueError:
-        messagebox.showerror("Invalid Input", "Please enter valid numbers for cost and revenue.")
-
-# Function to plot historical data
+        ledger.add(category_var.get(), amount_var.get(), day_var.get().strip() or None, DEFAULT_FARM, note_var.get())
+    except ValueError as e:
+        messagebox.showerror("Invalid Input", f"Please enter a valid amount and date (YYYY-MM-DD): {e}")
+        return
+    amount_var.set("")
+    note_var.set("")
+    refresh_account()
+
+# Function to show this season's profit/loss by category and the totals of past seasons
+# (read from the ledger's running totals, so this stays instant with years of entries)
+@timed("refresh_account")
+def refresh_account():
+    summary = ledger.season_summary(DEFAULT_FARM)
+    name, year = summary["season"]
+    lines = [f"{name.title()} season {year}: Net {'Profit' if summary['net'] >= 0 else 'Loss'} {summary['net']:.2f} THB"]
+    for category, kind in CATEGORIES.items():
+        if category in summary["categories"]:
+            sign = "-" if kind == "cost" else "+"
+            lines.append(f"{category.replace('_', ' ').title()}: {sign}{summary['categories'][category]:.2f} THB")
+    result_text.set("\n".join(lines))
+    season_tree.delete(*season_tree.get_children())
+    for season in ledger.season_history(DEFAULT_FARM):
+        name, year = season["season"]
+        season_tree.insert("", "end", values=(
+            f"{name.title()} {year}", f"{season['cost']:.2f}", f"{season['revenue']:.2f}", f"{season['net']:.2f}",
+        ))
+
+# Function to open the household account page with up-to-date totals
+def show_account():
+    refresh_account()
+    switch_frame(account_frame)
+
+# Function to plot historical data for the selected range, following new logger rows
+@timed("plot_historical_data")
 def plot_historical_data():
-    timestamps = ["10:00", "11:00", "12:00", "13:00", "14:00"]
-    co2_levels = [400, 390, 420, 410, 380]  # Mock data
-    water_levels = [10, 9, 8, 7.5, 7]  # Mock data
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(timestamps, co2_levels, marker='o', label="CO₂ Levels (ppm)")
-    plt.plot(timestamps, water_levels, marker='o', label="Water Level (cm)", linestyle='--')
-    plt.title("Historical Data")
-    plt.xlabel("Time")
-    plt.ylabel("Values")
-    plt.legend()
-    plt.grid()
-    plt.show()
+    try:
+        ingest_logger()  # Imports only the rows appended since the last plot
+        start, end = range_for(range_var.get())
+        chart = show_history_chart()
+        from ecorice.ui.live_chart import show_store_range
+        show_store_range(chart, store, ["co2_emissions", "water_level"], start, end,
+                         DEFAULT_FARM, DEFAULT_PLOT, poll_history, background=bool(server_url))
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"Error loading historical data: {e}")
+
+# Function to embed the history chart on first use (Matplotlib is only imported here)
+def show_history_chart():
+    global history_chart
+    if history_chart is None:
+        from ecorice.ui.live_chart import LiveChart
+        history_chart = LiveChart(
+            chart_frame,
+            [("co2_emissions", "CO₂ Levels (ppm)", {"marker": "o"}),
+             ("water_level", "Water Level (cm)", {"marker": "o", "linestyle": "--"})],
+            title="Historical Data",
+        )
+        history_chart.pack()
+    return history_chart
+
+# Function to import logger rows before each chart tick (a CSV mid-rewrite is retried next tick)
+@timed("poll_history")
+def poll_history():
+    try:
+        ingest_logger()
+    except (OSError, ValueError):
+        pass
 
 # Function to switch pages
 def switch_frame(frame):
+    global current_frame
+    current_frame = frame
     frame.tkraise()
+    if refresher is not None and frame in (dashboard_frame, insight_frame):
+        refresher.poke()  # Catch up at once instead of waiting out the idle interval
+
+# Function to tell the refresh loop whether a page showing live readings is raised
+def live_page_shown():
+    return current_frame in (dashboard_frame, insight_frame)
+
+# Function to refill the diagnostics table; reschedules itself only while the page is shown
+def refresh_diagnostics():
+    global diagnostics_after
+    timers, counters = metrics.snapshot()
+    timer_tree.delete(*timer_tree.get_children())
+    for name, summary in timers.items():
+        timer_tree.insert("", "end", values=(
+            name, summary["count"],
+            *(f"{summary[quantile] * 1000:.2f}" for quantile in metrics.QUANTILES), f"{summary['max'] * 1000:.2f}",
+        ))
+    state = "on" if metrics.enabled() else "off (ECORICE_METRICS=0)"
+    counter_text.set(f"Instrumentation {state}\n" + "\n".join(f"{name}: {value}" for name, value in counters.items()))
+    diagnostics_after = app.after(DIAGNOSTICS_REFRESH_MS, refresh_diagnostics) if current_frame is diagnostics_frame else None
+
+# Function to open the hidden diagnostics page (Ctrl+Shift+D)
+def show_diagnostics(event=None):
+    switch_frame(diagnostics_frame)
+    if diagnostics_after is not None:
+        app.after_cancel(diagnostics_after)
+    refresh_diagnostics()
+
+# Function to write the timers and counters as a Prometheus text file
+def export_metrics():
+    try:
+        path = metrics.write_prometheus()
+    except OSError as e:
+        messagebox.showerror("Error", f"Error writing metrics: {e}")
+        return
+    messagebox.showinfo("Metrics", f"Metrics written to {path}")
+
+# Function to open the graph page, building its chart the first time
+def show_graphs():
+    show_history_chart()
+    switch_frame(graph_frame)
+
+# Function to import new logger rows into the local store (the server does this for thin clients)
+def ingest_logger():
+    if server_url is None:
+        ingest_csv(store, "ecorice_data.csv")
+
+# Function to stop acquisition before the window closes
+def on_close():
+    refresher.stop()
+    engine.stop()
+    ledger.close()
+    app.destroy()
+
+# Function to build the dashboard pages and run them until the window is closed
+def main():
+    global server_url, store, accountant, range_var, rule_engine, detector, engine, app, labels, insight_text, graph_frame, chart_frame, history_chart
+    global ledger, category_var, amount_var, day_var, note_var, result_text, season_tree, account_frame
+    global current_frame, diagnostics_frame, diagnostics_after, timer_tree, counter_text
+    global dashboard_frame, insight_frame, label_updates, insight_updates, refresher
+    # Sensor history store and the carbon accounting over it, or a shared `python -m ecorice serve`
+    # answering both when ECORICE_SERVER (e.g. http://192.168.1.10:8080) is set
+    server_url = os.environ.get("ECORICE_SERVER")
+    if server_url:
+        store = accountant = ApiClient(server_url)
+    else:
+        store = open_store("ecorice_store", "ecorice_data.csv")
+        accountant = CarbonAccountant(store)
+
+    # Household cost/revenue ledger (kept on this machine, also for thin clients)
+    ledger = Ledger()
+
+    # AWD insight rules, compiled once
+    rule_engine = RuleEngine.from_file()
+
+    # Poll the field node off the Tk thread (simulated until real hardware is connected); thin clients
+    # show the newest reading the server has instead
+    # Sensor faults (out-of-range, stuck, spiking or silent sensors) are screened out and shown as insights
+    detector = AnomalyDetector()
+    if server_url:
+        engine = RemoteFeed(store, DEFAULT_FARM, DEFAULT_PLOT, detector)
+    else:
+        engine = AcquisitionEngine(maxsize=1000, detector=detector)
+        engine.add_device("field-1", RandomDriver({"water_level": (5, 15)}), interval=1.0, timeout=2.0, retries=2)
+
+    # Initialize the main Tkinter app
+    app = tk.Tk()
+    app.title("EcoRice Dashboard")
+    app.geometry("500x700")
+    app.resizable(False, False)
+
+    # Create Frames for Pages
+    dashboard_frame = ttk.Frame(app)
+    insight_frame = ttk.Frame(app)
+    graph_frame = ttk.Frame(app)
+    account_frame = ttk.Frame(app)
+    diagnostics_frame = ttk.Frame(app)
+    current_frame = None
+    diagnostics_after = None
+    refresher = None
+
+    for frame in (dashboard_frame, insight_frame, graph_frame, account_frame, diagnostics_frame):
+        frame.grid(row=0, column=0, sticky="nsew")
+
+    # ------------------------------
+    # Dashboard Page
+    # ------------------------------
+    ttk.Label(dashboard_frame, text="EcoRice Dashboard", font=("Arial", 24)).pack(pady=20, anchor="center")
+
+    frame = ttk.Frame(dashboard_frame)
+    frame.pack(pady=10)
+
+    labels = {}
+    for param in ["Soil Moisture", "Water Level", "Temperature", "Humidity", "CO₂ Emissions"]:
+        row_frame = ttk.Frame(frame)
+        row_frame.pack(fill="x", pady=5)
+        ttk.Label(row_frame, text=f"{param}:", font=("Arial", 14), width=20, anchor="e").pack(side="left", padx=5)
+        labels[param] = ttk.Label(row_frame, text="N/A", font=("Arial", 14, "bold"), foreground="green", anchor="w")
+        labels[param].pack(side="left")
+    label_updates = TextUpdates(lambda key, text: labels[key].config(text=text))
+
+    # Centered button frame
+    button_frame = ttk.Frame(dashboard_frame)
+    button_frame.pack(pady=30)
+
+    ttk.Button(button_frame, text="Update Data", command=update_dashboard, width=25).pack(pady=5 ,padx=100)
+    ttk.Button(button_frame, text="Calculate Carbon Credits", command=calculate_carbon_credits, width=25).pack(pady=5)
+    ttk.Button(button_frame, text="Go to Insights", command=lambda: switch_frame(insight_frame), width=25).pack(pady=5)
+    ttk.Button(button_frame, text="Go to Graphs", command=show_graphs, width=25).pack(pady=5)
+    ttk.Button(button_frame, text="Go to Household Account", command=show_account, width=25).pack(pady=5)
+
+    # ------------------------------
+    # Insights Page
+    # ------------------------------
+    ttk.Label(insight_frame, text="Insights", font=("Arial", 24)).pack(pady=20, anchor="center")
+
+    insight_text = tk.StringVar()
+    insight_label = ttk.Label(insight_frame, textvariable=insight_text, font=("Arial", 14), wraplength=400, foreground="blue", anchor="center")
+    insight_label.pack(pady=20)
+    insight_updates = TextUpdates(lambda key, text: insight_text.set(text))
+
+    ttk.Button(insight_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=10)
+
+    # ------------------------------
+    # Graph Page
+    # ------------------------------
+    ttk.Label(graph_frame, text="Graphs", font=("Arial", 24)).pack(pady=10, anchor="center")
+
+    # Filled by show_history_chart() when the page is first opened
+    chart_frame = ttk.Frame(graph_frame)
+    chart_frame.pack(pady=10)
+    history_chart = None
+
+    range_row = ttk.Frame(graph_frame)
+    range_row.pack(pady=5)
+    ttk.Label(range_row, text="Range:", font=("Arial", 12)).pack(side="left", padx=5)
+    range_var = tk.StringVar(value="today")
+    ttk.Combobox(range_row, textvariable=range_var, values=PERIODS, state="readonly", width=10).pack(side="left")
+
+    ttk.Button(graph_frame, text="View Historical Data", command=plot_historical_data, width=25).pack(pady=10)
+    ttk.Button(graph_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=10)
+
+    # ------------------------------
+    # Household Account Page
+    # ------------------------------
+    ttk.Label(account_frame, text="Household Account", font=("Arial", 24)).pack(pady=20, anchor="center")
+
+    account_form = ttk.Frame(account_frame)
+    account_form.pack(pady=10)
+
+    ttk.Label(account_form, text="Category:", font=("Arial", 14)).grid(row=0, column=0, pady=5, padx=5, sticky="e")
+    category_var = tk.StringVar(value=next(iter(CATEGORIES)))
+    ttk.Combobox(account_form, textvariable=category_var, values=list(CATEGORIES), state="readonly", width=18).grid(row=0, column=1, pady=5, padx=5)
+
+    ttk.Label(account_form, text="Amount (THB):", font=("Arial", 14)).grid(row=1, column=0, pady=5, padx=5, sticky="e")
+    amount_var = tk.StringVar()
+    ttk.Entry(account_form, textvariable=amount_var, width=20).grid(row=1, column=1, pady=5, padx=5)
+
+    ttk.Label(account_form, text="Date (YYYY-MM-DD):", font=("Arial", 14)).grid(row=2, column=0, pady=5, padx=5, sticky="e")
+    day_var = tk.StringVar()  # Empty: today
+    ttk.Entry(account_form, textvariable=day_var, width=20).grid(row=2, column=1, pady=5, padx=5)
+
+    ttk.Label(account_form, text="Note:", font=("Arial", 14)).grid(row=3, column=0, pady=5, padx=5, sticky="e")
+    note_var = tk.StringVar()
+    ttk.Entry(account_form, textvariable=note_var, width=20).grid(row=3, column=1, pady=5, padx=5)
+
+    ttk.Button(account_frame, text="Add Entry", command=add_ledger_entry, width=25).pack(pady=5)
+
+    result_text = tk.StringVar(value="Net Profit: N/A")
+    result_label = ttk.Label(account_frame, textvariable=result_text, font=("Arial", 12, "bold"), justify="left")
+    result_label.pack(pady=5)
+
+    columns = ("season", "cost", "revenue", "net")
+    season_tree = ttk.Treeview(account_frame, columns=columns, show="headings", height=5)
+    for column, heading in zip(columns, ("Season", "Cost THB", "Revenue THB", "Net THB")):
+        season_tree.heading(column, text=heading)
+        season_tree.column(column, width=100, anchor="w" if column == "season" else "e")
+    season_tree.pack(padx=10, pady=5)
+
+    ttk.Button(account_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=10)
+
+    # ------------------------------
+    # Diagnostics Page (hidden: Ctrl+Shift+D)
+    # ------------------------------
+    ttk.Label(diagnostics_frame, text="Diagnostics", font=("Arial", 24)).pack(pady=10, anchor="center")
+
+    columns = ("name", "calls", "p50", "p95", "p99", "max")
+    timer_tree = ttk.Treeview(diagnostics_frame, columns=columns, show="headings", height=14)
+    for column, heading, width in zip(columns, ("Timer", "Calls", "p50 ms", "p95 ms", "p99 ms", "Max ms"),
+                                      (170, 55, 60, 60, 60, 60)):
+        timer_tree.heading(column, text=heading)
+        timer_tree.column(column, width=width, anchor="w" if column == "name" else "e")
+    timer_tree.pack(padx=10, pady=5)
+
+    counter_text = tk.StringVar()
+    ttk.Label(diagnostics_frame, textvariable=counter_text, font=("Arial", 10), justify="left").pack(pady=5)
+
+    ttk.Button(diagnostics_frame, text="Export Prometheus File", command=export_metrics, width=25).pack(pady=5)
+    ttk.Button(diagnostics_frame, text="Reset", command=metrics.reset, width=25).pack(pady=5)
+    ttk.Button(diagnostics_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=5)
+    app.bind_all("<Control-Shift-D>", show_diagnostics)
+
+    # Start with Dashboard Frame
+    switch_frame(dashboard_frame)
+
+    # Start acquisition; readings are drained on the Tk event loop, every 200 ms while a live page is
+    # shown and the loop keeps up, less often on other pages, when minimized or when the loop lags
+    app.protocol("WM_DELETE_WINDOW", on_close)
+    engine.start()
+    refresher = AdaptiveRefresh(app, update_dashboard, interval_ms=200, active=live_page_shown)
+    refresher.start()
+
+    # Start the Tkinter event loop
+    app.mainloop()
+
 
-# Initialize the main Tkinter app
-app = tk.Tk()
-app.title("EcoRice Dashboard")
-app.geometry("500x700")
-app.resizable(False, False)
-
-# Create Frames for Pages
-dashboard_frame = ttk.Frame(app)
-insight_frame = ttk.Frame(app)
-graph_frame = ttk.Frame(app)
-account_frame = ttk.Frame(app)
-
-for frame in (dashboard_frame, insight_frame, graph_frame, account_frame):
-    frame.grid(row=0, column=0, sticky="nsew")
-
-# ------------------------------
-# Dashboard Page
-# ------------------------------
-ttk.Label(dashboard_frame, text="EcoRice Dashboard", font=("Arial", 24)).pack(pady=20, anchor="center")
-
-frame = ttk.Frame(dashboard_frame)
-frame.pack(pady=10)
-
-labels = {}
-for param in ["Soil Moisture", "Water Level", "Temperature", "Humidity", "CO₂ Emissions"]:
-    row_frame = ttk.Frame(frame)
-    row_frame.pack(fill="x", pady=5)
-    ttk.Label(row_frame, text=f"{param}:", font=("Arial", 14), width=20, anchor="e").pack(side="left", padx=5)
-    labels[param] = ttk.Label(row_frame, text="N/A", font=("Arial", 14, "bold"), foreground="green", anchor="w")
-    labels[param].pack(side="left")
-
-# Centered button frame
-button_frame = ttk.Frame(dashboard_frame)
-button_frame.pack(pady=30)
-
-ttk.Button(button_frame, text="Update Data", command=update_dashboard, width=25).pack(pady=5 ,padx=100)
-ttk.Button(button_frame, text="Calculate Carbon Credits", command=calculate_carbon_credits, width=25).pack(pady=5)
-ttk.Button(button_frame, text="Go to Insights", command=lambda: switch_frame(insight_frame), width=25).pack(pady=5)
-# ttk.Button(button_frame, text="Go to Graphs", command=lambda: switch_frame(graph_frame), width=25).pack(pady=5)
-ttk.Button(button_frame, text="Go to Household Account", command=lambda: switch_frame(account_frame), width=25).pack(pady=5)
-
-# ------------------------------
-# Insights Page
-# ------------------------------
-ttk.Label(insight_frame, text="Insights", font=("Arial", 24)).pack(pady=20, anchor="center")
-
-insight_text = tk.StringVar()
-insight_label = ttk.Label(insight_frame, textvariable=insight_text, font=("Arial", 14), wraplength=400, foreground="blue", anchor="center")
-insight_label.pack(pady=20)
-
-ttk.Button(insight_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=10)
-
-# ------------------------------
-# Graph Page
-# ------------------------------
-ttk.Label(graph_frame, text="Graphs", font=("Arial", 24)).pack(pady=20, anchor="center")
-
-# ttk.Button(graph_frame, text="View Historical Data", command=plot_historical_data, width=25).pack(pady=10)
-ttk.Button(graph_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=10)
-
-# ------------------------------
-# Household Account Page
-# ------------------------------
-ttk.Label(account_frame, text="Household Account", font=("Arial", 24)).pack(pady=20, anchor="center")
-
-account_form = ttk.Frame(account_frame)
-account_form.pack(pady=20)
-
-ttk.Label(account_form, text="Total Cost (THB):", font=("Arial", 14)).grid(row=0, column=0, pady=5, padx=5, sticky="e")
-cost_var = tk.StringVar()
-ttk.Entry(account_form, textvariable=cost_var, width=20).grid(row=0, column=1, pady=5, padx=5)
-
-ttk.Label(account_form, text="Total Revenue (THB):", font=("Arial", 14)).grid(row=1, column=0, pady=5, padx=5, sticky="e")
-revenue_var = tk.StringVar()
-ttk.Entry(account_form, textvariable=revenue_var, width=20).grid(row=1, column=1, pady=5, padx=5)
-
-result_text = tk.StringVar(value="Net Profit: N/A")
-result_label = ttk.Label(account_frame, textvariable=result_text, font=("Arial", 14, "bold"))
-result_label.pack(pady=10)
-
-ttk.Button(account_frame, text="Calculate Profit/Loss", command=calculate_profit_or_loss, width=25).pack(pady=10)
-ttk.Button(account_frame, text="Back to Dashboard", command=lambda: switch_frame(dashboard_frame), width=25).pack(pady=10)
-
-# Start with Dashboard Frame
-switch_frame(dashboard_frame)
-
-# Start the Tkinter event loop
-app.mainloop()
+if __name__ == "__main__":
+    main()
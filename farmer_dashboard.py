@@ -1,87 +1,161 @@
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-import random
-import matplotlib.pyplot as plt
-
-# Mock data function for sensor readings
-def get_sensor_data():
-    return {
-        "Soil Moisture": f"{random.uniform(20, 80):.2f} %",
-        "Water Level": f"{random.uniform(5, 15):.2f} cm",
-        "Temperature": f"{random.uniform(25, 35):.2f} °C",
-        "Humidity": f"{random.uniform(40, 90):.2f} %",
-        "CO₂ Emissions": f"{random.uniform(300, 450):.2f} ppm"
-    }
-
-# Function to update dashboard with mock data
-def update_dashboard():
-    data = get_sensor_data()
-    for key, value in data.items():
-        labels[key].config(text=value)
-    analyze_data(data)
-
-# Function to provide insights based on mock data
-def analyze_data(data):
-    water_level = float(data["Water Level"].split()[0])
-    co2_emissions = float(data["CO₂ Emissions"].split()[0])
-    if water_level < 7:
-        insight_label.config(text="Recommendation: Add water to the field.")
-    elif co2_emissions > 400:
-        insight_label.config(text="Recommendation: Monitor CO₂ levels.")
+from ecorice.acquisition import AcquisitionEngine, RandomDriver
+from ecorice.rules import RuleEngine, field_insights, ALL_CLEAR
+from ecorice.carbon import CarbonAccountant
+from ecorice.client import ApiClient, RemoteFeed
+from ecorice.anomaly import AnomalyDetector
+from ecorice.loader import DEFAULT_FARM, DEFAULT_PLOT
+from ecorice.store import open_store, ingest_csv, range_for
+from ecorice.ui.formatting import format_reading
+from ecorice.metrics import timed
+from ecorice.ui.refresh import AdaptiveRefresh, TextUpdates
+
+# Function to update dashboard with the latest reading
+@timed("update_dashboard")
+def update_dashboard(readings=None):
+    readings = readings or engine.drain()
+    if not readings:
+        return
+    label_updates.apply(format_reading(readings[-1]))  # Only labels whose text changed are touched
+    analyze_data(readings)
+
+# Function to provide insights based on the latest readings (a sensor fault first, then the first matching rule)
+@timed("analyze_data")
+def analyze_data(readings):
+    newest = readings[-1]
+    faults = detector.messages(newest.get("farm_id"), newest.get("plot_id"))
+    messages = field_insights(rule_engine, readings)
+    if faults:
+        insight_updates.apply({"insight": f"Sensor fault: {faults[0]}"})
+    elif messages:
+        insight_updates.apply({"insight": f"Recommendation: {messages[0]}"})
     else:
-        insight_label.config(text="All parameters are within optimal range.")
+        insight_updates.apply({"insight": ALL_CLEAR})
 
-# Function to calculate carbon credits
+# Function to calculate this season's carbon credits against continuous flooding
+@timed("calculate_carbon_credits")
 def calculate_carbon_credits():
-    co2_reduction = random.uniform(100, 300)  # Mock CO₂ reduction value
-    income = co2_reduction * 0.5  # Assume 0.5 THB per kg of CO₂ reduced
-    messagebox.showinfo("Carbon Credits", f"CO₂ Reduction: {co2_reduction:.2f} kg\nPotential Income: {income:.2f} THB")
+    try:
+        ingest_logger()  # Account the logger rows written since the last check
+        balance = accountant.season_balance(DEFAULT_FARM, DEFAULT_PLOT)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"Error reading emission history: {e}")
+        return
+    name, year = balance["season"]
+    messagebox.showinfo("Carbon Credits", (
+        f"{name.title()} season {year}: {balance['dried_hours']:.1f} h dried, {balance['flooded_hours']:.1f} h flooded\n"
+        f"CO₂ Reduction: {balance['co2_reduction_kg']:.2f} kg\nPotential Income: {balance['income_thb']:.2f} THB"
+    ))
 
-# Function to plot historical data
+# Function to plot this week's historical data, following new logger rows
+@timed("plot_historical_data")
 def plot_historical_data():
-    timestamps = ["10:00", "11:00", "12:00", "13:00", "14:00"]
-    co2_levels = [400, 390, 420, 410, 380]  # Mock data
-    plt.plot(timestamps, co2_levels, marker='o', label="CO₂ Levels (ppm)")
-    plt.title("CO₂ Levels Over Time")
-    plt.xlabel("Time")
-    plt.ylabel("CO₂ Levels (ppm)")
-    plt.legend()
-    plt.grid()
-    plt.show()
-
-# Initialize the main Tkinter app
-app = tk.Tk()
-app.title("EcoRice Dashboard")
-app.geometry("400x600")
-app.resizable(False, False)
-
-# Header
-ttk.Label(app, text="EcoRice Dashboard", font=("Arial", 20)).pack(pady=10)
-
-# Real-Time Data Dashboard
-frame = ttk.Frame(app)
-frame.pack(pady=10, fill="x")
-
-labels = {}
-for param in ["Soil Moisture", "Water Level", "Temperature", "Humidity", "CO₂ Emissions"]:
-    ttk.Label(frame, text=f"{param}:", font=("Arial", 12)).pack(anchor="w")
-    labels[param] = ttk.Label(frame, text="N/A", font=("Arial", 12, "bold"), foreground="green")
-    labels[param].pack(anchor="w")
-
-# Insights Section
-insight_label = ttk.Label(app, text="Loading insights...", font=("Arial", 12), foreground="blue", wraplength=350)
-insight_label.pack(pady=10)
-
-# Buttons for Actions
-ttk.Button(app, text="Update Data", command=update_dashboard).pack(pady=5)
-ttk.Button(app, text="Calculate Carbon Credits", command=calculate_carbon_credits).pack(pady=5)
-ttk.Button(app, text="View Historical Data", command=plot_historical_data).pack(pady=5)
-
-# Footer
-ttk.Label(app, text="Developed for Farmers", font=("Arial", 10), foreground="gray").pack(side="bottom", pady=10)
-
-# Initial data load
-update_dashboard()
-
-# Start the Tkinter event loop
-app.mainloop()
+    from ecorice.ui.live_chart import chart_window, show_store_range  # Matplotlib loads on the first chart, not at startup
+    try:
+        ingest_logger()  # Imports only the rows appended since the last plot
+        chart = chart_window(
+            app, chart_windows, "co2", "CO₂ Levels Over Time",
+            [("co2_emissions", "CO₂ Levels (ppm)", {"marker": "o"})],
+            ylabel="CO₂ Levels (ppm)",
+        )
+        start, end = range_for("week")
+        show_store_range(chart, store, ["co2_emissions"], start, end, DEFAULT_FARM, DEFAULT_PLOT, poll_history,
+                         background=bool(server_url))
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"Error loading historical data: {e}")
+
+# Function to import logger rows before each chart tick (a CSV mid-rewrite is retried next tick)
+@timed("poll_history")
+def poll_history():
+    try:
+        ingest_logger()
+    except (OSError, ValueError):
+        pass
+
+# Function to import new logger rows into the local store (the server does this for thin clients)
+def ingest_logger():
+    if server_url is None:
+        ingest_csv(store, "ecorice_data.csv")
+
+# Function to stop acquisition before the window closes
+def on_close():
+    refresher.stop()
+    engine.stop()
+    app.destroy()
+
+# Function to build the farmer dashboard and run it until the window is closed
+def main():
+    global server_url, store, accountant, chart_windows, rule_engine, detector, engine, app, labels, insight_label
+    global label_updates, insight_updates, refresher
+    # Sensor history store and the carbon accounting over it, or a shared `python -m ecorice serve`
+    # answering both when ECORICE_SERVER (e.g. http://192.168.1.10:8080) is set
+    server_url = os.environ.get("ECORICE_SERVER")
+    if server_url:
+        store = accountant = ApiClient(server_url)
+    else:
+        store = open_store("ecorice_store", "ecorice_data.csv")
+        accountant = CarbonAccountant(store)
+
+    chart_windows = {}  # Chart windows are created once and reused
+
+    # AWD insight rules, compiled once
+    rule_engine = RuleEngine.from_file()
+
+    # Poll the field node off the Tk thread (simulated until real hardware is connected); thin clients
+    # show the newest reading the server has instead
+    # Sensor faults (out-of-range, stuck, spiking or silent sensors) are screened out and shown as insights
+    detector = AnomalyDetector()
+    if server_url:
+        engine = RemoteFeed(store, DEFAULT_FARM, DEFAULT_PLOT, detector)
+    else:
+        engine = AcquisitionEngine(maxsize=1000, detector=detector)
+        engine.add_device("field-1", RandomDriver({"water_level": (5, 15)}), interval=1.0, timeout=2.0, retries=2)
+
+    # Initialize the main Tkinter app
+    app = tk.Tk()
+    app.title("EcoRice Dashboard")
+    app.geometry("400x600")
+    app.resizable(False, False)
+
+    # Header
+    ttk.Label(app, text="EcoRice Dashboard", font=("Arial", 20)).pack(pady=10)
+
+    # Real-Time Data Dashboard
+    frame = ttk.Frame(app)
+    frame.pack(pady=10, fill="x")
+
+    labels = {}
+    for param in ["Soil Moisture", "Water Level", "Temperature", "Humidity", "CO₂ Emissions"]:
+        ttk.Label(frame, text=f"{param}:", font=("Arial", 12)).pack(anchor="w")
+        labels[param] = ttk.Label(frame, text="N/A", font=("Arial", 12, "bold"), foreground="green")
+        labels[param].pack(anchor="w")
+    label_updates = TextUpdates(lambda key, text: labels[key].config(text=text))
+
+    # Insights Section
+    insight_label = ttk.Label(app, text="Loading insights...", font=("Arial", 12), foreground="blue", wraplength=350)
+    insight_label.pack(pady=10)
+    insight_updates = TextUpdates(lambda key, text: insight_label.config(text=text))
+
+    # Buttons for Actions
+    ttk.Button(app, text="Update Data", command=update_dashboard).pack(pady=5)
+    ttk.Button(app, text="Calculate Carbon Credits", command=calculate_carbon_credits).pack(pady=5)
+    ttk.Button(app, text="View Historical Data", command=plot_historical_data).pack(pady=5)
+
+    # Footer
+    ttk.Label(app, text="Developed for Farmers", font=("Arial", 10), foreground="gray").pack(side="bottom", pady=10)
+
+    # Start acquisition; readings are drained on the Tk event loop, every 200 ms while the loop keeps
+    # up and less often when it lags or the window is minimized
+    app.protocol("WM_DELETE_WINDOW", on_close)
+    engine.start()
+    refresher = AdaptiveRefresh(app, update_dashboard, interval_ms=200)
+    refresher.start()
+
+    # Start the Tkinter event loop
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,145 +1,255 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import random
-import csv
-from datetime import datetime
-import matplotlib
-from matplotlib import pyplot as plt
-
-# Ensure Matplotlib uses TkAgg backend for external windows
-matplotlib.use('TkAgg')
-
-# Function to simulate sensor data collection
-def collect_sensor_data():
-    return {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "soil_moisture": random.uniform(20.0, 80.0),  # Percentage
-        "water_level": random.uniform(0.0, 15.0),  # cm
-        "air_temp": random.uniform(25.0, 35.0),  # Celsius
-        "air_humidity": random.uniform(40.0, 90.0),  # Percentage
-        "co2_emissions": random.uniform(300, 450),  # ppm,
-    }
-
-# Function to save data to CSV
-def save_data_to_csv(data, filename="ecorice_data.csv"):
-    fieldnames = ["timestamp", "soil_moisture", "water_level", "air_temp", "air_humidity", "co2_emissions"]
+from tkinter import ttk, messagebox, filedialog
+from concurrent.futures import ThreadPoolExecutor
+from ecorice.acquisition import AcquisitionEngine, RandomDriver
+from ecorice.anomaly import AnomalyDetector
+from ecorice.aggregation import AggregationEngine, WINDOWS, WATER_THRESHOLD
+from ecorice.loader import DEFAULT_FARM, DEFAULT_PLOT
+from ecorice.store import open_store, ingest_csv, range_for, PERIODS
+from ecorice.writer import SensorWriter, StoreSink
+from ecorice.compaction import Compactor
+from ecorice.ui.formatting import format_reading
+from ecorice.metrics import timed
+from ecorice.ui.refresh import AdaptiveRefresh, TextUpdates
+
+# Reading labels as (format_reading key, text shown in the window)
+READING_ROWS = [
+    ("Soil Moisture", "Soil Moisture:"),
+    ("Water Level", "Water Level:"),
+    ("Temperature", "Air Temperature:"),
+    ("Humidity", "Air Humidity:"),
+    ("CO₂ Emissions", "CO2 Emissions:"),
+]
+
+# Field nodes as (device name, farm id, plot id)
+FIELD_NODES = [("field-1", DEFAULT_FARM, DEFAULT_PLOT)]
+
+# Function to queue data for the background sensor writer
+@timed("save_data_to_store")
+def save_data_to_store(data):
     try:
-        with open(filename, mode='a', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            if file.tell() == 0:  # Write headers only if the file is new
-                writer.writeheader()
-            writer.writerow(data)
+        writer.write(data)
     except Exception as e:
-        messagebox.showerror("Error", f"Error writing to CSV: {e}")
+        messagebox.showerror("Error", f"Error writing to sensor store: {e}")
 
-# Function to update sensor data on GUI
-def update_data():
+# Function to fold drained readings into the farm rollups and show the newest one
+@timed("show_readings")
+def show_readings(readings):
     global current_data
-    current_data = collect_sensor_data()
-    soil_moisture_var.set(f"{current_data['soil_moisture']:.2f} %")
-    water_level_var.set(f"{current_data['water_level']:.2f} cm")
-    air_temp_var.set(f"{current_data['air_temp']:.2f} °C")
-    air_humidity_var.set(f"{current_data['air_humidity']:.2f} %")
-    co2_emissions_var.set(f"{current_data['co2_emissions']:.2f} ppm")
+    aggregator.add_many(readings)
+    current_data = readings[-1]
+    reading_updates.apply(format_reading(current_data))  # Only values whose text changed are set
+
+# Function to update sensor data on GUI without waiting for the next drain tick
+@timed("update_data")
+def update_data():
+    readings = engine.drain()
+    if readings:
+        show_readings(readings)
 
 # Function to save current data
 def save_data():
     if current_data:
-        save_data_to_csv(current_data)
+        save_data_to_store(current_data)
         messagebox.showinfo("Success", "Data saved successfully!")
 
-# Function to plot CO2 emissions trend
-def plot_co2_emissions(filename="ecorice_data.csv"):
-    timestamps = []
-    co2_emissions = []
+# Function to bring the store up to date: queued readings plus new logger rows in the CSV
+def refresh_history():
+    writer.flush()
+    ingest_csv(store, "ecorice_data.csv")
+
+# Function to show store history in a reusable chart window that keeps following new rows
+def show_history_chart(key, title, series, ylabel, start=None, end=None):
+    from ecorice.ui.live_chart import chart_window, show_store_range  # Matplotlib loads on the first chart, not at startup
+    refresh_history()
+    farm_id, plot_id = series_var.get().split("/")
+    if start is None and end is None:
+        start, end = range_for(range_var.get())
+    title = f"{title} ({farm_id}/{plot_id})"
+    chart = chart_window(app, chart_windows, (key, farm_id, plot_id), title, series, ylabel=ylabel)
+    show_store_range(chart, store, [column for column, _, _ in series], start, end, farm_id, plot_id)
 
+# Function to plot CO2 emissions trend
+@timed("plot_co2_emissions")
+def plot_co2_emissions(start=None, end=None):
     try:
-        with open(filename, mode='r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                timestamps.append(row["timestamp"])
-                co2_emissions.append(float(row["co2_emissions"]))
-
-        plt.figure(figsize=(10, 5))
-        plt.plot(timestamps, co2_emissions, marker="o", label="CO2 Emissions (ppm)")
-        plt.xticks(rotation=45, ha="right")
-        plt.xlabel("Time")
-        plt.ylabel("CO2 Emissions (ppm)")
-        plt.title("CO2 Emissions Over Time")
-        plt.legend()
-        plt.tight_layout()
-        plt.show()  # Display graph in an external window
+        show_history_chart(
+            "co2", "CO2 Emissions Over Time",
+            [("co2_emissions", "CO2 Emissions (ppm)", {"marker": "o"})],
+            "CO2 Emissions (ppm)", start, end,
+        )
     except Exception as e:
         messagebox.showerror("Error", f"Error plotting data: {e}")
 
 # Function to plot multiple historical metrics
-def plot_historical_data(filename="ecorice_data.csv"):
-    timestamps = []
-    co2_levels = []
-    water_levels = []
-
+@timed("plot_historical_data")
+def plot_historical_data(start=None, end=None):
     try:
-        with open(filename, mode='r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                timestamps.append(row["timestamp"])
-                co2_levels.append(float(row["co2_emissions"]))
-                water_levels.append(float(row["water_level"]))
-
-        plt.figure(figsize=(10, 5))
-        plt.plot(timestamps, co2_levels, marker='o', label="CO₂ Levels (ppm)")
-        plt.plot(timestamps, water_levels, marker='o', label="Water Level (cm)", linestyle='--')
-        plt.title("Historical Data")
-        plt.xlabel("Timestamp")
-        plt.ylabel("Values")
-        plt.xticks(rotation=45, ha="right")
-        plt.legend()
-        plt.grid()
-        plt.tight_layout()
-        plt.show()
+        show_history_chart(
+            "history", "Historical Data",
+            [("co2_emissions", "CO₂ Levels (ppm)", {"marker": "o"}),
+             ("water_level", "Water Level (cm)", {"marker": "o", "linestyle": "--"})],
+            "Values", start, end,
+        )
     except Exception as e:
         messagebox.showerror("Error", f"Error plotting historical data: {e}")
 
-
-# Initialize GUI
-app = tk.Tk()
-app.title("EcoRice Sensor Data")
-app.geometry("400x400")
-
-# Variables for displaying sensor data
-soil_moisture_var = tk.StringVar()
-water_level_var = tk.StringVar()
-air_temp_var = tk.StringVar()
-air_humidity_var = tk.StringVar()
-co2_emissions_var = tk.StringVar()
-current_data = {}
-
-# UI Layout
-ttk.Label(app, text="EcoRice Sensor Data", font=("Arial", 16)).pack(pady=10)
-
-frame = ttk.Frame(app)
-frame.pack(pady=10)
-
-ttk.Label(frame, text="Soil Moisture:").grid(row=0, column=0, sticky="w")
-ttk.Label(frame, textvariable=soil_moisture_var).grid(row=0, column=1, sticky="w")
-
-ttk.Label(frame, text="Water Level:").grid(row=1, column=0, sticky="w")
-ttk.Label(frame, textvariable=water_level_var).grid(row=1, column=1, sticky="w")
-
-ttk.Label(frame, text="Air Temperature:").grid(row=2, column=0, sticky="w")
-ttk.Label(frame, textvariable=air_temp_var).grid(row=2, column=1, sticky="w")
-
-ttk.Label(frame, text="Air Humidity:").grid(row=3, column=0, sticky="w")
-ttk.Label(frame, textvariable=air_humidity_var).grid(row=3, column=1, sticky="w")
-
-ttk.Label(frame, text="CO2 Emissions:").grid(row=4, column=0, sticky="w")
-ttk.Label(frame, textvariable=co2_emissions_var).grid(row=4, column=1, sticky="w")
-
-ttk.Button(app, text="Update Data", command=update_data).pack(pady=5)
-ttk.Button(app, text="Save Data", command=save_data).pack(pady=5)
-ttk.Button(app, text="Plot CO2 Emissions", command=plot_co2_emissions).pack(pady=5)
-
-ttk.Button(app, text="Plot Historical Data", command=plot_historical_data).pack(pady=5)
-
-# Start the GUI event loop
-app.mainloop()
+# Function to list the farm/plot series on disk for the series selector
+def series_choices():
+    return [f"{farm_id}/{plot_id}" for farm_id, plot_id in store.series_ids()] or [f"{DEFAULT_FARM}/{DEFAULT_PLOT}"]
+
+# Function to show the per-farm and fleet rollups in a report window
+def show_farm_report():
+    top = tk.Toplevel(app)
+    top.title("Farm Report")
+    window_var = tk.StringVar(value="1h")
+    columns = ("farm", "readings", "water_mean", "water_min", "water_p50", "co2_mean", "co2_p90", "co2_max", "below")
+    headings = ("Farm", "Readings", "Water avg", "Water min", "Water p50", "CO₂ avg", "CO₂ p90", "CO₂ max",
+                f"< {WATER_THRESHOLD:g} cm (min)")
+    tree = ttk.Treeview(top, columns=columns, show="headings", height=12)
+    for column, heading in zip(columns, headings):
+        tree.heading(column, text=heading)
+        tree.column(column, width=85, anchor="e")
+
+    # Function to refill the table from the in-memory rollups
+    def refresh():
+        tree.delete(*tree.get_children())
+        for farm_id, summary in aggregator.report(window_var.get()).items():
+            water, co2 = summary["water_level"], summary["co2_emissions"]
+            tree.insert("", "end", values=(
+                farm_id, water["count"],
+                f"{water['mean']:.2f}", f"{water['min']:.2f}", f"{water['p50']:.2f}",
+                f"{co2['mean']:.1f}", f"{co2['p90']:.1f}", f"{co2['max']:.1f}",
+                f"{summary['below_threshold_seconds'] / 60:.1f}",
+            ))
+
+    controls = ttk.Frame(top)
+    controls.pack(fill="x", padx=10, pady=5)
+    ttk.Label(controls, text="Window:").pack(side="left")
+    ttk.Combobox(controls, textvariable=window_var, values=list(WINDOWS), width=5, state="readonly").pack(side="left", padx=5)
+    ttk.Button(controls, text="Refresh", command=refresh).pack(side="left")
+    tree.pack(fill="both", expand=True, padx=10, pady=5)
+    refresh()
+
+
+# Function to write the printable multi-farm PDF report for the selected range. It runs off the Tk
+# thread (farm pages render on a process pool), and farms whose data did not change since the last
+# report come from the page cache.
+def save_pdf_report():
+    from ecorice.report import build_report
+    path = filedialog.asksaveasfilename(parent=app, defaultextension=".pdf", initialfile="ecorice_report.pdf",
+                                        filetypes=[("PDF", "*.pdf")])
+    if not path:
+        return
+    try:
+        refresh_history()
+        start, end = range_for(range_var.get())
+    except Exception as e:  # Any sink error from the writer's flush, not only I/O
+        messagebox.showerror("Error", f"Error preparing the report: {e}")
+        return
+    jobs = ThreadPoolExecutor(max_workers=1)
+    future = jobs.submit(build_report, store, path, start, end)
+    jobs.shutdown(wait=False)
+
+    # Function to report the outcome once the background job is done
+    def check():
+        if not future.done():
+            app.after(500, check)
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error writing the report: {e}")
+            return
+        messagebox.showinfo("Report", f"Report of {result['farms']} farms written to {path} "
+                                      f"({result['rendered']} rendered, {result['cached']} unchanged).")
+    check()
+
+# Function to stop acquisition and flush pending readings before the window closes
+def on_close():
+    refresher.stop()
+    engine.stop()
+    compactor.stop()
+    try:
+        writer.close()
+    except Exception as e:
+        messagebox.showerror("Error", f"Error flushing sensor data: {e}")
+    app.destroy()
+
+# Function to open the store, start acquisition and run the sensor window until it is closed
+def main():
+    global store, writer, engine, compactor, aggregator, app, reading_vars, current_data, chart_windows, series_var, range_var
+    global reading_updates, refresher
+    # Open the sensor history store (imports ecorice_data.csv on first run)
+    store = open_store("ecorice_store", "ecorice_data.csv")
+
+    # Batch readings and write them off the Tk thread (crash-safe: journaled appends)
+    writer = SensorWriter(StoreSink(store, crash_safe=True), batch_size=256, max_age=2.0)
+
+    # Poll the field nodes off the Tk thread (the simulated node stands in for real hardware);
+    # out-of-range, stuck and spiking sensor values are stored as missing
+    engine = AcquisitionEngine(maxsize=1000, detector=AnomalyDetector())
+    for name, farm_id, plot_id in FIELD_NODES:
+        engine.add_device(name, RandomDriver(), interval=1.0, timeout=2.0, retries=2, farm_id=farm_id, plot_id=plot_id)
+
+    # Roll history into 1m/1h/1d tables and expire old raw days, hourly off the Tk thread
+    compactor = Compactor(store)
+
+    # Per-farm and fleet rollups, kept up to date as readings arrive
+    aggregator = AggregationEngine()
+
+    # Initialize GUI
+    app = tk.Tk()
+    app.title("EcoRice Sensor Data")
+    app.geometry("460x480")
+
+    # Variables for displaying sensor data
+    reading_vars = {key: tk.StringVar() for key, _ in READING_ROWS}
+    reading_updates = TextUpdates(lambda key, text: reading_vars[key].set(text))
+    current_data = {}
+    chart_windows = {}  # Chart windows are created once and reused
+    series_var = tk.StringVar(value=f"{DEFAULT_FARM}/{DEFAULT_PLOT}")
+    range_var = tk.StringVar(value="week")
+
+    # UI Layout
+    ttk.Label(app, text="EcoRice Sensor Data", font=("Arial", 16)).pack(pady=10)
+
+    frame = ttk.Frame(app)
+    frame.pack(pady=10)
+
+    for row, (key, text) in enumerate(READING_ROWS):
+        ttk.Label(frame, text=text).grid(row=row, column=0, sticky="w")
+        ttk.Label(frame, textvariable=reading_vars[key]).grid(row=row, column=1, sticky="w")
+
+    series_frame = ttk.Frame(app)
+    series_frame.pack(pady=5)
+    ttk.Label(series_frame, text="Farm / Plot:").pack(side="left", padx=5)
+    series_box = ttk.Combobox(series_frame, textvariable=series_var, state="readonly", width=20)
+    series_box.configure(postcommand=lambda: series_box.configure(values=series_choices()))
+    series_box.pack(side="left")
+    ttk.Label(series_frame, text="Range:").pack(side="left", padx=5)
+    ttk.Combobox(series_frame, textvariable=range_var, values=PERIODS, state="readonly", width=8).pack(side="left")
+
+    ttk.Button(app, text="Update Data", command=update_data).pack(pady=5)
+    ttk.Button(app, text="Save Data", command=save_data).pack(pady=5)
+    ttk.Button(app, text="Plot CO2 Emissions", command=plot_co2_emissions).pack(pady=5)
+
+    ttk.Button(app, text="Plot Historical Data", command=plot_historical_data).pack(pady=5)
+    ttk.Button(app, text="Farm Report", command=show_farm_report).pack(pady=5)
+    ttk.Button(app, text="Save PDF Report", command=save_pdf_report).pack(pady=5)
+
+    app.protocol("WM_DELETE_WINDOW", on_close)
+
+    # Start acquisition and drain its queue on the Tk event loop, every 200 ms while the loop keeps
+    # up and less often when it lags or the window is minimized
+    engine.start()
+    compactor.start()
+    refresher = AdaptiveRefresh(app, update_data, interval_ms=200)
+    refresher.start()
+
+    # Start the GUI event loop
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
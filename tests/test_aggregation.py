@@ -0,0 +1,51 @@
+import numpy as np
+from ecorice.aggregation import AggregationEngine, CHANNELS
+
+
+# Function to make readings from three farms, a little out of order, with gaps, repeats and NaNs
+def readings(count, seed=1):
+    rng = np.random.default_rng(seed)
+    epochs = 1735689600 + np.cumsum(rng.integers(0, 40, count)) + rng.integers(-90, 5, count)
+    result = []
+    for i, epoch in enumerate(epochs):
+        reading = {"timestamp": str(np.datetime64(int(epoch), "s")).replace("T", " "),
+                   "farm_id": f"farm-{i % 3}", "plot_id": f"plot-{i % 2}"}
+        for channel, value in zip(CHANNELS, rng.uniform([0, 0, 15, 40, 200], [100, 14, 40, 100, 900])):
+            reading[channel] = np.nan if rng.random() < 0.05 else float(value)
+        result.append(reading)
+    return result
+
+
+def rollups(engine):
+    yield "fleet", engine.fleet
+    yield from sorted(engine.farms.items())
+
+
+def test_add_many_matches_add():
+    batch = readings(3000)
+    one, many = AggregationEngine(), AggregationEngine()
+    for reading in batch:
+        one.add(reading)
+    for start in range(0, len(batch), 137):
+        many.add_many(batch[start:start + 137])
+
+    assert one.latest == many.latest
+    assert one._last_reading.keys() == many._last_reading.keys()
+    for key, (epoch, water) in one._last_reading.items():
+        assert many._last_reading[key][0] == epoch
+        assert np.array_equal(many._last_reading[key][1], water, equal_nan=True)
+    assert [name for name, _ in rollups(one)] == [name for name, _ in rollups(many)]
+    for (_, expected), (_, got) in zip(rollups(one), rollups(many)):
+        for window in expected:
+            a, b = expected[window], got[window]
+            assert np.array_equal(a.bucket_ids, b.bucket_ids)
+            assert np.array_equal(a.count, b.count)
+            assert np.array_equal(a.hist, b.hist)
+            assert np.array_equal(a.min, b.min) and np.array_equal(a.max, b.max)
+            assert np.allclose(a.sum, b.sum) and np.allclose(a.below, b.below)
+    assert many.fleet["1d"].below.sum() > 0
+    expected, got = one.summary("farm-1", "1h"), many.summary("farm-1", "1h")
+    assert got["below_threshold_seconds"] == expected["below_threshold_seconds"]
+    for channel in CHANNELS:
+        assert got[channel].keys() == expected[channel].keys()
+        assert all(np.isclose(got[channel][name], value) for name, value in expected[channel].items())
@@ -0,0 +1,81 @@
+import numpy as np
+from ecorice.store import FarmStore, FLOAT_COLUMNS, range_for, to_epoch
+from ecorice.compaction import Compactor, choose_level, rollup_store
+
+START = to_epoch("2024-06-01 00:00:00")
+
+
+def append(series, timestamps, value=5.0):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    series.append_columns(dict({"timestamp": timestamps}, **{name: np.full(len(timestamps), value) for name in FLOAT_COLUMNS}))
+
+
+def minute_counts(series):
+    return [int(rollup_store(series, level).read(["co2_emissions_count"])["co2_emissions_count"].sum())
+            for level in ("1m", "1h", "1d")]
+
+
+def test_auto_query_after_retention_expired_every_raw_day(tmp_path):
+    store = FarmStore(str(tmp_path))
+    series = store.series()
+    append(series, np.arange(START, START + 2 * 86400, 60))
+    Compactor(store, retention_days=90).run_once(now="2025-06-01 00:00:00")
+    assert series.partitions() == []
+
+    assert choose_level(series, *range_for("week")) == "1m"
+    assert choose_level(series, START, START + 86400) == "1m"
+    data = store.query(["co2_emissions"], *range_for("week"), resolution="auto")
+    assert len(data["timestamp"]) == 0
+    data = store.query(["co2_emissions"], START, START + 86400, resolution="auto")
+    assert len(data["timestamp"]) == 1440
+    assert np.all(data["co2_emissions"] == 5.0)
+
+
+def test_late_rows_merge_into_expired_day(tmp_path):
+    store = FarmStore(str(tmp_path))
+    series = store.series()
+    append(series, np.arange(START, START + 3600))
+    compactor = Compactor(store, retention_days=30)
+    compactor.compact_series("farm-1", "plot-1", now="2025-01-01 00:00:00")
+    assert minute_counts(series) == [3600, 3600, 3600]
+
+    append(series, [START + 10, START + 7200])  # One in an existing minute, one in a new hour
+    compactor.compact_series("farm-1", "plot-1", now="2025-01-01 00:00:00")
+    assert minute_counts(series) == [3602, 3602, 3602]
+    assert series.partitions() == []
+    compactor.compact_series("farm-1", "plot-1", now="2025-01-01 00:00:00")
+    assert minute_counts(series) == [3602, 3602, 3602]
+
+
+def compact_more(root):
+    store = FarmStore(root)
+    append(store.series(), np.arange(START + 86400, START + 2 * 86400, 60))
+    Compactor(store, retention_days=None).compact_series("farm-1", "plot-1")
+
+
+def test_invalidate_drops_views_rewritten_by_another_process(tmp_path):
+    import multiprocessing
+    store = FarmStore(str(tmp_path))
+    series = store.series()
+    append(series, np.arange(START, START + 86400, 60))
+    Compactor(store, retention_days=None).compact_series("farm-1", "plot-1")
+    assert minute_counts(series) == [1440] * 3
+    cached = rollup_store(series, "1h")
+
+    process = multiprocessing.get_context("fork").Process(target=compact_more, args=(store.root,))
+    process.start()
+    process.join()
+    store.invalidate("farm-1", "plot-1")
+    assert store.series() is not series
+    assert rollup_store(store.series(), "1h") is not cached
+    assert minute_counts(store.series()) == [2880] * 3
+
+
+def test_report_accounts_days_retention_removed(tmp_path):
+    from ecorice.report import _account_dates
+    store = FarmStore(str(tmp_path))
+    series = store.series()
+    append(series, np.arange(START, START + 3 * 86400, 60))
+    Compactor(store, retention_days=90).run_once(now="2025-06-01 00:00:00")
+    assert series.partitions() == []
+    assert [str(day) for day in _account_dates(series, None, None)] == ["2024-06-01", "2024-06-04"]
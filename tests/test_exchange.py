@@ -0,0 +1,33 @@
+import gzip
+from ecorice.store import FarmStore
+from ecorice.compaction import Compactor
+from ecorice.exchange import expired_history, export_history, import_history
+from test_writer import records
+
+
+def test_import_reports_quarantined_rows(tmp_path):
+    path = str(tmp_path / "history.csv.gz")
+    store = FarmStore(str(tmp_path / "store"))
+    store.append(records(5))
+    assert export_history(store, path) == 5
+    with gzip.open(path, "at") as file:
+        file.write("2025-01-02 00:00:00,not a number\n2025-01-02 00:10:00,1,2,3,4,5,farm-1,plot-1\n")
+
+    quarantine = []
+    copy = FarmStore(str(tmp_path / "copy"))
+    assert import_history(copy, path, quarantine=quarantine) == 6
+    assert [(line, reason) for _, line, reason, _ in quarantine] == [(7, "2 fields")]
+    assert len(copy) == 6
+
+
+def test_export_leaves_out_and_lists_expired_days(tmp_path):
+    store = FarmStore(str(tmp_path / "store"))
+    store.append(records(300))  # 2025-01-01 to 2025-01-03
+    store.append(records(2, start=200 * 86400))
+    Compactor(store, retention_days=30).run_once(now="2025-03-01 00:00:00")
+
+    assert export_history(store, str(tmp_path / "all.csv.gz")) == 2
+    expired = expired_history(store)
+    assert [day for _, _, day in expired] == ["2025-01-01", "2025-01-02", "2025-01-03"]
+    assert expired_history(store, "2025-01-02 12:00:00", "2025-01-03 00:00:00") == [("farm-1", "plot-1", "2025-01-02")]
+    assert expired_history(store, farm="farm-2") == []
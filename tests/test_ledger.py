@@ -0,0 +1,39 @@
+import pytest
+from ecorice.ledger import Ledger
+
+DAY = "2025-07-01"
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.db"))
+    yield ledger
+    ledger.close()
+
+
+@pytest.mark.parametrize("category, amount", [
+    ("fertiliser", 10), ("fertilizer", -1), ("fertilizer", float("nan")), ("fertilizer", float("inf")),
+    ("fertilizer", "1e400"), ("fertilizer", "ten"),
+])
+def test_invalid_entries_are_rejected(ledger, category, amount):
+    with pytest.raises(ValueError):
+        ledger.add(category, amount, DAY)
+    assert ledger.season_history(None) == []
+
+
+def test_add_many_books_nothing_when_one_entry_is_invalid(ledger):
+    with pytest.raises(ValueError):
+        ledger.add_many([("farm-1", "seed", 100, DAY, ""), ("farm-1", "sales", float("nan"), DAY, "")])
+    assert ledger.season_history(None) == []
+    assert ledger.add_many([("farm-1", "seed", 100, DAY, ""), ("farm-1", "sales", 250, DAY, "")]) == 2
+    summary = ledger.season_summary("farm-1", "wet", 2025)
+    assert (summary["cost"], summary["revenue"]) == (100, 250)
+
+
+def test_failed_update_keeps_the_entry_and_totals(ledger):
+    entry_id = ledger.add("water", 40, DAY)
+    before = ledger.season_summary("farm-1", "wet", 2025)
+    with pytest.raises(ValueError):
+        ledger.update(entry_id, "water", -5, DAY)
+    assert [entry["amount"] for entry in ledger.entries("farm-1", "wet", 2025)] == [40]
+    assert ledger.season_summary("farm-1", "wet", 2025) == before
@@ -0,0 +1,69 @@
+import time
+import threading
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("tkinter")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from ecorice.ui import live_chart
+
+
+# Agg canvas standing in for the Tk one, so the chart logic runs without a display
+class OffscreenCanvas(FigureCanvasAgg):
+    def __init__(self, figure, master=None):
+        super().__init__(figure)
+
+    def get_tk_widget(self):
+        return None
+
+    def blit(self, bbox=None):
+        pass
+
+
+@pytest.fixture
+def chart(monkeypatch):
+    monkeypatch.setattr(live_chart, "FigureCanvasTkAgg", OffscreenCanvas)
+    return live_chart.LiveChart(None, [("co2_emissions", "CO₂", {})])
+
+
+def test_empty_range_clears_the_previous_lines(chart):
+    timestamps = np.arange(360, dtype=np.int64) * 60 + 1735689600
+    chart.set_data(timestamps.astype("datetime64[s]"), {"co2_emissions": np.linspace(400, 500, 360)})
+    chart.redraw()
+    assert len(chart.lines["co2_emissions"].get_xdata()) > 0
+
+    chart.set_data(np.empty(0, dtype="datetime64[s]"), {"co2_emissions": np.empty(0)})
+    chart.redraw()
+    assert len(chart.lines["co2_emissions"].get_xdata()) == 0
+
+
+def test_append_extends_the_lines(chart):
+    timestamps = np.arange(10, dtype=np.int64) * 60 + 1735689600
+    chart.set_data(timestamps.astype("datetime64[s]"), {"co2_emissions": np.full(10, 400.0)})
+    chart.redraw()
+    chart.append((timestamps + 600).astype("datetime64[s]"), {"co2_emissions": np.full(10, 410.0)})
+    chart.redraw()
+    assert len(chart.lines["co2_emissions"].get_xdata()) == 20
+
+
+def test_background_source_never_waits_for_the_fetch():
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        return {"timestamp": np.array([1], dtype="datetime64[s]")}
+
+    source = live_chart.background_source(fetch)
+    began = time.perf_counter()
+    assert source() is None
+    assert source() is None
+    assert time.perf_counter() - began < 0.1
+    release.set()
+    deadline = time.monotonic() + 5
+    result = None
+    while result is None and time.monotonic() < deadline:
+        result = source()
+        time.sleep(0.01)
+    source.close()
+    assert len(result["timestamp"]) == 1
@@ -0,0 +1,24 @@
+import numpy as np
+from ecorice.rules import RuleEngine, load_rules
+
+CHANNELS = ("soil_moisture", "water_level", "air_temp", "air_humidity", "co2_emissions")
+
+
+def test_latest_insights_match_each_fields_newest_row():
+    rng = np.random.default_rng(1)
+    rows = 5000
+    fields = np.array([f"farm-1/plot-{i}" for i in rng.integers(0, 40, rows)])
+    times = rng.integers(0, 600, rows) + 1735689600  # Many equal times within a field
+    batch = {"field": fields, "timestamp": times.astype("datetime64[s]")}
+    batch.update({channel: rng.uniform(0, 600, rows) for channel in CHANNELS})
+
+    insights = RuleEngine(load_rules()).latest_insights(batch)
+    engine = RuleEngine(load_rules())
+    results = engine.evaluate(batch)
+    expected = {}
+    for field in np.unique(fields):
+        index = np.flatnonzero(fields == field)
+        newest = index[np.argmax(times[index])]
+        expected[str(field)] = [rule.message for rule in engine.rules if results[rule.name][newest]]
+    assert insights == expected
+    assert any(insights.values())
@@ -0,0 +1,115 @@
+import math
+import time
+import socket
+import threading
+from http.server import ThreadingHTTPServer
+import numpy as np
+import pytest
+from ecorice.store import FarmStore
+from ecorice.server import EcoRiceServer, make_handler
+from ecorice.client import ApiClient, RemoteFeed
+from ecorice.anomaly import AnomalyDetector
+from ecorice.ui.formatting import format_reading
+
+FIELDS = ["soil_moisture", "water_level", "air_temp", "air_humidity", "co2_emissions"]
+
+
+@pytest.fixture
+def served(tmp_path):
+    store = FarmStore(str(tmp_path))
+    records = []
+    for second in range(3):
+        record = {"timestamp": f"2025-01-01 00:00:0{second}", "farm_id": "farm-1", "plot_id": "plot-1",
+                  "soil_moisture": 40.0, "water_level": 5.0, "air_temp": 30.0, "air_humidity": 70.0, "co2_emissions": 400.0}
+        records.append(record)
+    records[-1]["water_level"] = math.nan  # Masked as faulty by the gateway
+    store.append(records)
+    server = EcoRiceServer(store)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(server))
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield store, "http://%s:%d" % httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def raw_get(url, path, method="GET"):
+    host, port = url[len("http://"):].split(":")
+    with socket.create_connection((host, int(port))) as connection:
+        connection.sendall(f"{method} {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n".encode())
+        data = b""
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                return data
+            data += chunk
+
+
+def test_query_round_trips_nan(served):
+    store, url = served
+    data = ApiClient(url).query(FIELDS, farm="farm-1", plot="plot-1")
+    expected = store.query(FIELDS, farm="farm-1", plot="plot-1")
+    assert np.array_equal(data["timestamp"], expected["timestamp"])
+    for name in FIELDS:
+        assert np.array_equal(data[name], expected[name], equal_nan=True)
+
+
+def test_latest_nan_is_usable_by_detector_and_labels(served):
+    _, url = served
+    reading = ApiClient(url).latest("farm-1", "plot-1")
+    assert reading["timestamp"] == "2025-01-01 00:00:02"
+    assert math.isnan(reading["water_level"])
+    assert AnomalyDetector().filter([reading]) == [reading]
+    assert format_reading(reading)["Water Level"] == "N/A"
+    assert format_reading({"water_level": None, "co2_emissions": 400.0})["CO₂ Emissions"] == "400.00 ppm"
+
+
+def test_bad_ndjson_parameters_get_a_clean_400(served):
+    _, url = served
+    for query in ("fields=bogus", "start=notadate"):
+        response = raw_get(url, f"/api/readings?format=ndjson&{query}")
+        assert response.startswith(b"HTTP/1.1 400")
+        assert response.count(b"HTTP/1.1") == 1
+
+
+def test_ndjson_streams_rows(served):
+    _, url = served
+    response = raw_get(url, "/api/readings?format=ndjson&fields=water_level")
+    assert response.startswith(b"HTTP/1.1 200")
+    assert b'"water_level":null' in response
+    assert response.endswith(b"0\r\n\r\n")
+
+
+def test_ndjson_head_sends_headers_only(served):
+    _, url = served
+    response = raw_get(url, "/api/readings?format=ndjson", method="HEAD")
+    assert response.startswith(b"HTTP/1.1 200")
+    assert response.endswith(b"\r\n\r\n")
+    assert b"farm-1/plot-1" not in response
+
+
+def test_remote_feed_polls_off_the_caller_thread(served):
+    class SlowClient:
+        def latest(self, farm_id, plot_id):
+            time.sleep(0.5)
+            return {"timestamp": "2025-01-01 00:00:02", "farm_id": farm_id, "plot_id": plot_id, "water_level": 5.0}
+
+    feed = RemoteFeed(SlowClient(), interval=0.01)
+    feed.start()
+    began = time.perf_counter()
+    assert feed.drain() == []
+    assert time.perf_counter() - began < 0.1
+    feed.stop()
+    assert [reading["timestamp"] for reading in feed.drain()] == ["2025-01-01 00:00:02"]
+
+    _, url = served
+    feed = RemoteFeed(ApiClient(url), "farm-1", "plot-1", AnomalyDetector(), interval=0.01)
+    feed.start()
+    deadline = time.monotonic() + 5
+    readings = []
+    while not readings and time.monotonic() < deadline:
+        readings = feed.drain()
+        time.sleep(0.01)
+    feed.stop()
+    assert readings[0]["timestamp"] == "2025-01-01 00:00:02"
+    assert math.isnan(readings[0]["water_level"])
@@ -0,0 +1,62 @@
+import multiprocessing
+import numpy as np
+from ecorice.store import BLOCK_ROWS, FLOAT_COLUMNS, FarmStore, ingest_csv, to_epoch
+from ecorice.writer import CsvSink
+from test_writer import records
+
+
+def ingest(root, filename, start):
+    start.wait()
+    for _ in range(5):
+        ingest_csv(FarmStore(root), filename)
+
+
+def test_concurrent_ingest_csv_adds_each_row_once(tmp_path):
+    filename = str(tmp_path / "data.csv")
+    sink = CsvSink(filename)
+    sink.write(records(2000))
+    sink.close()
+    root = str(tmp_path / "store")
+    FarmStore(root)
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    processes = [context.Process(target=ingest, args=(root, filename, start)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    assert len(FarmStore(root)) == 2000
+
+
+def test_append_then_query_round_trips(tmp_path):
+    store = FarmStore(str(tmp_path))
+    batch = records(400, plots=("plot-1", "plot-2"))
+    store.append(batch)
+    data = store.query(["soil_moisture"], "2025-01-01 12:00:00", "2025-01-02 00:00:00", plot="plot-2")
+    expected = [r for r in batch if r["plot_id"] == "plot-2" and "2025-01-01 12:00:00" <= r["timestamp"] < "2025-01-02 00:00:00"]
+    assert data["timestamp"].tolist() == [to_epoch(r["timestamp"]) for r in expected]
+    assert data["soil_moisture"].tolist() == [r["soil_moisture"] for r in expected]
+    assert set(data["field"].tolist()) == {"farm-1/plot-2"}
+    assert len(store) == 400
+
+
+def test_locate_matches_a_full_binary_search(tmp_path):
+    series = FarmStore(str(tmp_path)).series()
+    rng = np.random.default_rng(1)
+    day = to_epoch("2025-01-01 00:00:00")
+    timestamps = np.sort(rng.integers(day, day + 86400, 3 * BLOCK_ROWS + 123))  # Repeats included
+    for chunk in np.array_split(timestamps, 4):  # Each append extends the cached block index
+        series.append_columns(dict({"timestamp": chunk}, **{name: np.zeros(len(chunk)) for name in FLOAT_COLUMNS}))
+        series.read(["co2_emissions"], day + 1, day + 86400)
+    stored = series.read(["timestamp"])["timestamp"]
+    assert np.array_equal(stored, timestamps)
+
+    probes = np.concatenate([timestamps[::BLOCK_ROWS], timestamps[BLOCK_ROWS - 1::BLOCK_ROWS],
+                             rng.integers(day - 10, day + 86410, 500)])
+    for epoch in probes:
+        assert series._locate("2025-01-01", stored, int(epoch)) == np.searchsorted(timestamps, epoch, side="left")
+    start, end = int(timestamps[BLOCK_ROWS]), int(timestamps[2 * BLOCK_ROWS + 7])
+    assert np.array_equal(series.read(["timestamp"], start, end)["timestamp"],
+                          timestamps[(timestamps >= start) & (timestamps < end)])
@@ -0,0 +1,107 @@
+import os
+import time
+import numpy as np
+from ecorice.store import FarmStore
+from ecorice.writer import CsvSink, SensorWriter, StoreSink, write_journal
+
+
+# Function to make `count` readings 10 minutes apart, `start` seconds after 2025-01-01, spread over plots
+def records(count, start=0, plots=("plot-1",)):
+    return [{"timestamp": str(np.datetime64("2025-01-01T00:00:00") + np.timedelta64(start + i * 600, "s")).replace("T", " "),
+             "farm_id": "farm-1", "plot_id": plots[i % len(plots)], "soil_moisture": float(i), "water_level": 5.0,
+             "air_temp": 30.0, "air_humidity": 70.0, "co2_emissions": 400.0} for i in range(count)]
+
+
+def stored(store):
+    data = store.query(["soil_moisture"])
+    return sorted(zip(data["field"].tolist(), data["timestamp"].tolist()))
+
+
+def test_store_sink_replays_interrupted_batch(tmp_path):
+    store = FarmStore(str(tmp_path))
+    store.append(records(10))
+    batch = records(300, start=6000, plots=("plot-1", "plot-2"))  # Spans days and a new plot
+    entry = {"rows": store.row_counts(store.partitions_of(batch)), "records": batch}
+    write_journal(os.path.join(store.root, ".journal"), entry)
+    store.append(batch[:120])  # Crash part-way through the append
+
+    StoreSink(FarmStore(str(tmp_path)), crash_safe=True)
+    expected = FarmStore(str(tmp_path / "expected"))
+    expected.append(records(10))
+    expected.append(batch)
+    assert stored(FarmStore(str(tmp_path))) == stored(expected)
+    assert not os.path.exists(os.path.join(store.root, ".journal"))
+
+
+def test_store_sink_journals_only_touched_partitions(tmp_path):
+    store = FarmStore(str(tmp_path))
+    store.append(records(500))
+    batch = records(3, start=500 * 600)
+    assert sorted(store.partitions_of(batch)) == ["farm-1/plot-1/2025-01-04"]
+    StoreSink(store, crash_safe=True).write(batch)
+    assert len(store) == 503
+
+
+def test_csv_sink_replays_interrupted_batch(tmp_path):
+    path = str(tmp_path / "data.csv")
+    sink = CsvSink(path, crash_safe=True)
+    sink.write(records(2))
+    sink.close()
+    with open(path, "rb") as file:
+        before = file.read()
+    text = "".join(f"2025-01-02 00:00:0{i},1,2,3,4,5\r\n" for i in range(3))
+    write_journal(path + ".journal", {"offset": len(before), "text": text})
+    with open(path, "a", newline="") as file:
+        file.write(text[:20])  # Torn row
+
+    CsvSink(path, crash_safe=True).close()
+    with open(path, "rb") as file:
+        assert file.read() == before + text.encode()
+    assert not os.path.exists(path + ".journal")
+
+
+class FlakySink:
+    def __init__(self, failures):
+        self.failures = failures
+        self.written = []
+
+    def write(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.written.extend(batch)
+
+    def close(self):
+        pass
+
+
+def test_sensor_writer_retries_failed_batches():
+    sink = FlakySink(2)
+    writer = SensorWriter(sink, batch_size=10, max_age=0.01, retry_delay=0.01)
+    errors = 0
+    for record in records(50):
+        writer.write(record)
+    while True:
+        try:
+            writer.flush()
+            break
+        except OSError:
+            errors += 1
+    writer.close()
+    assert errors >= 1
+    assert sink.written == records(50)
+
+
+def test_sensor_writer_keeps_the_record_that_reports_an_error():
+    sink = FlakySink(1)
+    writer = SensorWriter(sink, batch_size=1, max_age=0.01, retry_delay=0.01)
+    first, second = records(2)
+    writer.write(first)
+    while writer.error is None and not sink.written:
+        time.sleep(0.001)  # First flush failing
+    try:
+        writer.write(second)
+    except OSError:
+        pass
+    writer.close()
+    assert sink.written == [first, second]